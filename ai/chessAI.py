@@ -1,102 +1,46 @@
-# Piece Square Tables, adapted from Sunfish.py:
-# https://github.com/thomasahle/sunfish/blob/master/sunfish.py
-
 """
 This script will contain the functions for the chess AI 
 """
 import random as r
+import time
+from collections import namedtuple
+
+from ai.moveOrdering import MoveOrdering
+from ai.transpositionTable import TranspositionTable, EXACT, LOWER, UPPER
+from engine.evaluation import pieceScore
+from engine.stagedMoves import staged_moves, is_capture, is_promotion
 
-#Dictionnary to assign a score to the chessboard
-pieceScore = { 
-            'p': 100, 'N': 280, 'B': 320, 'R': 479, 'Q': 929, 'K': 60000, 'K_e': 60000, '-': 0 
-            } 
 CHECKMATE = 99999 #If we manage to get a ChekMate
 STALEMATE = 0 #Because it is not a case that we want
+TT_SIZE_MB = 16 #memory cap of the transposition table
+DELTA_MARGIN = 200 #quiescence: a capture has to be able to bring the score this close to alpha
+MAX_DEPTH = 32 #deepest iteration when the search is only limited by time or nodes
+CHECK_LIMITS_NODES = 1024 #the time and node limits are checked every CHECK_LIMITS_NODES nodes
+#selective search (see Searcher.negamax), default flags of a Searcher
+NULL_MOVE = True
+FUTILITY_PRUNING = True
+LATE_MOVE_REDUCTIONS = True
+NULL_MOVE_REDUCTION = 2 #the search after a null move is NULL_MOVE_REDUCTION plies shallower
+NULL_MOVE_MIN_DEPTH = 3
+FUTILITY_MARGINS = (0, 200, 500) #by depth: the most a quiet move can raise the score (depth 1 and 2)
+LMR_FULL_MOVES = 3 #moves searched at full depth before the reductions
+LMR_MIN_DEPTH = 3
+LMR_REDUCTION = 1
 
+#positions already searched, shared by the successive calls to find_best_moves
+transposition_table = TranspositionTable(TT_SIZE_MB)
+#random generator of find_move_NegaMax to shuffle the moves of the root, None: same move every time
+rng = None
+#result of the last call to find_best_moves
+next_move = None
+DEPTH = 0
+principal_variation = []
+nodes = 0
 
-'''
-The pst matrix is taken from the github of thomasahle. Those value have been generated by try and error
-pst_w = position table for with pawn in
-pst_b = position table for black pawn
-'''
-pst_w = {
-    'p':[
-            [ 100, 100, 100, 100, 105, 100, 100,  100],
-            [  78,  83,  86,  73, 102,  82,  85,  90],
-            [   7,  29,  21,  44,  40,  31,  44,   7],
-            [ -17,  16,  -2,  15,  14,   0,  15, -13],
-            [ -26,   3,  10,   9,   6,   1,   0, -23],
-            [ -22,   9,   5, -11, -10,  -2,   3, -19],
-            [ -31,   8,  -7, -37, -36, -14,   3, -31],
-            [   0,   0,   0,   0,   0,   0,   0,   0]
-        ],
-    'N': [ 
-            [-66, -53, -75, -75, -10, -55, -58, -70],
-            [ -3,  -6, 100, -36,   4,  62,  -4, -14],
-            [ 10,  67,   1,  74,  73,  27,  62,  -2],
-            [ 24,  24,  45,  37,  33,  41,  25,  17],
-            [ -1,   5,  31,  21,  22,  35,   2,   0],
-            [-18,  10,  13,  22,  18,  15,  11, -14],
-            [-23, -15,   2,   0,   2,   0, -23, -20],
-            [-74, -23, -26, -24, -19, -35, -22, -69]
-        ],
-    'B': [ 
-            [-59, -78, -82, -76, -23,-107, -37, -50],
-            [-11,  20,  35, -42, -39,  31,   2, -22],
-            [ -9,  39, -32,  41,  52, -10,  28, -14],
-            [ 25,  17,  20,  34,  26,  25,  15,  10],
-            [ 13,  10,  17,  23,  17,  16,   0,   7],
-            [ 14,  25,  24,  15,   8,  25,  20,  15],
-            [ 19,  20,  11,   6,   7,   6,  20,  16],
-            [ -7,   2, -15, -12, -14, -15, -10, -10]
-        ],
-    'R': [  
-            [ 35,  29,  33,   4,  37,  33,  56,  50],
-            [ 55,  29,  56,  67,  55,  62,  34,  60],
-            [ 19,  35,  28,  33,  45,  27,  25,  15],
-            [  0,   5,  16,  13,  18,  -4,  -9,  -6],
-            [-28, -35, -16, -21, -13, -29, -46, -30],
-            [-42, -28, -42, -25, -25, -35, -26, -46],
-            [-53, -38, -31, -26, -29, -43, -44, -53],
-            [-30, -24, -18,   5,  -2, -18, -31, -32]
-        ],
-    'Q': [   
-            [  6,   1,  -8,-104,  69,  24,  88,  26],
-            [ 14,  32,  60, -10,  20,  76,  57,  24],
-            [ -2,  43,  32,  60,  72,  63,  43,   2],
-            [  1, -16,  22,  17,  25,  20, -13,  -6],
-            [-14, -15,  -2,  -5,  -1, -10, -20, -22],
-            [-30,  -6, -13, -11, -16, -11, -16, -27],
-            [-36, -18,   0, -19, -15, -15, -21, -38],
-            [-39, -30, -31, -13, -31, -36, -34, -42]
-        ],
-    'K': [  
-            [  4,  54,  47, -99, -99,  60,  83, -62],
-            [-32,  10,  55,  56,  56,  55,  10,   3],
-            [-62,  12, -57,  44, -67,  28,  37, -31],
-            [-55,  50,  11,  -4, -19,  13,   0, -49],
-            [-55, -43, -52, -28, -51, -47,  -8, -50],
-            [-47, -42, -43, -79, -64, -32, -29, -32],
-            [ -4,   3, -14, -50, -57, -18,  13,   4],
-            [ 17,  30,  -3, -14,   6,  -1,  40,  18]
-        ],
-
-    #Endgame King Table
-    'K_e': [
-            [-50, -40, -30, -20, -20, -30, -40, -50],
-            [-30, -20, -10,   0,   0, -10, -20, -30],
-            [-30, -10,  20,  30,  30,  20, -10, -30],
-            [-30, -10,  30,  40,  40,  30, -10, -30],
-            [-30, -10,  30,  40,  40,  30, -10, -30],
-            [-30, -10,  20,  30,  30,  20, -10, -30],
-            [-30, -30,   0,   0,   0,   0, -30, -30],
-            [-50, -30, -30, -30, -30, -30, -30, -50]
-        ]
-}
-
-pst_b = {}
-for key, matrix in pst_w.items():
-    pst_b[key] = matrix[::-1]
+class SearchStopped(Exception):
+    '''
+    Raised inside the search when the time or node limit is reached
+    '''
 
 
 '''
@@ -112,10 +56,12 @@ def find_random_move(valid_moves):
 Find the best move based on material alone
 '''
 
-def find_best_moves_noRecursion(gs, valid_moves):
+def find_best_moves_noRecursion(gs, valid_moves, shuffle_seed = None):
     '''
     Function that will apply a Minimax algorithm (Greedy Algorithm) to the list of valid movements 
     based on material alone
+        shuffle_seed : seed to shuffle the moves (a random move among the best ones), None to keep
+                       the order of valid_moves
     '''
     # What is good for white is bad for black and what is good for black is bad for white
     # Black turn want to have the smallest value, a negatif value (ex: -9999)
@@ -127,7 +73,8 @@ def find_best_moves_noRecursion(gs, valid_moves):
     turn_multiplier = 1 if gs.whiteToMove else -1 
     opponent_MinMax_score = CHECKMATE #for black perspective
     best_player_move = None
-    r.shuffle(valid_moves)
+    if shuffle_seed is not None:
+        r.Random(shuffle_seed).shuffle(valid_moves)
     for player_move in valid_moves:  
         gs.make_move(player_move) #the AI make his move
         opponent_moves = gs.get_valid_moves() #possible moves for the opponent after the AI moved
@@ -139,15 +86,12 @@ def find_best_moves_noRecursion(gs, valid_moves):
             opponent_max_score = -CHECKMATE #set the opponent max move score to a very low value
             for opponent_move in opponent_moves: #i am trying to find the max value of the opponent moves
                 gs.make_move(opponent_move) #the opponent makes his move
-                gs.get_valid_moves() 
-                # we need to generate all the possible moves in order to determine when
+                # we only need to know if there is a valid move to determine when
                 # we are in a checkMAte or StaleMate states
-                if gs.checkMate:
-                    score = CHECKMATE
-                elif gs.staleMate:
-                    score = STALEMATE
+                if not gs.has_legal_move():
+                    score = CHECKMATE if gs.in_Check() else STALEMATE
                 else:
-                    score = -turn_multiplier * score_material(gs.board)
+                    score = -turn_multiplier * gs.boardScore
                 if score > opponent_max_score : #IS it larger than the max value gathered so far?
                     opponent_max_score = score #if so, that become my max value
                 gs.undo_move() #undo the opponent move
@@ -165,22 +109,355 @@ def find_best_moves_noRecursion(gs, valid_moves):
 '''
 Helper method to make the first recursive call
 '''
-def find_best_moves(gs, valid_moves, depth):
+def find_best_moves(gs, valid_moves, depth = MAX_DEPTH, tt = None, shuffle_seed = None, time_limit = None, node_limit = None,
+                    stop_event = None, ponder = False):
     '''
     Function that will call the initial recursive call and return the result at the end
+    Thin wrapper of Searcher.search with the searcher of the module (see Searcher for the arguments):
+    the result is also left in next_move, DEPTH, principal_variation and nodes
+        tt : TranspositionTable to probe and fill (default: the table of the module, kept between
+             the moves of the game)
     '''
     global next_move
     global DEPTH
+    global rng
+    global principal_variation, nodes
 
-    next_move = None
-    DEPTH = depth
+    searcher = default_searcher if tt is None or tt is default_searcher.table else Searcher(tt)
+    rng = r.Random(shuffle_seed) if shuffle_seed is not None else None #for find_move_NegaMax
     #find_move_MinMax(gs, valid_moves, DEPTH, gs.whiteToMove)
     #find_move_MinMax_alpha_beta(gs, valid_moves, DEPTH, -CHECKMATE, CHECKMATE, gs.whiteToMove)
     #find_move_NegaMax(gs, valid_moves, DEPTH)
-    find_move_NegaMax_alpha_beta(gs, valid_moves, DEPTH, -CHECKMATE, CHECKMATE)
-
+    result = searcher.search(gs, valid_moves, depth, shuffle_seed, time_limit, node_limit, stop_event, ponder)
+    next_move = result.move
+    DEPTH = result.depth
+    principal_variation = result.pv
+    nodes = result.nodes
     return next_move
 
+def ponder_hit():
+    '''
+    Ponder hit of the search of find_best_moves (see Searcher.ponder_hit)
+    '''
+    default_searcher.ponder_hit()
+
+'''
+Re-entrant search: all the state of a search belongs to a Searcher object
+'''
+#result of Searcher.search: best move, its score (for the side to move), principal variation, depth of
+# the last completed iteration, nodes searched and seconds spent
+SearchResult = namedtuple('SearchResult', ('move', 'score', 'pv', 'depth', 'nodes', 'seconds'))
+
+class Searcher():
+    """
+    NegaMax alpha beta search with its own transposition table, move ordering, statistics and limits,
+    so that several searches can run in the same process (threads, several games) without sharing
+    any global variable
+    """
+    def __init__(self, tt = None, tt_size_mb = TT_SIZE_MB, null_move = NULL_MOVE, futility_pruning = FUTILITY_PRUNING,
+                 late_move_reductions = LATE_MOVE_REDUCTIONS, age_table = True):
+        '''
+        tt : TranspositionTable to probe and fill, default: a new table of tt_size_mb MB
+             (a table can be given to searchers which don't run at the same time)
+        age_table : start a new age of the table (tt.new_search) at each search, False for the workers
+                    of a table shared between processes: the parent starts the age once per search
+        null_move, futility_pruning, late_move_reductions : techniques of the selective search
+        '''
+        self.table = tt if tt is not None else TranspositionTable(tt_size_mb)
+        self.ageTable = age_table
+        self.nullMove = null_move
+        self.futilityPruning = futility_pruning
+        self.lateMoveReductions = late_move_reductions
+        self.moveOrdering = MoveOrdering(pieceScore) #killer moves and history
+        self.rng = None #random generator to shuffle the moves of the root, None: same move every time
+        #statistics and limits (None: no limit), counted from startTime and startNodes (the start of
+        # the search, or the ponder hit)
+        self.nodes = 0
+        self.stopTime = None
+        self.maxNodes = None
+        self.stopEvent = None #threading.Event set by another thread to cancel the search
+        self.timeLimit = None
+        self.nodeLimit = None
+        self.startTime = 0.0
+        self.startNodes = 0
+        self.pondering = False #searching on the opponent's time: no limit until ponder_hit
+        #best move of the root of the current iteration
+        self.rootMove = None
+        #best line of the last completed iteration, and its moves by zobristKey of the position where
+        # they are played (searched first by the next iteration)
+        self.principalVariation = []
+        self.pvMoves = {}
+
+    def search(self, gs, valid_moves = None, depth = MAX_DEPTH, shuffle_seed = None, time_limit = None,
+               node_limit = None, stop_event = None, ponder = False):
+        '''
+        Best move of the position -> SearchResult
+        Iterative deepening: the position is searched at depth 1, 2, ... up to 'depth', each iteration
+        searching the principal variation of the previous one first. When the time limit (seconds) or the
+        node limit is reached, the search stops and the move of the last completed iteration is returned
+        (the first iteration is always completed, so that there is a move).
+            valid_moves : moves of the root (default: all the valid moves)
+            shuffle_seed : seed to shuffle the moves of the root, so that the AI doesn't always choose
+                           the same move among moves of equal score (None: reproducible search)
+            stop_event : threading.Event to cancel the search from another thread (even during the first
+                         iteration: the move is None if no iteration is completed)
+            ponder : search on the opponent's time, the position being the one after the reply that the
+                     opponent is expected to play. The limits are only applied after ponder_hit() (the
+                     opponent played that reply), otherwise the search runs until it is cancelled.
+        '''
+        if valid_moves is None:
+            valid_moves = gs.get_valid_moves()
+        if self.ageTable:
+            self.table.new_search()
+        self.moveOrdering.new_search()
+        self.rng = r.Random(shuffle_seed) if shuffle_seed is not None else None
+        self.nodes = 0
+        self.stopTime = self.maxNodes = None #no limit during the first iteration
+        self.stopEvent = stop_event
+        self.timeLimit = time_limit
+        self.nodeLimit = node_limit
+        self.startTime = time.perf_counter()
+        self.startNodes = 0
+        self.pondering = ponder
+        self.principalVariation = []
+        self.pvMoves = {}
+        root_moves = len(gs.moveLog)
+        best_move, best_score, completed_depth = None, 0, 0
+        for iteration_depth in range(1, depth + 1):
+            self.rootMove = None
+            try:
+                score = self.negamax(gs, valid_moves, iteration_depth, -CHECKMATE, CHECKMATE)
+            except SearchStopped:
+                while len(gs.moveLog) > root_moves: #undo the moves of the interrupted search
+                    gs.undo_move()
+                break
+            best_move, best_score, completed_depth = self.rootMove, score, iteration_depth
+            self.principalVariation = self.get_principal_variation(gs, best_move, iteration_depth)
+            self.pvMoves = {}
+            for move in self.principalVariation:
+                self.pvMoves[gs.zobristKey] = move
+                gs.make_move(move)
+            for move in self.principalVariation:
+                gs.undo_move()
+
+            if best_move is None or abs(score) >= CHECKMATE: #no move or checkmate found: deeper is useless
+                break
+            if not self.pondering:
+                self.set_limits()
+                if (self.stopTime is not None and time.perf_counter() >= self.stopTime) or \
+                   (self.maxNodes is not None and self.nodes >= self.maxNodes):
+                    break
+
+        return SearchResult(best_move, best_score, list(self.principalVariation), completed_depth, self.nodes,
+                            time.perf_counter() - self.startTime)
+
+    def get_principal_variation(self, gs, best_move, depth):
+        '''
+        Best line of the search: the best move, then the best moves of the transposition table as long
+        as they are valid (at most 'depth' moves)
+        '''
+        line = []
+        move = best_move
+        while move is not None and len(line) < depth:
+            valid_move = None
+            for candidate in gs.get_valid_moves():
+                if candidate.moveID == move.moveID:
+                    valid_move = candidate
+                    break
+            if valid_move is None:
+                break
+            line.append(valid_move)
+            gs.make_move(valid_move)
+            move = self.table.best_move(gs.zobristKey)
+        for _ in line:
+            gs.undo_move()
+        return line
+
+    def set_limits(self):
+        '''
+        Time and node limits of the search, from its start (or from the ponder hit)
+        '''
+        if self.timeLimit is not None:
+            self.stopTime = self.startTime + self.timeLimit
+        if self.nodeLimit is not None:
+            self.maxNodes = self.startNodes + self.nodeLimit
+
+    def ponder_hit(self):
+        '''
+        The opponent played the reply expected by the ponder search (called from another thread): it
+        goes on as a normal search, with its limits counted from now
+        '''
+        self.startTime = time.perf_counter()
+        self.startNodes = self.nodes
+        self.pondering = False
+        if self.principalVariation: #the first iteration is completed, the limits can stop the search
+            self.set_limits()
+
+    def check_limits(self):
+        '''
+        Stop the search (SearchStopped) if the time or the node limit is reached, or if it is cancelled
+        '''
+        if self.stopEvent is not None and self.stopEvent.is_set():
+            raise SearchStopped()
+        if (self.stopTime is not None and time.perf_counter() >= self.stopTime) or \
+           (self.maxNodes is not None and self.nodes >= self.maxNodes):
+            raise SearchStopped()
+
+    def negamax(self, gs, valid_moves, depth, alpha, beta, ply = 0):
+        '''
+        Function that will apply the negamax algorithm to simplify the coding of the minimax 
+        algorithm. Negamax algorithm relies on the fact that max(player1) = -min(-player2).
+        Score for the side to move, the best move of the root (ply == 0) goes to rootMove.
+        ply : number of moves made from the root (null moves included), which indexes the killer moves:
+              it can't be derived from depth, which the null move and the reductions lower by more than 1
+        The positions are looked up in the transposition table first: the valid moves (None below the
+        root) are only generated if the table doesn't already give the score, stage by stage in the
+        order of moveOrdering (hash move, captures, promotions, killers, quiet moves).
+        Below the root, the search is selective (each technique has its flag):
+            1) null move pruning : if the side to move can pass and still reach beta with a reduced
+               search, a real move would too (not in check, nor with only king and pawns: zugzwang)
+            2) futility pruning : near the horizon, the quiet moves which can't raise the static score
+               up to alpha (with FUTILITY_MARGINS) are not searched
+            3) late move reductions : the quiet moves ordered late are searched less deep, and again
+               at full depth if they beat alpha
+        '''
+        self.nodes += 1
+        if self.nodes % CHECK_LIMITS_NODES == 0:
+            self.check_limits()
+        key = gs.zobristKey
+        entry = self.table.probe(key)
+        hash_move = None
+        if entry is not None:
+            entry_depth, entry_score, bound, hash_move = entry
+            if entry_depth >= depth and ply != 0: #the root has to give its move
+                if bound == EXACT:
+                    return entry_score
+                if bound == LOWER and entry_score >= beta:
+                    return entry_score
+                if bound == UPPER and entry_score <= alpha:
+                    return entry_score
+
+        hash_move = self.pvMoves.get(key, hash_move) #the principal variation of the previous iteration first
+        if depth == 0: 
+            #the valid moves are not needed, only whether there is one (checkMate or staleMate)
+            if not gs.has_legal_move():
+                return -CHECKMATE if gs.in_Check() else STALEMATE
+            return self.quiescence(gs, alpha, beta) #the horizon: only the captures are searched
+        ordering = self.moveOrdering
+        killers = ordering.killer_moves(ply)
+        futile = False
+        reductions = False
+        if ply != 0 and (self.nullMove or self.futilityPruning or self.lateMoveReductions):
+            in_check = gs.in_Check()
+            static_score = (1 if gs.whiteToMove else -1) * gs.boardScore
+            if self.nullMove and not in_check and depth >= NULL_MOVE_MIN_DEPTH and static_score >= beta \
+               and abs(beta) < CHECKMATE and gs.moveLog and gs.moveLog[-1] is not None \
+               and gs.has_non_pawn_material():
+                gs.make_null_move()
+                score = - self.negamax(gs, None, max(0, depth - 1 - NULL_MOVE_REDUCTION), -beta, -beta + 1, ply + 1)
+                gs.undo_move()
+                if score >= beta:
+                    return beta #a mate found after a null move is not a real mate
+            futile = self.futilityPruning and not in_check and depth < len(FUTILITY_MARGINS) \
+                     and abs(alpha) < CHECKMATE and static_score + FUTILITY_MARGINS[depth] <= alpha
+            reductions = self.lateMoveReductions and not in_check and depth >= LMR_MIN_DEPTH
+            killer_ids = [killer.moveID for killer in killers if killer is not None]
+        if valid_moves is None:
+            moves = gs.get_staged_moves(hash_move, killers, ordering.capture_key, ordering.quiet_key)
+        else: #root: the moves are given
+            if self.rng is not None:
+                self.rng.shuffle(valid_moves) #the sort is stable: moves of the same key are shuffled
+            moves = staged_moves(valid_moves, hash_move, killers, ordering.capture_key, ordering.quiet_key)
+        alpha_start = alpha
+        max_score = -CHECKMATE - 1 #lower than any score: a move is chosen even if all of them are lost
+        best_move = None
+        pruned = False
+        moves_searched = 0
+        for move in moves:
+            quiet = (futile or reductions) and not is_capture(move) and not is_promotion(move)
+            gs.make_move(move)
+            if quiet and futile and not gs.in_Check(): #a move giving check is never futile
+                gs.undo_move()
+                pruned = True
+                if static_score + FUTILITY_MARGINS[depth] > max_score:
+                    max_score = static_score + FUTILITY_MARGINS[depth] #the move can't score more
+                continue
+            if quiet and reductions and moves_searched >= LMR_FULL_MOVES and move.moveID not in killer_ids \
+               and not gs.in_Check():
+                score = - self.negamax(gs, None, depth - 1 - LMR_REDUCTION, -alpha - 1, -alpha, ply + 1)
+                if score > alpha: #the reduced search doesn't fail low: search it at full depth
+                    score = - self.negamax(gs, None, depth-1, -beta, -alpha, ply + 1)
+            else:
+                score = - self.negamax(gs, None, depth-1, -beta, -alpha, ply + 1)
+            #we need to call beta instead of alpha to alternate their values.
+            gs.undo_move()
+            moves_searched += 1
+            if score > max_score:
+                max_score = score
+                best_move = move
+                if ply == 0: #THE best move to make
+                    self.rootMove = move
+
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    ordering.add_cutoff(move, ply, depth)
+                    break
+
+        if best_move is None and not pruned: #no valid move (checkMate and staleMate are set by the move generation)
+            return -CHECKMATE if gs.checkMate else STALEMATE
+        if max_score <= alpha_start:
+            bound = UPPER #all the moves failed low: the score is at most max_score
+        elif max_score >= beta:
+            bound = LOWER #cutoff: the score is at least max_score
+        else:
+            bound = EXACT
+        self.table.store(key, depth, max_score, bound, best_move)
+        return max_score
+
+    def quiescence(self, gs, alpha, beta):
+        '''
+        Search of the captures only, below the horizon of negamax, until the position is quiet.
+        Without it, the score of the horizon could be the one of the middle of an exchange (a queen
+        takes a pawn and the recapture is not seen).
+            1) stand pat : the side to move can choose not to capture, so the score of the position
+               is a lower bound
+            2) delta pruning : a capture which can't bring the score close to alpha (value of the captured
+               piece + DELTA_MARGIN) is not searched
+        Score for the side to move (negamax)
+        '''
+        self.nodes += 1
+        if self.nodes % CHECK_LIMITS_NODES == 0:
+            self.check_limits()
+        color = 1 if gs.whiteToMove else -1
+        stand_pat = color * gs.boardScore
+        if stand_pat >= beta:
+            return stand_pat
+        if stand_pat + pieceScore['Q'] + DELTA_MARGIN <= alpha: #even taking a (Q)ueen can't raise alpha
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        max_score = stand_pat
+        captures = gs.get_capture_moves()
+        captures.sort(key = self.moveOrdering.capture_key, reverse = True) #MVV-LVA
+        for move in captures:
+            if stand_pat + pieceScore[move.pieceCaptured[1]] + DELTA_MARGIN <= alpha:
+                continue #delta pruning
+            gs.make_move(move)
+            score = - self.quiescence(gs, -beta, -alpha)
+            gs.undo_move()
+            if score > max_score:
+                max_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return max_score
+
+#searcher of find_best_moves and of the find_move_* wrappers, with the table of the module
+default_searcher = Searcher(transposition_table)
+
 '''
 Recursive function to find the best move
 '''
@@ -233,7 +510,8 @@ def find_move_NegaMax(gs,valid_moves,depth):
     if depth == 0: 
         return color * score_board(gs) 
     max_score = -CHECKMATE
-    r.shuffle(valid_moves)
+    if depth == DEPTH and rng is not None:
+        rng.shuffle(valid_moves)
     for move in valid_moves:
         gs.make_move(move)
         next_moves = gs.get_valid_moves()
@@ -248,38 +526,20 @@ def find_move_NegaMax(gs,valid_moves,depth):
 
 def find_move_NegaMax_alpha_beta(gs,valid_moves,depth, alpha, beta):
     '''
-    Function that will apply the negamax algorithm to simplify the coding of the minimax 
-    algorithm. The 'color' parameter will make the script alternate between each color.
-    color = 1 for the first player and -1 for the opponent. 
-    Negamax algorithm relies on the fact that max(player1) = -min(-player2).
-    Thus, simplify the implementation of the minimax algorithm
+    Thin wrapper of Searcher.negamax with the searcher of the module: the call with depth == DEPTH
+    is the root, its best move goes to next_move (the callers don't reduce the depth: ply = DEPTH - depth)
     '''
     global next_move
-    
-    color = 1 if gs.whiteToMove else -1
-    if depth == 0: 
-        return color * score_board(gs) 
-    max_score = -CHECKMATE
-    r.shuffle(valid_moves)
-    for move in valid_moves:
-        gs.make_move(move)
-        next_moves = gs.get_valid_moves()
-        score = - find_move_NegaMax_alpha_beta(gs,next_moves, depth-1, -beta, -alpha)
-        #we need to call beta instead of alpha to alternate their values.
-        if score > max_score:
-            max_score = score
-            if depth == DEPTH:  #when we have look for all the lower branches 
-                                #(depth 0, 1, ..., DEPTH)
-                next_move = move #THE best move to make
-        gs.undo_move()
-
-        if score > alpha:
-            alpha = score
-            if alpha >= beta:
-                break
-        
+    score = default_searcher.negamax(gs, valid_moves, depth, alpha, beta, DEPTH - depth)
+    if depth == DEPTH:
+        next_move = default_searcher.rootMove
+    return score
 
-    return max_score
+def find_move_quiescence(gs, alpha, beta):
+    '''
+    Thin wrapper of Searcher.quiescence with the searcher of the module
+    '''
+    return default_searcher.quiescence(gs, alpha, beta)
 
 def find_move_MinMax_alpha_beta(gs, valid_moves, depth, alpha, beta, whiteToMove):
     '''
@@ -349,44 +609,5 @@ def score_board(gs):
     elif gs.staleMate:
         return STALEMATE
 
-    #2) Evaluate the board
-    score = 0
-    #What is good for white is bad for black and what is good for black is bad for white
-    for row in range(len(gs.board)): #loop among the rows in the board
-        for col in range(len(gs.board[row])):  #loop in each col in a row
-            piece_type = gs.board[row][col][1] #letter of the piece
-            color_piece = gs.board[row][col][0]
-            if color_piece == 'w':
-                #we'll sum the pieceScore with the position weight of the piece
-                # !! use the white position matrix !!!
-                score += (pieceScore[piece_type] + pst_w[piece_type][row][col])
-            elif color_piece == 'b':
-                #we'll sum the pieceScore with the position weight of the piece
-                # !! use the black position matrix !!!
-                score -= (pieceScore[piece_type] + pst_b[piece_type][row][col])
-    
-    return score
-
-'''
-Score the board vased on the material
-'''
-def score_material(board):
-    '''
-    Score the board vased on the material
-    '''    
-    score = 0
-    #What is good for white is bad for black and what is good for black is bad for white
-    for row in range(len(board)): #loop among the rows in the board
-        for col in range(len(board[row])):  #loop in each col in a row
-            piece_type = board[row][col][1] #letter of the piece
-            color_piece = board[row][col][0]
-            if color_piece == 'w':
-                #we'll sum the pieceScore with the position weight of the piece
-                # !! use the white position matrix !!!
-                score += (pieceScore[piece_type] + pst_w[piece_type][row][col])
-            elif color_piece == 'b':
-                #we'll sum the pieceScore with the position weight of the piece
-                # !! use the black position matrix !!!
-                score -= (pieceScore[piece_type] + pst_b[piece_type][row][col])
-    
-    return score
+    #2) Evaluate the board: score_material of the position, kept up to date by make_move and undo_move
+    return gs.boardScore
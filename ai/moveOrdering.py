@@ -0,0 +1,75 @@
+"""
+MOVE ORDERING
+Alpha beta pruning cuts more branches when the best moves are searched first. The moves of a position
+are given in stages by gs.get_staged_moves (engine/stagedMoves.py) and this module gives the order
+inside the stages:
+    1) hash move : best move of the position in the transposition table
+    2) captures : Most Valuable Victim first, then Least Valuable Attacker (MVV-LVA), from pieceScore
+    3) promotions
+    4) killer moves : the 2 last quiet moves which caused a cutoff at the same ply
+    5) the other quiet moves : highest history first. The history (butterfly table) of a move is the sum
+       of depth * depth for each cutoff it caused, whatever the position (indexed by color, start
+       square and end square)
+"""
+from engine.stagedMoves import is_capture, is_promotion
+
+MAX_PLY = 64 #killer slots
+HISTORY_MAX = 1 << 20 #the history is halved when a move reaches it
+
+class MoveOrdering():
+    def __init__(self, piece_score, max_ply = MAX_PLY):
+        '''
+        piece_score : value of the pieces ({'p': 100, 'N': 280, ...}) for the MVV-LVA order
+        '''
+        self.pieceScore = piece_score
+        self.maxPly = max_ply
+        self.clear()
+
+    def clear(self):
+        '''
+        Forget the killers and the history (e.g. new game)
+        '''
+        self.killers = [[None, None] for _ in range(self.maxPly)]
+        self.history = [0] * (2 * 64 * 64)
+
+    def new_search(self):
+        '''
+        Called before each search: the killers belong to the previous search, the history is aged
+        '''
+        for killers in self.killers:
+            killers[0] = killers[1] = None
+        self.history = [value >> 1 for value in self.history]
+
+    def capture_key(self, move):
+        '''
+        MVV-LVA: the value of the captured piece first, then the cheapest attacker
+        (pieceScore < 65536, so the victim always decides)
+        '''
+        return self.pieceScore[move.pieceCaptured[1]] * 65536 - self.pieceScore[move.pieceMoved[1]]
+
+    def quiet_key(self, move):
+        return self.history[self.history_index(move)]
+
+    def history_index(self, move):
+        color = 0 if move.pieceMoved[0] == 'w' else 1
+        return ((color * 64 + move.startRow * 8 + move.startCol) << 6) + move.endRow * 8 + move.endCol
+
+    def killer_moves(self, ply):
+        return self.killers[ply] if ply < self.maxPly else ()
+
+    def add_cutoff(self, move, ply, depth):
+        '''
+        The move caused a beta cutoff 'depth' plies above the horizon: if it is a quiet move, it
+        becomes a killer of the ply and its history grows
+        '''
+        if is_capture(move) or is_promotion(move):
+            return #captures and promotions are already searched before the quiet moves
+        if ply < self.maxPly:
+            killers = self.killers[ply]
+            if killers[0] is None or killers[0].moveID != move.moveID:
+                killers[1] = killers[0]
+                killers[0] = move
+        index = self.history_index(move)
+        self.history[index] += depth * depth
+        if self.history[index] >= HISTORY_MAX:
+            self.history = [value >> 1 for value in self.history]
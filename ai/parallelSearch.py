@@ -0,0 +1,444 @@
+"""
+PARALLEL SEARCH
+The search is pure Python: threads don't make it faster (the GIL runs one of them at a time), so the
+parallel search uses processes. The tree is split at the root:
+    1) split_depth = 1 : each root move is a task
+    2) split_depth = n : each line of n moves is a task (more and smaller tasks, for many workers)
+Each worker process has its own GameState (rebuilt from the FEN and the moveIDs of the line) and its own
+Searcher (transposition table, killers, history), kept between the tasks and between the searches.
+
+The workers share the alpha bound of the root: the best score of a completed root move. A task starting
+after it is searched with that tighter window (a root move which can't beat alpha fails low quickly),
+so the root moves are sent best first (order of the previous iteration of the iterative deepening).
+With split_depth > 1, each root move also has a beta bound: the best reply of the opponent found so far.
+The scores of the lines are then backed up the split tree by the parent process (negamax), and the
+remaining lines of a root move are cancelled as soon as a reply refutes it (score < alpha: the score
+of a refuted root move is an upper bound, so on a tie the best move is the root move which set alpha),
+and its running lines stop at their next check of the limits.
+With shared_table, the workers probe and fill one SharedTranspositionTable instead of their own table.
+
+LAZY SMP
+LazySMPSearcher doesn't split the tree: every worker searches the whole position, all of them sharing
+one SharedTranspositionTable. The helpers search the moves of the root in another (random) order, so
+they fill the table with positions that the main worker will find there instead of searching them.
+"""
+import importlib
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from ai.chessAI import Searcher, SearchResult, SearchStopped, CHECKMATE, MAX_DEPTH, TT_SIZE_MB, pieceScore
+from ai.moveOrdering import MoveOrdering
+from ai.sharedTranspositionTable import SharedTranspositionTable
+
+POLL_SECONDS = 0.01 #the parent checks the limits and the stop event at this interval
+MAX_ROOT_MOVES = 256 #beta bounds shared with the workers (no position has more legal moves)
+
+#state of a worker process (set by _init_worker or _init_lazy_worker)
+_searcher = None
+_alpha = None
+_betas = None
+_refuted_roots = None
+_stop = None
+_search_id = None
+
+def _init_worker(alpha, betas, refuted_roots, stop, tt_size_mb, table = None):
+    '''
+    Initializer of a worker process: its searcher (with the shared table, or a table of its own),
+    and the bounds, refuted root moves and stop event of the parent
+    '''
+    global _searcher, _alpha, _betas, _refuted_roots, _stop
+    _searcher = Searcher(table, tt_size_mb, age_table = table is None)
+    _alpha = alpha
+    _betas = betas
+    _refuted_roots = refuted_roots
+    _stop = stop
+
+class _TaskStop():
+    """
+    Stop event of a task (read by Searcher.check_limits): the search is stopped, or the root move of
+    the line is refuted by another of its lines
+    """
+    def __init__(self, root_index):
+        self.rootIndex = root_index
+
+    def is_set(self):
+        return _stop.is_set() or _refuted_roots[self.rootIndex] != 0
+
+def _search_line(engine_name, fen, line, root_index, depth, search_id):
+    '''
+    Task of a worker: search of the position after the line of moves (moveIDs) from the root, at the
+    remaining depth. The window comes from the alpha bound of the root and the beta bound of the root
+    move (index root_index) at the start of the task.
+    Return (score for the side to move after the line, nodes, moveIDs of the principal variation of
+    the position), (None, nodes, []) if its root move is refuted, or None if the search is stopped
+    '''
+    global _search_id
+    if _refuted_roots[root_index]: #refuted while the task was queued
+        return None, 0, []
+    searcher = _searcher
+    if search_id != _search_id: #first task of a new search
+        _search_id = search_id
+        if searcher.ageTable: #a shared table is aged by the parent (ParallelSearcher.search)
+            searcher.table.new_search()
+        searcher.moveOrdering.new_search()
+    gs = importlib.import_module(engine_name).GameState.from_fen(fen)
+    for move_id in line:
+        for move in gs.get_valid_moves():
+            if move.moveID == move_id:
+                gs.make_move(move)
+                break
+        else:
+            raise ValueError("move " + str(move_id) + " not found")
+    alpha, beta = _alpha.value, _betas[root_index]
+    if len(line) % 2 == 0: #same side to move as the root
+        window = (alpha, beta)
+    else:
+        window = (-beta, -alpha)
+    searcher.rootMove = None
+    searcher.rng = None
+    searcher.pvMoves = {}
+    searcher.nodes = 0
+    searcher.stopTime = searcher.maxNodes = None
+    searcher.stopEvent = _TaskStop(root_index)
+    remaining = depth - len(line)
+    try:
+        score = searcher.negamax(gs, None, remaining, *window, len(line)) #below the root: ply = len(line)
+    except SearchStopped:
+        return None if _stop.is_set() else (None, searcher.nodes, [])
+    pv = searcher.get_principal_variation(gs, searcher.table.best_move(gs.zobristKey), remaining)
+    return score, searcher.nodes, [move.moveID for move in pv]
+
+def _init_lazy_worker(table, stop):
+    '''
+    Initializer of a Lazy SMP worker process: its searcher with the shared table, and the stop event
+    '''
+    global _searcher, _stop
+    _searcher = Searcher(table, age_table = False) #the table is aged by the parent (LazySMPSearcher.search)
+    _stop = stop
+
+def _lazy_search(engine_name, fen, root_ids, depth, time_limit, node_limit, helper):
+    '''
+    Task of a Lazy SMP worker: search of the whole position (root moves given by their moveIDs, None
+    for all), the helpers (helper > 0) shuffling the moves of the root
+    Return (moveID of the best move or None, score, moveIDs of the principal variation, depth, nodes)
+    '''
+    gs = importlib.import_module(engine_name).GameState.from_fen(fen)
+    valid_moves = gs.get_valid_moves()
+    if root_ids is not None:
+        valid_moves = [move for move in valid_moves if move.moveID in root_ids]
+    result = _searcher.search(gs, valid_moves, depth, helper if helper > 0 else None, time_limit, node_limit, _stop)
+    return (result.move.moveID if result.move is not None else None, result.score,
+            [move.moveID for move in result.pv], result.depth, result.nodes)
+
+def _moves_from_ids(gs, move_ids):
+    '''
+    Valid moves of the line of moveIDs from the position (up to the first one which is not valid)
+    '''
+    line = []
+    for move_id in move_ids:
+        for move in gs.get_valid_moves():
+            if move.moveID == move_id:
+                line.append(move)
+                gs.make_move(move)
+                break
+        else:
+            break
+    for _ in line:
+        gs.undo_move()
+    return line
+
+def _split_tree(gs, line, plies, capture_key):
+    '''
+    Split tree of the position: (line, children), the lines of 'plies' moves (or ending with a
+    checkmate or a stalemate) being the leaves, searched by the workers. The moves are in the staged
+    order (captures first), so that a refutation is likely to be found early.
+    '''
+    children = []
+    if plies > 0:
+        for move in gs.get_staged_moves(capture_key = capture_key):
+            gs.make_move(move)
+            children.append(_split_tree(gs, line + (move.moveID,), plies - 1, capture_key))
+            gs.undo_move()
+    return line, children
+
+def _leaves(node):
+    line, children = node
+    if not children:
+        yield line
+    for child in children:
+        yield from _leaves(child)
+
+def _node_score(node, scores, refuted):
+    '''
+    Score of a node of the split tree for the side to move at the root, None if its leaves are not
+    all searched. A refuted root move takes the score of its refutation (it can't beat alpha).
+    '''
+    line, children = node
+    if not children:
+        return scores.get(line)
+    child_scores = [_node_score(child, scores, refuted) for child in children]
+    if len(line) % 2 == 0: #the side of the root chooses
+        return None if None in child_scores else max(child_scores)
+    known = [score for score in child_scores if score is not None]
+    if len(known) < len(child_scores):
+        return min(known) if line in refuted else None
+    return min(child_scores)
+
+class ParallelSearcher():
+    """
+    Root-parallel search in a pool of worker processes, with the interface of Searcher.search
+    """
+    def __init__(self, workers = None, split_depth = 1, tt_size_mb = TT_SIZE_MB, shared_table = False):
+        '''
+        workers : number of processes (default: the number of cores)
+        split_depth : length of the lines searched by the workers (1: root moves)
+        tt_size_mb : memory cap of the transposition table of each worker, or of the shared table
+        shared_table : the workers share one SharedTranspositionTable
+        '''
+        self.workers = workers if workers is not None else os.cpu_count()
+        self.splitDepth = max(1, split_depth)
+        self.table = SharedTranspositionTable(tt_size_mb) if shared_table else None
+        #bounds of the root (for the side to move at the root) read by the workers: alpha, and beta of
+        # each root move
+        self.alpha = multiprocessing.Value('i', -CHECKMATE)
+        self.betas = multiprocessing.Array('i', MAX_ROOT_MOVES)
+        self.refutedRoots = multiprocessing.Array('b', MAX_ROOT_MOVES) #1: the running lines of the root move stop
+        self.stop = multiprocessing.Event() #set to stop the tasks of the workers
+        self.pool = ProcessPoolExecutor(max_workers = self.workers, initializer = _init_worker,
+                                        initargs = (self.alpha, self.betas, self.refutedRoots, self.stop, tt_size_mb,
+                                                    self.table))
+        self.moveOrdering = MoveOrdering(pieceScore) #order of the lines of the split tree
+        self.searchID = 0
+        self.nodes = 0
+        self.principalVariation = []
+
+    def close(self):
+        '''
+        Stop the worker processes (and remove the shared table)
+        '''
+        self.pool.shutdown()
+        if self.table is not None:
+            self.table.close()
+
+    def clear(self):
+        '''
+        Remove the entries of the shared table (e.g. new game)
+        '''
+        if self.table is not None:
+            self.table.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def search(self, gs, valid_moves = None, depth = MAX_DEPTH, time_limit = None, node_limit = None,
+               stop_event = None):
+        '''
+        Best move of the position -> SearchResult, with iterative deepening as Searcher.search (each
+        iteration sends the root moves best first). The position of gs is not changed.
+            stop_event : threading.Event to cancel the search from another thread
+        '''
+        start_time = time.perf_counter()
+        self.searchID += 1
+        if self.table is not None: #once for all the workers
+            self.table.new_search()
+        self.nodes = 0
+        self.principalVariation = []
+        engine_name = type(gs).__module__
+        fen = gs.to_fen()
+        root_moves = list(valid_moves) if valid_moves is not None else gs.get_valid_moves()
+        best_move, best_score, completed_depth = None, 0, 0
+        for iteration_depth in range(1, depth + 1):
+            limited = completed_depth > 0 #the first iteration is always completed (unless cancelled)
+            stop_time = start_time + time_limit if limited and time_limit is not None else None
+            max_nodes = node_limit if limited else None
+            tree = self.split_root(gs, root_moves, min(self.splitDepth, iteration_depth))
+            scores, pvs, refuted, alpha_line, completed = self.search_tree(engine_name, fen, tree, iteration_depth,
+                                                                           stop_time, max_nodes, stop_event)
+            if not completed:
+                break
+            root_scores = [_node_score(child, scores, refuted) for child in tree[1]]
+            #on a tie, the root move which set alpha (its score is exact, the others may be upper bounds)
+            best_index = max(range(len(root_scores)), key = lambda index: (root_scores[index],
+                                                                           tree[1][index][0] == alpha_line))
+            best_move, best_score, completed_depth = root_moves[best_index], root_scores[best_index], iteration_depth
+            self.principalVariation = self.get_principal_variation(gs, tree[1][best_index], scores, pvs)
+            order = sorted(range(len(root_moves)), key = lambda index: root_scores[index], reverse = True)
+            root_moves = [root_moves[index] for index in order] #best first for the next iteration
+
+            if abs(best_score) >= CHECKMATE: #checkmate found: deeper is useless
+                break
+            if (time_limit is not None and time.perf_counter() >= start_time + time_limit) or \
+               (node_limit is not None and self.nodes >= node_limit):
+                break
+
+        return SearchResult(best_move, best_score, list(self.principalVariation), completed_depth, self.nodes,
+                            time.perf_counter() - start_time)
+
+    def split_root(self, gs, root_moves, plies):
+        '''
+        Split tree of the root, its children in the order of root_moves
+        '''
+        children = []
+        for move in root_moves:
+            gs.make_move(move)
+            children.append(_split_tree(gs, (move.moveID,), plies - 1, self.moveOrdering.capture_key))
+            gs.undo_move()
+        return (), children
+
+    def search_tree(self, engine_name, fen, tree, depth, stop_time, max_nodes, stop_event):
+        '''
+        Search of the leaves of the split tree by the workers
+        Return ({line: score for the side to move at the root}, {line: moveIDs of its principal
+        variation}, {refuted root moves}, root move which set alpha, True if the iteration is completed)
+        '''
+        self.alpha.value = -CHECKMATE
+        alpha_line = None
+        root_indexes = {}
+        replies = {} #nodes of the replies to the root moves (the beta bounds come from them)
+        for index, child in enumerate(tree[1]):
+            root_indexes[child[0]] = index
+            self.betas[index] = CHECKMATE
+            self.refutedRoots[index] = 0
+            for reply in child[1]:
+                replies[reply[0]] = reply
+        self.stop.clear()
+        futures = {}
+        for line in _leaves(tree):
+            futures[self.pool.submit(_search_line, engine_name, fen, line, root_indexes[line[:1]], depth,
+                                     self.searchID)] = line
+        root_children = {child[0]: child for child in tree[1]}
+        scores, pvs, refuted = {}, {}, set()
+        stopped = False
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout = POLL_SECONDS, return_when = FIRST_COMPLETED)
+            for future in done:
+                if future.cancelled():
+                    continue
+                result = future.result()
+                if result is None:
+                    stopped = True
+                    continue
+                line = futures[future]
+                score, nodes, pv = result
+                self.nodes += nodes
+                if score is None: #stopped by the refutation of its root move
+                    continue
+                scores[line] = score if len(line) % 2 == 0 else -score
+                pvs[line] = pv
+                root_line = line[:1]
+                index = root_indexes[root_line]
+                reply_score = _node_score(replies[line[:2]], scores, ()) if len(line) >= 2 else None
+                if reply_score is not None and root_line not in refuted:
+                    if reply_score < self.alpha.value:
+                        #the reply refutes the root move (strictly: its score is only an upper bound, which
+                        # must not tie with alpha): its other lines are useless, the running ones stop too
+                        refuted.add(root_line)
+                        self.refutedRoots[index] = 1
+                        for other in pending:
+                            if futures[other][:1] == root_line:
+                                other.cancel()
+                    elif reply_score < self.betas[index]:
+                        self.betas[index] = reply_score #best reply so far
+                root_score = _node_score(root_children[root_line], scores, refuted)
+                if root_score is not None and root_score > self.alpha.value:
+                    self.alpha.value = root_score #tighter window for the next tasks
+                    alpha_line = root_line
+            if not stopped and ((stop_event is not None and stop_event.is_set()) or
+                                (stop_time is not None and time.perf_counter() >= stop_time) or
+                                (max_nodes is not None and self.nodes >= max_nodes)):
+                stopped = True
+            if stopped:
+                self.stop.set()
+                for future in pending:
+                    future.cancel()
+        return scores, pvs, refuted, alpha_line, not stopped
+
+    def get_principal_variation(self, gs, node, scores, pvs):
+        '''
+        Best line from the node of the best root move: the lines of the split tree which give its score,
+        then the principal variation of the worker which searched the last one
+        '''
+        while node[1]:
+            line, children = node
+            child_scores = [_node_score(child, scores, ()) for child in children]
+            known = [score for score in child_scores if score is not None]
+            best = max(known) if len(line) % 2 == 0 else min(known)
+            node = children[child_scores.index(best)]
+        return _moves_from_ids(gs, list(node[0]) + pvs.get(node[0], []))
+
+class LazySMPSearcher():
+    """
+    Lazy SMP search in a pool of worker processes sharing one transposition table, with the interface
+    of Searcher.search
+    """
+    def __init__(self, workers = None, tt_size_mb = TT_SIZE_MB):
+        '''
+        workers : number of processes, the main worker and workers - 1 helpers (default: the number of cores)
+        tt_size_mb : memory cap of the shared transposition table
+        '''
+        self.workers = workers if workers is not None else os.cpu_count()
+        self.table = SharedTranspositionTable(tt_size_mb)
+        self.stop = multiprocessing.Event() #set to stop the helpers when the main worker is done
+        self.pool = ProcessPoolExecutor(max_workers = self.workers, initializer = _init_lazy_worker,
+                                        initargs = (self.table, self.stop))
+        self.nodes = 0
+        self.principalVariation = []
+
+    def close(self):
+        '''
+        Stop the worker processes and remove the shared table
+        '''
+        self.pool.shutdown()
+        self.table.close()
+
+    def clear(self):
+        '''
+        Remove the entries of the shared table (e.g. new game)
+        '''
+        self.table.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def search(self, gs, valid_moves = None, depth = MAX_DEPTH, time_limit = None, node_limit = None,
+               stop_event = None):
+        '''
+        Best move of the position -> SearchResult: the result of the worker which completed the deepest
+        iteration (the main worker if several did). The search ends with the search of the main worker.
+            valid_moves : moves of the root (default: all the valid moves)
+            stop_event : threading.Event to cancel the search from another thread
+        '''
+        start_time = time.perf_counter()
+        engine_name = type(gs).__module__
+        fen = gs.to_fen()
+        root_ids = [move.moveID for move in valid_moves] if valid_moves is not None else None
+        self.table.new_search() #once for all the workers
+        self.stop.clear()
+        futures = [self.pool.submit(_lazy_search, engine_name, fen, root_ids, depth, time_limit, node_limit, helper)
+                   for helper in range(self.workers)]
+        main = futures[0]
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout = POLL_SECONDS, return_when = FIRST_COMPLETED)
+            if main.done() or (stop_event is not None and stop_event.is_set()):
+                self.stop.set()
+        results = [future.result() for future in futures]
+        self.nodes = sum(result[4] for result in results)
+        best = max(results, key = lambda result: result[3]) #max keeps the first (main) of the deepest
+        move_id, score, pv, completed_depth, _ = best
+        self.principalVariation = _moves_from_ids(gs, pv)
+        best_move = None
+        for move in (valid_moves if valid_moves is not None else gs.get_valid_moves()):
+            if move.moveID == move_id:
+                best_move = move
+        return SearchResult(best_move, score, list(self.principalVariation), completed_depth, self.nodes,
+                            time.perf_counter() - start_time)
@@ -0,0 +1,135 @@
+"""
+SHARED TRANSPOSITION TABLE
+Transposition table (see ai/transpositionTable.py) in a block of shared memory (multiprocessing.shared_memory),
+so that several search processes on the same position probe and fill the same table: what a process has
+searched is known by the others (Lazy SMP, see ai/parallelSearch.py).
+
+The table is a fixed array of entries of 2 unsigned 64-bit words:
+    1) key ^ data : Zobrist key of the position XOR the second word
+    2) data : packed move (moveID), score, depth, bound and age
+          bits 0-15 : moveID of the best move (0: no move)
+          bits 16-33 : score + SCORE_OFFSET
+          bits 34-41 : depth
+          bits 42-43 : bound (EXACT, LOWER, UPPER)
+          bits 44-51 : age of the search which stored the entry
+The processes write without lock: if 2 processes write the same entry at the same time, the words of
+one may be mixed with the words of the other, and then the first word XOR the second is not the key of
+either position anymore. A probe only accepts an entry whose 2 words give back the key, so a torn
+entry is a miss.
+The slots are grouped by 2 as in TranspositionTable (depth-preferred slot, always replace slot). The
+first word of the block is the age of the table, shared by the processes.
+"""
+from multiprocessing import shared_memory, resource_tracker
+
+from ai.transpositionTable import EXACT, DEFAULT_SIZE_MB
+
+ENTRY_BYTES = 16
+SCORE_OFFSET = 1 << 17 #scores from -SCORE_OFFSET to SCORE_OFFSET - 1 (CHECKMATE = 99999)
+
+class HashMove():
+    """
+    Best move of an entry, rebuilt from its moveID: it has the squares and the moveID of the move,
+    enough for the engines to find the valid move of the position (get_staged_moves)
+    """
+    __slots__ = ('startRow', 'startCol', 'endRow', 'endCol', 'moveID')
+
+    def __init__(self, move_id):
+        self.startRow = move_id // 1000
+        self.startCol = move_id // 100 % 10
+        self.endRow = move_id // 10 % 10
+        self.endCol = move_id % 10
+        self.moveID = move_id
+
+class SharedTranspositionTable():
+    def __init__(self, size_mb = DEFAULT_SIZE_MB, name = None):
+        '''
+        size_mb : memory cap of the table (the number of slots is rounded down to a power of 2)
+        name : name of the shared memory of an existing table to attach to, None to create a new table
+               (the process which creates the table removes it with close())
+        '''
+        buckets = max(1, int(size_mb * 1024 * 1024) // (2 * ENTRY_BYTES))
+        self.buckets = 1 << (buckets.bit_length() - 1) #power of 2 -> index = key & mask
+        self.mask = self.buckets - 1
+        self.sizeMB = size_mb
+        size = ENTRY_BYTES * 2 * self.buckets + 8
+        self.owner = name is None
+        if self.owner:
+            self.memory = shared_memory.SharedMemory(create = True, size = size) #filled with zeros: empty
+        else:
+            self.memory = shared_memory.SharedMemory(name = name)
+            #only the owner removes the memory (the resource tracker would remove it when this process ends)
+            resource_tracker.unregister(self.memory._name, 'shared_memory')
+        self.name = self.memory.name
+        self.words = self.memory.buf.cast('Q')
+        self.hits = 0
+        self.stores = 0
+
+    def __reduce__(self):
+        #another process (spawn) attaches to the same memory
+        return (SharedTranspositionTable, (self.sizeMB, self.name))
+
+    def close(self):
+        '''
+        Detach from the shared memory, removed if this table created it
+        '''
+        self.words.release()
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+    def clear(self):
+        '''
+        Remove all the entries (e.g. new game), for every process
+        '''
+        self.memory.buf[:] = bytes(len(self.memory.buf))
+        self.hits = 0
+        self.stores = 0
+
+    def new_search(self):
+        '''
+        Called before each search: the deep entries of the previous searches can now be replaced
+        '''
+        self.words[0] = (self.words[0] + 1) & 0xFF
+
+    def probe(self, key):
+        '''
+        (depth, score, bound, move) of the position, None if it is not in the table
+        '''
+        words = self.words
+        index = ((key & self.mask) << 2) + 1
+        data = words[index + 1]
+        if data == 0 or words[index] ^ data != key:
+            index += 2
+            data = words[index + 1]
+            if data == 0 or words[index] ^ data != key:
+                return None
+        self.hits += 1
+        move_id = data & 0xFFFF
+        return (data >> 34 & 0xFF, (data >> 16 & 0x3FFFF) - SCORE_OFFSET, data >> 42 & 0x3,
+                HashMove(move_id) if move_id else None)
+
+    def store(self, key, depth, score, bound, move):
+        '''
+        Save the result of the search of a position
+        '''
+        words = self.words
+        age = words[0]
+        index = ((key & self.mask) << 2) + 1
+        data = words[index + 1]
+        same_key = data != 0 and words[index] ^ data == key
+        if not (depth >= (data >> 34 & 0xFF) or (data >> 44 & 0xFF) != age or (bound == EXACT and same_key)):
+            index += 2 #always replace slot (same rule as TranspositionTable.store)
+            data = words[index + 1]
+            same_key = data != 0 and words[index] ^ data == key
+        move_id = move.moveID if move is not None else (data & 0xFFFF if same_key else 0)
+        data = move_id | (score + SCORE_OFFSET) << 16 | min(depth, 0xFF) << 34 | bound << 42 | age << 44
+        words[index] = key ^ data
+        words[index + 1] = data
+        self.stores += 1
+
+    def best_move(self, key):
+        '''
+        Hash move of the position, None if there is none
+        '''
+        entry = self.probe(key)
+        return entry[3] if entry is not None else None
@@ -0,0 +1,93 @@
+"""
+TRANSPOSITION TABLE
+The same position is often reached by different move orders (transpositions). The table remembers
+the result of the search of a position, found back with the Zobrist key of the game state
+(gs.zobristKey), so that the search doesn't expand it again.
+
+Each entry stores:
+    1) key : Zobrist key of the position (2 positions can share the same slot)
+    2) depth : depth of the search below the position
+    3) score : score for the side to move (negamax)
+    4) bound : EXACT (alpha < score < beta), LOWER (score >= beta, cutoff) or UPPER (score <= alpha)
+    5) move : best move found, searched first the next time (hash move)
+
+The table has a fixed number of slots, from a memory cap in MB. The slots are grouped by 2 (two-tier):
+the first slot keeps the deepest search (replaced by a search at least as deep, by an EXACT score of
+the same position, or by any search when it comes from a previous move of the game), the second one
+always takes the other new entries. A shallower bound of the position in the first slot goes to the
+second slot: the probe still finds the deeper result first.
+"""
+
+EXACT, LOWER, UPPER = 0, 1, 2
+ENTRY_BYTES = 100 #approximate memory of one entry in Python (slots of the lists, key and score objects)
+DEFAULT_SIZE_MB = 16
+
+class TranspositionTable():
+    def __init__(self, size_mb = DEFAULT_SIZE_MB):
+        '''
+        size_mb : memory cap of the table (the number of slots is rounded down to a power of 2)
+        '''
+        buckets = max(1, int(size_mb * 1024 * 1024) // (2 * ENTRY_BYTES))
+        self.buckets = 1 << (buckets.bit_length() - 1) #power of 2 -> index = key & mask
+        self.mask = self.buckets - 1
+        self.sizeMB = size_mb
+        self.clear()
+
+    def clear(self):
+        '''
+        Remove all the entries (e.g. new game)
+        '''
+        slots = 2 * self.buckets
+        self.keys = [None] * slots
+        self.depths = [0] * slots
+        self.scores = [0] * slots
+        self.bounds = [EXACT] * slots
+        self.moves = [None] * slots
+        self.ages = [0] * slots
+        self.age = 0
+        self.hits = 0
+        self.stores = 0
+
+    def new_search(self):
+        '''
+        Called before each search: the deep entries of the previous searches can now be replaced
+        '''
+        self.age += 1
+
+    def probe(self, key):
+        '''
+        (depth, score, bound, move) of the position, None if it is not in the table
+        '''
+        index = (key & self.mask) << 1
+        keys = self.keys
+        if keys[index] != key:
+            index += 1
+            if keys[index] != key:
+                return None
+        self.hits += 1
+        return self.depths[index], self.scores[index], self.bounds[index], self.moves[index]
+
+    def store(self, key, depth, score, bound, move):
+        '''
+        Save the result of the search of a position
+        '''
+        index = (key & self.mask) << 1
+        if not (depth >= self.depths[index] or self.ages[index] != self.age or
+                (bound == EXACT and self.keys[index] == key)):
+            index += 1 #always replace slot
+        if move is None and self.keys[index] == key:
+            move = self.moves[index] #keep the previous best move of the position
+        self.keys[index] = key
+        self.depths[index] = depth
+        self.scores[index] = score
+        self.bounds[index] = bound
+        self.moves[index] = move
+        self.ages[index] = self.age
+        self.stores += 1
+
+    def best_move(self, key):
+        '''
+        Hash move of the position, None if there is none
+        '''
+        entry = self.probe(key)
+        return entry[3] if entry is not None else None
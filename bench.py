@@ -0,0 +1,137 @@
+"""
+BENCH
+Time of the AI search on a set of positions, sequential (Searcher) and parallel (ParallelSearcher or
+LazySMPSearcher) with more and more worker processes, to measure the speedup of the parallel search
+versus the core count.
+
+    python bench.py                                  #depth 4, 1, 2, 4, ... workers up to the core count
+    python bench.py --depth 5 --workers 1,2,4,8,16   #given worker counts
+    python bench.py --split-depth 2                  #lines of 2 moves sent to the workers
+    python bench.py --shared-table                   #the workers share one transposition table
+    python bench.py --lazy-smp                       #Lazy SMP: every worker searches the whole position
+    python bench.py --fen "<FEN>" --engine C         #one position, with 'engine.ChessEngineC'
+    python bench.py --pruning                        #nodes saved by each technique of the selective search
+
+The speedup of a worker count is the time of the sequential search divided by its time, the efficiency
+is the speedup per worker.
+"""
+import argparse
+import os
+import sys
+import time
+
+from ai.chessAI import Searcher
+from ai.parallelSearch import ParallelSearcher, LazySMPSearcher
+from perft import ENGINES, DEFAULT_ENGINE, REFERENCE_POSITIONS, load_engine, new_game, nodes_per_second
+
+BENCH_POSITIONS = [(name, fen) for name, fen, _ in REFERENCE_POSITIONS[:5]]
+
+def default_workers():
+    '''
+    1, 2, 4, ... up to the number of cores (included)
+    '''
+    cores = os.cpu_count() or 1
+    workers = [1]
+    while workers[-1] * 2 < cores:
+        workers.append(workers[-1] * 2)
+    if workers[-1] != cores:
+        workers.append(cores)
+    return workers
+
+def run_searches(search, engine, positions, depth):
+    '''
+    search(gs, depth) -> SearchResult on every position, return ([best move notation], nodes, seconds)
+    '''
+    moves, nodes, seconds = [], 0, 0.0
+    for _, fen in positions:
+        gs = new_game(engine, fen)
+        start = time.perf_counter()
+        result = search(gs, depth)
+        seconds += time.perf_counter() - start
+        nodes += result.nodes
+        moves.append(result.move.get_chess_notation() if result.move is not None else None)
+    return moves, nodes, seconds
+
+def run_bench(engine_name, positions, depth, workers_list, split_depth=1, shared_table=False, lazy_smp=False):
+    '''
+    Print the time, nodes and speedup of the sequential search and of the parallel search with each
+    worker count (the best moves are shown when they are not the ones of the sequential search: the
+    moves of equal score can be searched in another order)
+    '''
+    engine = load_engine(engine_name)
+    print("cores: " + str(os.cpu_count()))
+    print("{:<12}{:>12}{:>10}{:>12}{:>10}{:>12}".format("workers", "nodes", "time", "nodes/s", "speedup", "efficiency"))
+    searcher = Searcher()
+    reference_moves, nodes, reference_seconds = run_searches(lambda gs, depth: searcher.search(gs, depth = depth),
+                                                             engine, positions, depth)
+    print("{:<12}{:>12}{:>10.2f}{:>12}{:>10.2f}{:>12}".format("sequential", nodes, reference_seconds,
+          nodes_per_second(nodes, reference_seconds), 1.0, ""))
+    for workers in workers_list:
+        if lazy_smp:
+            parallel_searcher = LazySMPSearcher(workers)
+        else:
+            parallel_searcher = ParallelSearcher(workers, split_depth, shared_table = shared_table)
+        with parallel_searcher:
+            run_searches(lambda gs, depth: parallel_searcher.search(gs, depth = 1), engine, positions[:1], 1) #start the processes
+            moves, nodes, seconds = run_searches(lambda gs, depth: parallel_searcher.search(gs, depth = depth),
+                                                 engine, positions, depth)
+        speedup = reference_seconds / seconds if seconds > 0 else 0.0
+        print("{:<12}{:>12}{:>10.2f}{:>12}{:>10.2f}{:>12.2f}{}".format(workers, nodes, seconds,
+              nodes_per_second(nodes, seconds), speedup, speedup / workers,
+              "" if moves == reference_moves else "  (other moves: " + " ".join(map(str, moves)) + ")"))
+
+#(name, null move, futility pruning, late move reductions) of the selective search
+PRUNING_CONFIGURATIONS = [
+    ("full width", False, False, False),
+    ("null move", True, False, False),
+    ("futility", False, True, False),
+    ("LMR", False, False, True),
+    ("all", True, True, True),
+]
+
+def run_pruning(engine_name, positions, depth):
+    '''
+    Print the nodes and time of the sequential search without selective search, with each technique
+    alone and with all of them, and the nodes saved compared to the full width search
+    '''
+    engine = load_engine(engine_name)
+    print("{:<12}{:>12}{:>10}{:>12}{:>10}".format("search", "nodes", "time", "nodes/s", "saved"))
+    full_width_nodes = None
+    for name, null_move, futility_pruning, late_move_reductions in PRUNING_CONFIGURATIONS:
+        def search(gs, depth):
+            searcher = Searcher(null_move = null_move, futility_pruning = futility_pruning,
+                                late_move_reductions = late_move_reductions)
+            return searcher.search(gs, depth = depth)
+        moves, nodes, seconds = run_searches(search, engine, positions, depth)
+        if full_width_nodes is None:
+            full_width_nodes = nodes
+        print("{:<12}{:>12}{:>10.2f}{:>12}{:>9.1f}%  {}".format(name, nodes, seconds, nodes_per_second(nodes, seconds),
+              100.0 * (full_width_nodes - nodes) / full_width_nodes if full_width_nodes else 0.0,
+              " ".join(map(str, moves))))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bench: speedup of the parallel AI search versus the number of workers")
+    parser.add_argument("--engine", default=DEFAULT_ENGINE,
+                        help="'A', 'B', 'C' or the module of an engine (default: %(default)s)")
+    parser.add_argument("--fen", help="position to search (default: the bench positions)")
+    parser.add_argument("--depth", type=int, default=4, help="depth of the searches (default: %(default)s)")
+    parser.add_argument("--workers", help="comma separated worker counts (default: 1, 2, 4, ... up to the core count)")
+    parser.add_argument("--split-depth", type=int, default=1,
+                        help="length of the lines searched by the workers (default: %(default)s)")
+    parser.add_argument("--shared-table", action="store_true", help="the workers share one transposition table")
+    parser.add_argument("--lazy-smp", action="store_true", help="Lazy SMP search instead of the split of the root")
+    parser.add_argument("--pruning", action="store_true",
+                        help="compare the techniques of the selective search (sequential search only)")
+    args = parser.parse_args(argv)
+
+    workers_list = [int(workers) for workers in args.workers.split(",")] if args.workers else default_workers()
+    positions = [("fen", args.fen)] if args.fen is not None else BENCH_POSITIONS
+    print("engine: " + ENGINES.get(args.engine, args.engine))
+    if args.pruning:
+        run_pruning(args.engine, positions, args.depth)
+        return 0
+    run_bench(args.engine, positions, args.depth, workers_list, args.split_depth, args.shared_table, args.lazy_smp)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
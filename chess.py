@@ -2,11 +2,14 @@
 This is our main driver file.
 
 I will be responsible for handling user input and displaying the current Gamestate object.
-Two ChessEngine has been developped:
+Three ChessEngine has been developped:
     * ChessEngineA : a ChessEngine Advanced
     * ChessEngineB : a more simple Chess Engine
+    * ChessEngineC : a bitboard Chess Engine, with the same interface as ChessEngineA
 """
 import random as r
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import pygame as p
 import engine.ChessEngineA as ChessEngine
 import ai.chessAI as ChessAI
@@ -15,6 +18,8 @@ WIDTH = HEIGHT = 512 #HEIGHT of the game
 DIMENSION = 8 #dimension of a chess board are 8x8
 SQ_SIZE = HEIGHT // DIMENSION
 MAX_FPS = 15 #for animation later on
+AI_TIME_LIMIT = 5 #maximum seconds of thinking for a move of the AI (None: always search to DEPTH)
+AI_PONDER = True #the AI keeps thinking while the human player thinks (see start_AI_search)
 IMAGES = {}
 
 
@@ -61,6 +66,10 @@ def main(P_WHITE, P_BLACK, DEPTH):
     playerOne = P_WHITE    # If a Human is playing -> White, then this will be True.
                         # IF an AI is playing, then False
     playerTwo = P_BLACK # Same as above but for black
+    #the AI searches in a worker thread, so that the window keeps responding while it thinks
+    AI_executor = ThreadPoolExecutor(max_workers = 1)
+    AI_searcher = ChessAI.Searcher() #tables and limits of the AI, kept between its moves
+    AI_search = None #(future of the search result, event to stop the search, expected reply) while the AI is thinking
 
 
     while running: 
@@ -102,11 +111,13 @@ def main(P_WHITE, P_BLACK, DEPTH):
             #key handler
             elif e.type == p.KEYDOWN:
                 if e.key == p.K_z: #undo when 'z' is pressed
+                    AI_search = stop_AI_search(AI_search)
                     gs.undo_move()               
                     move_made = True
                     animate = False
                     game_over = False
                 if e.key == p.K_r: #reset the board when r is pressed
+                    AI_search = stop_AI_search(AI_search)
                     gs = ChessEngine.GameState() #reinitialise the gameState
                     valid_moves = gs.get_valid_moves()
                     sq_selected = ()
@@ -117,15 +128,32 @@ def main(P_WHITE, P_BLACK, DEPTH):
 
         #AI MOVE (ARTIFICIAL INTELLIGENCE FOR MY CHESS GAME)
         if not game_over and not human_turn: #AI play black 
-            AI_valid_moves = gs.get_valid_moves()
-            AI_move = ChessAI.find_best_moves(gs, AI_valid_moves, DEPTH) 
-            if AI_move is None: #IF no best move
-                turn_color = 'white' if gs.whiteToMove else 'black'
-                print(turn_color ," -> random move made")                 
-                AI_move = ChessAI.find_random_move(valid_moves)
-            gs.make_move(AI_move)
-            move_made = True 
-            animate = True
+            if AI_search is not None and AI_search[2] is not None: #the AI was pondering
+                if gs.moveLog and gs.moveLog[-1].moveID == AI_search[2]: #ponder hit: go on with this search
+                    AI_searcher.ponder_hit()
+                    AI_search = (AI_search[0], AI_search[1], None)
+                else: #ponder miss: only the transposition table entries of the search are kept
+                    AI_search = stop_AI_search(AI_search)
+            if AI_search is None: #start the search, the game loop goes on while it runs
+                AI_search = start_AI_search(AI_executor, AI_searcher, gs, DEPTH)
+            elif AI_search[0].done(): #poll the search
+                AI_result = AI_search[0].result()
+                AI_move = AI_result.move
+                AI_search = None
+                if AI_move is None: #IF no best move
+                    turn_color = 'white' if gs.whiteToMove else 'black'
+                    print(turn_color ," -> random move made")                 
+                    AI_move = ChessAI.find_random_move(valid_moves)
+                for move in valid_moves: #the move of the search copy -> same move on the game board
+                    if move.moveID == AI_move.moveID:
+                        gs.make_move(move)
+                        break
+                move_made = True 
+                animate = True
+                human_next = (gs.whiteToMove and playerOne) or (not gs.whiteToMove and playerTwo)
+                if AI_PONDER and human_next and len(AI_result.pv) >= 2:
+                    #think on the human's time, expecting the reply of the principal variation
+                    AI_search = start_AI_search(AI_executor, AI_searcher, gs, DEPTH, AI_result.pv[1])
 
         # FOR THE DRAWING BOARD PART
         if move_made:
@@ -147,10 +175,49 @@ def main(P_WHITE, P_BLACK, DEPTH):
         elif gs.staleMate:            
             game_over = True
             draw_text(screen, 'Stalemate')        
+        if game_over and AI_search is not None: #no reply to ponder on
+            AI_search = stop_AI_search(AI_search)
 
         clock.tick(MAX_FPS) # means that for every second at most MAX_FPS frames should pass
         p.display.flip()    # display.flip() will update the contents of the entire display
 
+    stop_AI_search(AI_search)
+    AI_executor.shutdown()
+
+'''
+Search of the AI in the background
+'''
+def start_AI_search(executor, searcher, gs, DEPTH, expected_reply = None):
+    '''
+    Start the search of the AI move in the executor, on a copy of the position (the game can go on)
+    With expected_reply (move of the human player), the AI ponders: it searches the position after
+    that reply while the human player thinks, without time limit until searcher.ponder_hit()
+    Return (future of the ChessAI.SearchResult, event to stop the search, moveID of the expected reply or None)
+    '''
+    search_gs = ChessEngine.GameState.from_fen(gs.to_fen())
+    if expected_reply is not None:
+        for move in search_gs.get_valid_moves():
+            if move.moveID == expected_reply.moveID:
+                search_gs.make_move(move)
+                break
+        else:
+            return None
+    stop_event = threading.Event()
+    future = executor.submit(searcher.search, search_gs, search_gs.get_valid_moves(), DEPTH,
+                             time_limit = AI_TIME_LIMIT, stop_event = stop_event, ponder = expected_reply is not None)
+    return future, stop_event, expected_reply.moveID if expected_reply is not None else None
+
+def stop_AI_search(AI_search):
+    '''
+    Cancel a running search (undo or new game) and wait for its end, so that only one search uses
+    the AI at a time. Return None (no search running)
+    '''
+    if AI_search is not None:
+        future, stop_event, _ = AI_search
+        stop_event.set()
+        future.result()
+    return None
+
         
 '''
 Highlight square selected and moves for piece selected
@@ -1,4 +1,9 @@
-import ai.chessAI as AI
+from engine.evaluation import PIECE_SQUARE_SCORES, score_material
+from engine.chessTables import KNIGHT_TARGETS, KING_TARGETS, PAWN_ATTACK_TARGETS, ROOK_RAYS, BISHOP_RAYS, QUEEN_RAYS
+from engine.chessTables import ALL_CASTLE_RIGHTS, CASTLE_RIGHTS, UNDO_FIELDS, UNDO_STACK_PLIES, square_attacked
+from engine.fen import parse_fen, fen_clocks, format_fen, game_clocks
+from engine.stagedMoves import staged_moves
+from engine.zobrist import PIECE_KEYS, CASTLE_KEYS, ENPASSANT_KEYS, BLACK_TO_MOVE_KEY, WKS, WQS, BKS, BQS, zobrist_key
 
 """ 
 ADVANCED CHESS ENGINE
@@ -35,6 +40,7 @@ class GameState():
 
         self.whiteToMove = True
         self.moveLog = []
+        self.fenClocks = (0, 1) #halfmove clock and fullmove number of the first position (see to_fen)
         self.moveMade = False
         self.whiteKingLocation = (7,4)
         self.blackKingLocation = (0,4)
@@ -46,15 +52,26 @@ class GameState():
         self.checkMate = False
         self.staleMate = False
         #note in his code
+        self.enemyAttacks = None #squares attacked by the opponent, computed at most once per position (see enemy_attacks)
 
         self.enpassantPossible = () #sqaare where en passant capture can happen
-        #castling rights
-        self.whiteCastleKingside = True
-        self.whiteCastleQueenside = True
-        self.blackCastleKingside = True
-        self.blackCastleQueenside = True
-        self.castleRightsLog = [CastleRights(self.whiteCastleKingside, self.blackCastleKingside, 
-                                                self.whiteCastleQueenside, self.blackCastleQueenside)]
+        #castling rights: 4 bits mask (WKS | WQS | BKS | BQS, see engine/zobrist.py)
+        self.castleRights = ALL_CASTLE_RIGHTS
+
+        #Zobrist key of the position (see engine/zobrist.py), updated by make_move and undo_move
+        self.zobristKey = zobrist_key(self.board, self.whiteToMove, self.castleRights, self.enpassantPossible)
+        #score of the board (material + position tables, see engine/evaluation.py), updated by make_move and undo_move
+        self.boardScore = score_material(self.board)
+
+        #undo stack: castling rights, en passant square, captured piece, Zobrist key and score before each move,
+        # UNDO_FIELDS values per move in a list allocated once (no object created by make_move)
+        self.undoStack = [None] * (UNDO_FIELDS * UNDO_STACK_PLIES)
+        self.undoTop = 0 #index of the next free entry
+
+        #squares (row, column) of the pieces of each color, updated by make_move and undo_move so
+        # that the move generation and the evaluation only visit the occupied squares
+        self.pieceLocations = {'w': set(), 'b': set()}
+        self.set_piece_locations()
 
         #Artificial Intelligence for the Chess Play
         # Working with the class chessAI inside the GameState, allow the evaluation
@@ -71,9 +88,36 @@ class GameState():
         """
         #self.moveMade = False
 
+        #save what undo_move can't find back from the move
+        stack = self.undoStack
+        top = self.undoTop
+        if top == len(stack): #longer game than expected: grow the stack
+            stack.extend([None] * (UNDO_FIELDS * UNDO_STACK_PLIES))
+        stack[top] = self.castleRights
+        stack[top + 1] = self.enpassantPossible
+        stack[top + 2] = move.pieceCaptured
+        stack[top + 3] = self.zobristKey
+        stack[top + 4] = self.boardScore
+        self.undoTop = top + UNDO_FIELDS
+
+        #Zobrist key and score: remove what the move removes from the position...
+        key = self.zobristKey ^ BLACK_TO_MOVE_KEY ^ CASTLE_KEYS[self.castleRights]
+        key ^= PIECE_KEYS[move.pieceMoved][move.startRow][move.startCol]
+        score = self.boardScore - PIECE_SQUARE_SCORES[move.pieceMoved][move.startRow][move.startCol]
+        if move.pieceCaptured != '--':
+            key ^= PIECE_KEYS[move.pieceCaptured][move.startRow if move.enPassant else move.endRow][move.endCol]
+            score -= PIECE_SQUARE_SCORES[move.pieceCaptured][move.startRow if move.enPassant else move.endRow][move.endCol]
+        if self.enpassantPossible != ():
+            key ^= ENPASSANT_KEYS[self.enpassantPossible[1]]
+
         self.board[move.startRow][move.startCol] = "--"
         self.board[move.endRow][move.endCol] = move.pieceMoved
         self.moveLog.append(move) #log the move so we can undo it later
+        locations = self.pieceLocations[move.pieceMoved[0]]
+        locations.remove((move.startRow, move.startCol))
+        locations.add((move.endRow, move.endCol))
+        if move.pieceCaptured != '--':
+            self.pieceLocations[move.pieceCaptured[0]].remove((move.startRow if move.enPassant else move.endRow, move.endCol))
         if self.whiteToMove:
             self.moveMade = True
 
@@ -105,17 +149,54 @@ class GameState():
             if move.endCol - move.startCol == 2: #kingside castle move
                 self.board[move.endRow][move.endCol-1] = self.board[move.endRow][move.endCol+1] #move the rook (1 square away from the click move)
                 self.board[move.endRow][move.endCol+1 ] = '--'
+                rook_keys = PIECE_KEYS[self.board[move.endRow][move.endCol-1]][move.endRow]
+                key ^= rook_keys[move.endCol+1] ^ rook_keys[move.endCol-1]
+                rook_scores = PIECE_SQUARE_SCORES[self.board[move.endRow][move.endCol-1]][move.endRow]
+                score += rook_scores[move.endCol-1] - rook_scores[move.endCol+1]
+                locations.remove((move.endRow, move.endCol+1))
+                locations.add((move.endRow, move.endCol-1))
             else: #queenside castle move
                 self.board[move.endRow][move.endCol+1] = self.board[move.endRow][move.endCol-2] #move the rook (2 square away from the click move)
                 self.board[move.endRow][move.endCol-2 ] = '--'           
+                rook_keys = PIECE_KEYS[self.board[move.endRow][move.endCol+1]][move.endRow]
+                key ^= rook_keys[move.endCol-2] ^ rook_keys[move.endCol+1]
+                rook_scores = PIECE_SQUARE_SCORES[self.board[move.endRow][move.endCol+1]][move.endRow]
+                score += rook_scores[move.endCol+1] - rook_scores[move.endCol-2]
+                locations.remove((move.endRow, move.endCol-2))
+                locations.add((move.endRow, move.endCol+1))
         #update castling rights - whenever it is a rook or a king move
         self.update_castle_rights(move)
-        self.castleRightsLog.append(CastleRights(self.whiteCastleKingside, self.blackCastleKingside, 
-                                                self.whiteCastleQueenside, self.blackCastleQueenside))
-        
-        #Update the chess board evaluation
-        #self.ai.adjust_board_values(move.pieceMoved, move.startRow, move.startCol, move.endRow, move.endCol, move.pieceCaptured)
+
+        #... and add what the move adds (the promoted piece is already on the board)
+        key ^= PIECE_KEYS[self.board[move.endRow][move.endCol]][move.endRow][move.endCol]
+        if self.enpassantPossible != ():
+            key ^= ENPASSANT_KEYS[self.enpassantPossible[1]]
+        self.zobristKey = key ^ CASTLE_KEYS[self.castleRights]
+        self.boardScore = score + PIECE_SQUARE_SCORES[self.board[move.endRow][move.endCol]][move.endRow][move.endCol]
     
+    def make_null_move(self):
+        """
+        Pass the turn without moving (null move of the search): only the side to move and the en passant
+        square change. It is logged as None in moveLog and undone by undo_move.
+        """
+        stack = self.undoStack
+        top = self.undoTop
+        if top == len(stack): #longer game than expected: grow the stack
+            stack.extend([None] * (UNDO_FIELDS * UNDO_STACK_PLIES))
+        stack[top] = self.castleRights
+        stack[top + 1] = self.enpassantPossible
+        stack[top + 2] = '--'
+        stack[top + 3] = self.zobristKey
+        stack[top + 4] = self.boardScore
+        self.undoTop = top + UNDO_FIELDS
+        self.moveLog.append(None)
+        key = self.zobristKey ^ BLACK_TO_MOVE_KEY
+        if self.enpassantPossible != ():
+            key ^= ENPASSANT_KEYS[self.enpassantPossible[1]]
+            self.enpassantPossible = ()
+        self.zobristKey = key
+        self.whiteToMove = not self.whiteToMove
+
     def undo_move(self):
         """
         Undo the last move made
@@ -123,9 +204,29 @@ class GameState():
 
         if len(self.moveLog) != 0 : #Make sur that there is a move to undo
             move = self.moveLog.pop()
+            #state before the move, from the undo stack
+            stack = self.undoStack
+            top = self.undoTop - UNDO_FIELDS
+            self.undoTop = top
+            self.castleRights = stack[top]
+            self.enpassantPossible = stack[top + 1] #(also after a 2 square pawn advance)
+            captured = stack[top + 2]
+            self.zobristKey = stack[top + 3]
+            self.boardScore = stack[top + 4]
+            if move is None: #null move: only the turn changed
+                self.whiteToMove = not self.whiteToMove
+                self.checkMate = False
+                self.staleMate = False
+                return
+
             self.board[move.startRow][move.startCol] = move.pieceMoved
-            self.board[move.endRow][move.endCol] = move.pieceCaptured
+            self.board[move.endRow][move.endCol] = captured
             self.whiteToMove = not self.whiteToMove #swith turns back
+            locations = self.pieceLocations[move.pieceMoved[0]]
+            locations.remove((move.endRow, move.endCol))
+            locations.add((move.startRow, move.startCol))
+            if captured != '--':
+                self.pieceLocations[captured[0]].add((move.startRow if move.enPassant else move.endRow, move.endCol))
             ## print("WHITE TURN : ", self.whiteToMove, "(UNDO MOVE)")
             #update the King's location if unmoved
             if move.pieceMoved == 'wK':
@@ -135,27 +236,20 @@ class GameState():
             #undo enpassant 
             if move.enPassant:
                 self.board[move.endRow][move.endCol] = '--' #removes the pawn that was added n the wrong square
-                self.board[move.startRow][move.endCol] = move.pieceCaptured #puts the pawn back on the correct square it was capture from
-                self.enpassantPossible = (move.endRow, move.endCol) #allow an en passant to happen on the next move
-            #if a 2 square pawn advance should make enpassantPossible = () again:
-            if move.pieceMoved[1] == 'p' and abs(move.startRow - move.endRow) == 2:
-                self.enpassantPossible = ()
+                self.board[move.startRow][move.endCol] = captured #puts the pawn back on the correct square it was capture from
             
-            #Undo castling rights
-            self.castleRightsLog.pop() #Get rid of the new castling right
-            new_Rights = self.castleRightsLog[-1] #set the current state rights to the last one in the list
-            self.whiteCastleKingside = new_Rights.wks
-            self.blackCastleKingside = new_Rights.bks
-            self.whiteCastleQueenside = new_Rights.wqs
-            self.blackCastleQueenside =  new_Rights.bqs
             #undo the castling move
             if move.castle:
                 if move.endCol - move.startCol == 2: #kingside
                     self.board[move.endRow][move.endCol+1] = self.board[move.endRow][move.endCol-1]
                     self.board[move.endRow][move.endCol-1] = '--'
+                    locations.remove((move.endRow, move.endCol-1))
+                    locations.add((move.endRow, move.endCol+1))
                 else: #queenside
                     self.board[move.endRow][move.endCol-2] = self.board[move.endRow][move.endCol+1]
                     self.board[move.endRow][move.endCol+1] = '--'
+                    locations.remove((move.endRow, move.endCol+1))
+                    locations.add((move.endRow, move.endCol-2))
 
             #RESET the checkMate and staleMate status when we undo a move
             self.checkMate = False
@@ -163,28 +257,75 @@ class GameState():
 
         self.moveMade = False
 
+    def set_position(self, board, white_to_move, castle_rights, enpassant_possible):
+        '''
+        Replace the current game by a position (see parse_fen in engine/fen.py), the move log is cleared
+            castle_rights : 4 bits mask (see engine/zobrist.py)
+            enpassant_possible : (row, column) of the en passant square or ()
+        '''
+        self.board[:] = [row[:] for row in board] #same list, the UI keeps a reference to the board
+        self.whiteToMove = white_to_move
+        self.moveLog = []
+        self.fenClocks = (0, 1)
+        for row in range(8):
+            for column in range(8):
+                if self.board[row][column] == 'wK':
+                    self.whiteKingLocation = (row, column)
+                elif self.board[row][column] == 'bK':
+                    self.blackKingLocation = (row, column)
+        self.inCheck = False
+        self.pins = []
+        self.checks = []
+        self.checkMate = False
+        self.staleMate = False
+        self.enpassantPossible = enpassant_possible
+        self.castleRights = castle_rights
+        self.zobristKey = zobrist_key(self.board, self.whiteToMove, self.castleRights, self.enpassantPossible)
+        self.boardScore = score_material(self.board)
+        self.undoTop = 0
+        self.set_piece_locations()
+
+    @classmethod
+    def from_fen(cls, fen):
+        '''
+        New game starting from a FEN position (see engine/fen.py)
+        '''
+        gs = cls()
+        gs.set_position(*parse_fen(fen))
+        gs.fenClocks = fen_clocks(fen)
+        return gs
+
+    def to_fen(self):
+        '''
+        FEN of the current position
+        '''
+        return format_fen(self.board, self.whiteToMove, self.castle_rights_mask(), self.enpassantPossible,
+                          *game_clocks(self))
+
+    def set_piece_locations(self):
+        '''
+        Rebuild the piece lists from the board (only needed when the board is set up directly)
+        '''
+        for color in ('w', 'b'):
+            self.pieceLocations[color].clear()
+        for row in range(8):
+            for column in range(8):
+                piece = self.board[row][column]
+                if piece != "--":
+                    self.pieceLocations[piece[0]].add((row, column))
+
+    def castle_rights_mask(self):
+        '''
+        Castling rights as a 4 bits mask (same method in every engine)
+        '''
+        return self.castleRights
+
     def update_castle_rights(self, move):
         '''
-        Update the castle rights given by the move
+        Update the castle rights given by the move: a king or rook move, or a rook captured on its
+        starting square (see CASTLE_RIGHTS in engine/chessTables.py)
         '''
-        if move.pieceMoved == 'wK':
-            self.whiteCastleKingside = False
-            self.whiteCastleQueenside = False
-        elif move.pieceMoved == 'bK':
-            self.blackCastleKingside = False
-            self.blackCastleQueenside = False
-        elif move.pieceMoved == 'wR':
-            if move.startRow == 7:
-                if move.startCol == 0: #left rook
-                    self.whiteCastleQueenside = False
-                elif move.startCol == 7: #right rook
-                    self.whiteCastleKingside = False
-        elif move.pieceMoved == 'bR':
-            if move.startRow == 0:
-                if move.startCol == 0: #left rook
-                    self.blackCastleQueenside = False
-                elif move.startCol == 7: #right rook
-                    self.blackCastleKingside = False
+        self.castleRights &= CASTLE_RIGHTS[move.startRow][move.startCol] & CASTLE_RIGHTS[move.endRow][move.endCol]
 
     def get_valid_moves(self): #verify that the move can be done without living the King in check position
         """
@@ -192,6 +333,7 @@ class GameState():
         """
         moves = []        
         self.inCheck, self.pins, self.checks = self.check_for_pins_and_checks()
+        self.enemyAttacks = None #new position: the attacked squares will be computed if the (K)ing can move
         if self.whiteToMove: #white turn
             king_row = self.whiteKingLocation[0]
             king_col = self.whiteKingLocation[1]
@@ -201,37 +343,7 @@ class GameState():
 
         if self.inCheck:
             if len(self.checks) == 1 : #only 1 check -> block the check or move the king
-                moves = self.get_all_possible_moves()
-                #To block a check you must move a piece into one of the squares between 
-                #the enemy piece and the king
-                check = self.checks[0] #information about the check
-                check_row = check[0]
-                check_col = check[1]
-                piece_checking = self.board[check_row][check_col] #enemy piece causing the check
-                valid_squares = [] #the squares where that pieces can move to 
-                #if knight, must capture knight or move king, other pieces can be blocked
-                if piece_checking[1] == 'N':
-                    #IF the attacking piece is a k(N)ight, we have to take it
-                    valid_squares = [(check_row, check_col)]
-                else: 
-                    #For the other pieces
-                    for i in range(1,8):
-                        #check[2] and check[3] are the check directions
-                        valid_square = (king_row + check[2] * i, king_col + check[3] * i) 
-                        valid_squares.append(valid_square)
-                        if valid_square[0] == check_row and valid_square[1] == check_col: 
-                            #WHAT we have to do once we get the piece putting the (K)ing in check
-                            break #when we reach the attacking piece, we can break the loop
-                #get rid of any moves that don't block check or move king
-                for i in range(len(moves)-1, -1, -1): 
-                    #go through backwards when you are removing from a list as iterating
-                    if moves[i].pieceMoved[1] != 'K': 
-                        #if the piece moved was not a king -> that piece need to move 
-                        #to a valid square to block or capture the enemy piece making a check
-                        if (moves[i].endRow, moves[i].endCol) not in valid_squares: 
-                            #if the move doesn't protect the (K)ing or allow the (K)ing to move, 
-                            #we have to remove it
-                            moves.remove(moves[i])
+                self.get_check_evasions(king_row, king_col, moves)
             else: #double check -> king has to move
                 self.get_king_moves(king_row, king_col, moves)
         else: #not in check so all moves are fine
@@ -249,7 +361,183 @@ class GameState():
             self.staleMate = False
 
         return moves
-    
+
+    def get_staged_moves(self, hash_move = None, killers = (), capture_key = None, quiet_key = None):
+        """
+        Generator of the valid moves in the order of engine/stagedMoves.py: hash move, captures,
+        promotions, killer moves, then the other quiet moves (same interface as ChessEngineC).
+        Out of check, each stage is only generated when the previous one is exhausted: the hash move
+        and the killers are looked for among the moves of their starting square, the captures and the
+        quiet moves come from the move functions called with captures or quiets only. In check, the
+        evasions are few: they are generated at once and given in the same order (staged_moves).
+        The moves can be made and undone between two stages. Unlike get_valid_moves, checkMate and
+        staleMate are only updated when there is no valid move.
+        """
+        context = self.get_legality_context()
+        if self.inCheck:
+            king_row, king_col = self.whiteKingLocation if self.whiteToMove else self.blackKingLocation
+            moves = []
+            if len(self.checks) == 1:
+                self.get_check_evasions(king_row, king_col, moves)
+            else:
+                self.get_king_moves(king_row, king_col, moves)
+            if not moves:
+                self.checkMate = True
+                self.staleMate = False
+            yield from staged_moves(moves, hash_move, killers, capture_key, quiet_key)
+            return
+
+        given = [] #moveID of the hash move and the killers already given
+        if hash_move is not None:
+            move = self.find_valid_move(context, hash_move)
+            if move is not None:
+                given.append(move.moveID)
+                yield move
+
+        captures = []
+        self.add_legal_moves(context, captures, quiets = False)
+        if capture_key is not None:
+            captures.sort(key = capture_key, reverse = True)
+        for move in captures:
+            if move.moveID not in given:
+                yield move
+
+        #the advances of the (p)awns on the row before the back row are the promotions
+        promotion_row = 1 if self.whiteToMove else 6
+        pawn = 'wp' if self.whiteToMove else 'bp'
+        promotions = []
+        self.add_legal_moves(context, promotions, captures = False,
+                             squares = [(row, column) for row, column in self.pieceLocations[pawn[0]]
+                                        if row == promotion_row and self.board[row][column] == pawn])
+        for move in promotions:
+            if move.moveID not in given:
+                yield move
+
+        for killer in killers:
+            if killer is None or killer.moveID in given:
+                continue
+            move = self.find_valid_move(context, killer)
+            if move is not None and move.pieceCaptured == "--" and not move.pawnPromotion:
+                given.append(move.moveID)
+                yield move
+
+        quiets = []
+        self.add_legal_moves(context, quiets, captures = False)
+        if quiet_key is not None:
+            quiets.sort(key = quiet_key, reverse = True)
+        for move in quiets:
+            if not move.pawnPromotion and move.moveID not in given:
+                yield move
+
+        if not (captures or promotions or quiets): #no valid move out of check
+            self.checkMate = False
+            self.staleMate = True
+
+    def get_capture_moves(self):
+        """
+        Valid captures only (en passant included), for the quiescence search: the move functions are
+        called without the quiet moves, which are never generated (same interface as ChessEngineC). Unlike get_valid_moves, checkMate and staleMate are not updated.
+        """
+        moves = []
+        context = self.get_legality_context()
+        if self.inCheck:
+            king_row, king_col = self.whiteKingLocation if self.whiteToMove else self.blackKingLocation
+            if len(self.checks) == 1:
+                self.get_check_evasions(king_row, king_col, moves, quiets = False)
+            else:
+                self.get_king_moves(king_row, king_col, moves, quiets = False)
+        else:
+            self.add_legal_moves(context, moves, quiets = False)
+        return moves
+
+    def get_legality_context(self):
+        '''
+        What the legality of the moves of the side to move depends on, computed once per position:
+        (inCheck, pins, checks) of check_for_pins_and_checks. Also sets them on the game state.
+        '''
+        self.inCheck, self.pins, self.checks = self.check_for_pins_and_checks()
+        self.enemyAttacks = None
+        return (self.inCheck, list(self.pins), self.checks)
+
+    def add_legal_moves(self, context, moves, captures = True, quiets = True, squares = None):
+        '''
+        Add the valid moves of the side to move, out of check, to the list
+            context : see get_legality_context, set back first (the move functions remove the pins
+                      they use and the search can make and undo moves between two stages)
+            captures : moves to an enemy piece (en passant included)
+            quiets : moves to an empty square (castling included)
+            squares : starting squares of the moves, None for all the pieces of the side to move
+        '''
+        self.inCheck, pins, self.checks = context
+        self.pins = list(pins)
+        self.enemyAttacks = None
+        board = self.board
+        if squares is None:
+            squares = self.pieceLocations['w' if self.whiteToMove else 'b']
+        for row, column in squares:
+            self.moveFunctions[board[row][column][1]](row, column, moves, captures, quiets)
+        king_row, king_col = self.whiteKingLocation if self.whiteToMove else self.blackKingLocation
+        if quiets and (king_row, king_col) in squares:
+            self.get_castle_moves(king_row, king_col, moves)
+
+    def find_valid_move(self, context, move):
+        '''
+        Valid move of the position with the same squares as 'move' (a move of any position), None if
+        there is none. Only the moves of its starting square are generated.
+        '''
+        if self.board[move.startRow][move.startCol][0] != ('w' if self.whiteToMove else 'b'):
+            return None
+        moves = []
+        self.add_legal_moves(context, moves, squares = ((move.startRow, move.startCol),))
+        move_id = move.moveID
+        for valid_move in moves:
+            if valid_move.moveID == move_id:
+                return valid_move
+        return None
+
+    def in_Check(self):
+        '''
+        Function that will determine if the current player is in check
+        '''
+        if self.whiteToMove:
+            return self.square_under_attack(self.whiteKingLocation[0], self.whiteKingLocation[1])
+        else:
+            return self.square_under_attack(self.blackKingLocation[0], self.blackKingLocation[1])
+
+    def has_non_pawn_material(self):
+        '''
+        True if the side to move has a piece other than its king and pawns (without it, passing the
+        turn is often the best move: the null move of the search would be wrong, zugzwang)
+        '''
+        board = self.board
+        for row, column in self.pieceLocations['w' if self.whiteToMove else 'b']:
+            if board[row][column][1] in 'NBRQ':
+                return True
+        return False
+
+    def has_legal_move(self):
+        """
+        True if the side to move has at least one valid move: the search only needs to know that a
+        position is not a checkMate or a staleMate, so the generation stops at the first piece that
+        can move (castling is never needed: if the king can castle, it can also move 1 square)
+        """
+        self.inCheck, self.pins, self.checks = self.check_for_pins_and_checks()
+        self.enemyAttacks = None
+        king_row, king_col = self.whiteKingLocation if self.whiteToMove else self.blackKingLocation
+        moves = []
+        if self.inCheck:
+            if len(self.checks) == 1:
+                self.get_check_evasions(king_row, king_col, moves)
+            else:
+                self.get_king_moves(king_row, king_col, moves)
+            return len(moves) > 0
+        #not in check: the moves of the pieces take the pins into account
+        for row, column in self.pieceLocations['w' if self.whiteToMove else 'b']:
+            self.moveFunctions[self.board[row][column][1]](row, column, moves)
+            if moves:
+                return True
+        return False
+
     def check_for_pins_and_checks(self):
         """
         This function is the algorithm that will verify the pins and the checks
@@ -275,171 +563,210 @@ class GameState():
         
         #check further from the king position for pins and checks and thus, keep track of pins
         #1) we are going to check in each direction if a pawn can attack the king position
-        directions = ((-1,0),(0,-1),(1,0),(0,1),(-1,-1),(-1,1),(1,-1),(1,1))
-        for j in range(len(directions)):
-            d = directions[j]
+        #   (the 4 straight directions first, then the 4 diagonals)
+        for j, (d, squares) in enumerate(QUEEN_RAYS[start_row][start_col]):
             possible_pin = () #reset possible pin
-            for i in range (1,8): 
+            for i, (end_row, end_col) in enumerate(squares, 1): 
                 #we'll focus on the closest case and the further one.
-                #we start at 1 because, we'll mutliply the direction by 'i'
-                end_row = start_row + d[0] * i
-                end_col = start_col + d[1] * i
-                if 0 <= end_row < 8 and 0 <= end_col < 8:
-                    end_piece = self.board[end_row][end_col]
-                    #First we check is we have a piece protecting our (K)ing
-                    if end_piece[0] == ally_color and end_piece[1] != 'K':
-                        if possible_pin == () : 
-                            #1st allied piece could be pinned because the 
-                            #pin couple is empty
-                            possible_pin = (end_row, end_col, d[0], d[1])
-                            #we gathered the row and col of the piece that should be pin and
-                            #the direction from where the attack is comming because, that piece
-                            #could move ONLY in this direction. Because the piece will keep the
-                            #protecting the (K)ing
-                        else: 
-                            #2nd allied piece, so no pin or check possible in this direction
+                #'i' is the distance from the (K)ing
+                end_piece = self.board[end_row][end_col]
+                #First we check is we have a piece protecting our (K)ing
+                if end_piece[0] == ally_color and end_piece[1] != 'K':
+                    if possible_pin == () : 
+                        #1st allied piece could be pinned because the 
+                        #pin couple is empty
+                        possible_pin = (end_row, end_col, d[0], d[1])
+                        #we gathered the row and col of the piece that should be pin and
+                        #the direction from where the attack is comming because, that piece
+                        #could move ONLY in this direction. Because the piece will keep the
+                        #protecting the (K)ing
+                    else: 
+                        #2nd allied piece, so no pin or check possible in this direction
+                        break
+                #Secondly, we check if our (K)ing is under attack
+                elif end_piece[0] == enemy_color:
+                    type = end_piece[1] #determine the type of the piece
+                    #In function of the type of the piece, there are different possibilities
+                    '''
+                    5 possibilities here in this complex conditional
+                        (1) orthogonally away from the (K)ing and the piece is a (R)ook
+                            -> (0 <= j <= 3 and type == 'R')
+                        (2) diagonally away from the (K)ing and the piece is a (B)ishop
+                            -> (4 <= j <= 7 and type == 'B')
+                        (3) 1 square away diagonally from (K)ing and the piece is a (p)awn
+                            -> (i == 1 and type == 'p')
+                        (4) any direction and the piece is a (Q)ueen
+                            -> (type == 'Q')
+                        (5) any direction 1 square away and the piece is a (K)ing 
+                            (this is necessary to prevent a king to move to a square 
+                            controlled by another king)
+                            -> (i == 1 and type == 'K')
+                    '''
+                    if (0 <= j <= 3 and type == 'R') or \
+                        (4 <= j <= 7 and type == 'B') or \
+                        ( 
+                            (i == 1 and type == 'p') and \
+                            (
+                                (enemy_color == 'w' and 6 <= j <= 7) or \
+                                (enemy_color == 'b' and 4 <= j <= 5)
+                            )
+                        ) or (type == 'Q') or (i == 1 and type == 'K'):
+                        if possible_pin == (): 
+                            #there are no piece protecting the king, 
+                            # so we are in a check position
+                            in_check = True
+                            #we are in a check position , so we append the row 
+                            # and column of the piece making the king in check
+                            checks.append((end_row, end_col, d[0], d[1])) 
                             break
-                    #Secondly, we check if our (K)ing is under attack
-                    elif end_piece[0] == enemy_color:
-                        type = end_piece[1] #determine the type of the piece
-                        #In function of the type of the piece, there are different possibilities
-                        '''
-                        5 possibilities here in this complex conditional
-                            (1) orthogonally away from the (K)ing and the piece is a (R)ook
-                                -> (0 <= j <= 3 and type == 'R')
-                            (2) diagonally away from the (K)ing and the piece is a (B)ishop
-                                -> (4 <= j <= 7 and type == 'B')
-                            (3) 1 square away diagonally from (K)ing and the piece is a (p)awn
-                                -> (i == 1 and type == 'p')
-                            (4) any direction and the piece is a (Q)ueen
-                                -> (type == 'Q')
-                            (5) any direction 1 square away and the piece is a (K)ing 
-                                (this is necessary to prevent a king to move to a square 
-                                controlled by another king)
-                                -> (i == 1 and type == 'K')
-                        '''
-                        if (0 <= j <= 3 and type == 'R') or \
-                            (4 <= j <= 7 and type == 'B') or \
-                            ( 
-                                (i == 1 and type == 'p') and \
-                                (
-                                    (enemy_color == 'w' and 6 <= j <= 7) or \
-                                    (enemy_color == 'b' and 4 <= j <= 5)
-                                )
-                            ) or (type == 'Q') or (i == 1 and type == 'K'):
-                            if possible_pin == (): 
-                                #there are no piece protecting the king, 
-                                # so we are in a check position
-                                in_check = True
-                                #we are in a check position , so we append the row 
-                                # and column of the piece making the king in check
-                                checks.append((end_row, end_col, d[0], d[1])) 
-                                break
-                            else: 
-                                #piece blocking so we have a pin pawn
-                                #because of the piece protecting the (K)ing, we can pin 
-                                # the piece and add it to the list of pins elements
-                                pins.append(possible_pin)                                 
-                                break
-                        else: #enemy pieces are not applying a check
+                        else: 
+                            #piece blocking so we have a pin pawn
+                            #because of the piece protecting the (K)ing, we can pin 
+                            # the piece and add it to the list of pins elements
+                            pins.append(possible_pin)                                 
                             break
-                else: # out the board
-                    break 
+                    else: #enemy pieces are not applying a check
+                        break
         
         #2) Check for the k(N)ight movements
         #   Because the knight don't move in the "original" direction, we had to make a 
         #   special case for him by considering his own moves directions
-        knight_moves = ((-2,-1),(-2,1),(-1,-2),(-1,2),(1,-2),(1,2),(2,-1),(2,1))
-        for move in knight_moves:
-            end_row = start_row + move[0]
-            end_col = start_col + move[1]
-
-            if 0 <= end_row < 8 and 0 <= end_col < 8: #if in the board
-                end_piece = self.board[end_row][end_col]
-                if end_piece[0] == enemy_color and end_piece[1] == 'K': 
-                    #enemy k(N)ight attacking the (K)ing
-                    in_check = True
-                    checks.append((end_row, end_col, move[0], move[1]))
-            else: #out of the board
-                break
+        for end_row, end_col in KNIGHT_TARGETS[start_row][start_col]:
+            end_piece = self.board[end_row][end_col]
+            if end_piece[0] == enemy_color and end_piece[1] == 'N': 
+                #enemy k(N)ight attacking the (K)ing
+                in_check = True
+                checks.append((end_row, end_col, end_row - start_row, end_col - start_col))
 
         return in_check, pins, checks
     
     def square_under_attack(self, r, c):
         """
-        Determine if the enemy can attack the square (r,c)
+        Determine if the enemy can attack the square (r,c) (see square_attacked in engine/chessTables.py)
         """
-        self.whiteToMove = not self.whiteToMove #switch to opponent's turn
-        opponent_moves = self.get_all_possible_moves() #Get the opponent's moves
-        self.whiteToMove = not self.whiteToMove #reset the turn
+        return square_attacked(self.board, r, c, self.whiteToMove)
 
-        for move in opponent_moves:
-            if move.endRow == r and move.endCol == c:                
-                return True        
-        return False
+    def get_check_evasions(self, king_row, king_col, moves, quiets = True):
+        """
+        Moves out of a single check: (K)ing moves, captures of the checking piece and pieces moved
+        between it and the king. Instead of generating every move and removing the others, we look
+        from each of these squares for the pieces able to reach it.
+        quiets : False for the captures only (the blocking squares are empty, the checking piece is the target)
+        """
+        check_row, check_col, d_row, d_col = self.checks[0]
+        if not quiets or self.board[check_row][check_col][1] == 'N': #a k(N)ight check can't be blocked
+            target_squares = ((check_row, check_col),)
+        else: #squares from the king to the checking piece (included)
+            target_squares = []
+            end_row, end_col = king_row, king_col
+            while (end_row, end_col) != (check_row, check_col):
+                end_row, end_col = end_row + d_row, end_col + d_col
+                target_squares.append((end_row, end_col))
+
+        self.get_king_moves(king_row, king_col, moves, True, quiets)
+        board = self.board
+        if self.whiteToMove:
+            ally_color, move_amount, start_row, back_row = 'w', -1, 6, 0
+        else:
+            ally_color, move_amount, start_row, back_row = 'b', 1, 1, 7
+        #a pinned piece can never stop a check (it can only move along its pin, which doesn't cross the check)
+        pinned = {(pin[0], pin[1]) for pin in self.pins}
+        knight, rook, bishop, queen, pawn = ally_color + 'N', ally_color + 'R', ally_color + 'B', ally_color + 'Q', ally_color + 'p'
+
+        for end_row, end_col in target_squares:
+            end_sq = (end_row, end_col)
+            #k(N)ights
+            for start in KNIGHT_TARGETS[end_row][end_col]:
+                if board[start[0]][start[1]] == knight and start not in pinned:
+                    moves.append(Move(start, end_sq, board))
+            #(R)ooks, (B)ishops and (Q)ueens: first piece met on each ray from the square
+            for j, (direction, squares) in enumerate(QUEEN_RAYS[end_row][end_col]):
+                slider = rook if j < 4 else bishop #orthogonal directions first (see engine/chessTables.py)
+                for start in squares:
+                    piece = board[start[0]][start[1]]
+                    if piece != "--":
+                        if (piece == slider or piece == queen) and start not in pinned:
+                            moves.append(Move(start, end_sq, board))
+                        break
+            #(p)awns: push to block, diagonal capture of the checking piece
+            pawn_promotion = end_row == back_row
+            behind_row = end_row - move_amount
+            if board[end_row][end_col] == "--":
+                if 0 <= behind_row < 8:
+                    if board[behind_row][end_col] == pawn and (behind_row, end_col) not in pinned:
+                        moves.append(Move((behind_row, end_col), end_sq, board, pawn_promotion = pawn_promotion))
+                    elif board[behind_row][end_col] == "--" and behind_row - move_amount == start_row and \
+                            board[start_row][end_col] == pawn and (start_row, end_col) not in pinned:
+                        moves.append(Move((start_row, end_col), end_sq, board)) #2 square pawn advance
+            elif 0 <= behind_row < 8:
+                for start_col in (end_col - 1, end_col + 1):
+                    if 0 <= start_col < 8 and board[behind_row][start_col] == pawn and (behind_row, start_col) not in pinned:
+                        moves.append(Move((behind_row, start_col), end_sq, board, pawn_promotion = pawn_promotion))
+
+        #en passant: capture of the checking pawn, or pawn landing between the king and the checking piece
+        if self.enpassantPossible != ():
+            ep_row, ep_col = self.enpassantPossible
+            if (ep_row - move_amount, ep_col) == (check_row, check_col) or self.enpassantPossible in target_squares:
+                for start_col in (ep_col - 1, ep_col + 1):
+                    start = (ep_row - move_amount, start_col)
+                    if 0 <= start_col < 8 and board[start[0]][start_col] == pawn and start not in pinned and \
+                            not self.enpassant_reveals_check(start[0], start_col, ep_col):
+                        moves.append(Move(start, self.enpassantPossible, board, en_passant = True))
 
     def get_all_possible_moves(self):
         """
         All moves without considering checks
         """
         moves = []
-        for row in range(len(self.board)):  #number of rows in the board
-            for column in range (len(self.board[row])): 
-                #number of columns in a given row in the board
-                turn = self.board[row][column][0] 
-                #if it is the turn of white or black turn. 
-                # The '[0]' takes the first later of the element in the matrix 'wR' -> 'w'
-                if (turn == 'w' and self.whiteToMove) or (turn == 'b' and not self.whiteToMove):
-                    piece = self.board[row][column][1] 
-                    #Bishop, kNight, Rook, Queen, King or pawn
-                    self.moveFunctions[piece](row,column,moves) 
-                    #call the appropriate move function based on piece type
+        #only visit the squares of the pieces of the side to move (see self.pieceLocations)
+        for row, column in self.pieceLocations['w' if self.whiteToMove else 'b']:
+            piece = self.board[row][column][1] 
+            #Bishop, kNight, Rook, Queen, King or pawn
+            self.moveFunctions[piece](row,column,moves) 
+            #call the appropriate move function based on piece type
         return moves  
 
     '''    All the functions to make the pawn moves    '''
-    def chess_moves(self, r, c, moves, directions, piece_pinned): # to define the precise movement of the piece
+    def chess_moves(self, r, c, moves, targets, piece_pinned, captures = True, quiets = True): # to define the precise movement of the piece
         """
-        r_m : vertical movement (+ : top || - : bottom)
-        c_m : horizontal movement (+ : right || - : left)
+        targets : precomputed squares reached by the piece from (r, c) (see engine/chessTables.py)
+        captures, quiets : add the moves to an enemy piece, the moves to an empty square (see get_staged_moves)
         """  
+        if piece_pinned: #a pinned piece jumping out of the pin line leaves the (K)ing in check
+            return
         color_enemy = "b" if self.whiteToMove else "w" 
-        for d in directions:
-            end_row = r + d[0]
-            end_col = c + d[1]
-            if 0 <= end_col < 8 and 0 <= end_row < 8:
-                if not piece_pinned:
-                    end_piece = self.board[end_row][end_col] #piece at the position
-                    if end_piece == "--": #if the case is empty
-                        moves.append(Move((r, c), (end_row, end_col), self.board))
-                    elif end_piece[0] == color_enemy: #if at this case we have an enemy piece to capture
-                        moves.append(Move((r, c), (end_row, end_col), self.board))
+        for end_row, end_col in targets:
+            end_piece = self.board[end_row][end_col] #piece at the position
+            if end_piece == "--": #if the case is empty
+                if quiets:
+                    moves.append(Move((r, c), (end_row, end_col), self.board))
+            elif captures and end_piece[0] == color_enemy: #if at this case we have an enemy piece to capture
+                moves.append(Move((r, c), (end_row, end_col), self.board))
         
-    def chess_moves_long(self, r, c, moves, d_max, directions, piece_pinned = False, pin_direction = ()): #To define the movement for the pieces that can make long movement
+    def chess_moves_long(self, r, c, moves, rays, piece_pinned = False, pin_direction = (), captures = True, quiets = True): #To define the movement for the pieces that can make long movement
         """
-        r_m : vertical movement (+ : top || - : bottom)
-        c_m : horizontal movement (+ : right || - : left)
+        rays : precomputed (direction, squares until the edge of the board) from (r, c) (see engine/chessTables.py)
+        captures, quiets : add the moves to the first enemy piece met, the moves to the empty squares
         """ 
         color_enemy = "b" if self.whiteToMove else "w" 
-        for d in directions:
-            for i in range (1, d_max+1):  #Loop among the maximal displacement distance of the pawn
-                end_row = r + d[0] * i
-                end_col = c + d[1] * i   
-                if 0<= end_col < 8 and  0 <= end_row< 8:  #on board
-                    if not piece_pinned or pin_direction == d or pin_direction == (-d[0], -d[1]): # -d[0], -d[0]) say that we can move to and away of the piece making the check
-                        end_piece = self.board[end_row][end_col]
-                        if end_piece == "--": #empty case
+        for d, squares in rays:
+            if not piece_pinned or pin_direction == d or pin_direction == (-d[0], -d[1]): # -d[0], -d[0]) say that we can move to and away of the piece making the check
+                for end_row, end_col in squares:
+                    end_piece = self.board[end_row][end_col]
+                    if end_piece == "--": #empty case
+                        if quiets:
                             moves.append(Move((r, c), (end_row, end_col), self.board))                            
-                        elif end_piece[0] == color_enemy: #enemy piece to capture
+                    elif end_piece[0] == color_enemy: #enemy piece to capture
+                        if captures:
                             moves.append(Move((r, c), (end_row, end_col), self.board))                        
-                            break #we can't go behind the piece
-                        else: #friendly piece -> invalid case
-                            break #we can't go behind the piece
-                else: #off board
-                    break 
+                        break #we can't go behind the piece
+                    else: #friendly piece -> invalid case
+                        break #we can't go behind the piece
     '''   All the pawn moves    '''
-    def get_pawn_moves(self, r, c, moves):                
+    def get_pawn_moves(self, r, c, moves, captures = True, quiets = True):                
         """
         Get all the (p)awn moves for the pawn lovated at row, column and add these moves to the list
+        captures : diagonal captures and en passant, quiets : 1 and 2 square advances
         """
         piece_pinned = False
         pin_direction =()
@@ -463,36 +790,54 @@ class GameState():
         pawnPromotion = False
         pawn_capture = False
         
-        if self.board[r+moveAmount][c] == "--": #1 square pawn advance
-            if not piece_pinned or pin_direction == (moveAmount, 0):
+        if quiets and self.board[r+moveAmount][c] == "--": #1 square pawn advance
+            if not piece_pinned or pin_direction in ((moveAmount, 0), (-moveAmount, 0)): #pinned on its column: it can still advance
                 if r+moveAmount == backRow:
                     pawnPromotion = True
                 moves.append(Move((r,c), (r+moveAmount, c), self.board, pawn_promotion = pawnPromotion))
                 if r == startRow and self.board[r+2*moveAmount][c] == "--" : #2 square pawn advance (the pawn to move need to be at the raw '6' (ranks 2)
                     moves.append(Move((r,c), (r+2*moveAmount,c), self.board))
             
-        if c-1 >= 0: #capture to the left
+        if captures and c-1 >= 0: #capture to the left
             if not piece_pinned or pin_direction == (moveAmount,-1):
                 if self.board[r+moveAmount][c-1][0] == enemyColor: #enemy piece to capture
                     if r + moveAmount == backRow: # if piece gets to bank rank then it is a pawn promotion
                         pawnPromotion = True
                     moves.append(Move((r,c), (r+moveAmount,c-1), self.board, pawn_promotion = pawnPromotion))
 
-                if (r + moveAmount, c - 1) == self.enpassantPossible:
+                if (r + moveAmount, c - 1) == self.enpassantPossible and not self.enpassant_reveals_check(r, c, c - 1):
                     moves.append(Move((r, c), (r+moveAmount, c-1), self.board, en_passant = True))
                 
-        if c+1 <= 7: #capture to the right
+        if captures and c+1 <= 7: #capture to the right
             if not piece_pinned or pin_direction == (moveAmount,1):
                 if self.board[r + moveAmount][c + 1][0] == enemyColor: #enemy piece to capture     
                     if r + moveAmount == backRow: # if piece gets to bank rank then it is a pawn promotion
                         pawnPromotion = True           
                     moves.append(Move((r,c), (r+moveAmount, c+1), self.board, pawn_promotion = pawnPromotion))
-                if (r + moveAmount, c + 1) == self.enpassantPossible:
+                if (r + moveAmount, c + 1) == self.enpassantPossible and not self.enpassant_reveals_check(r, c, c + 1):
                     moves.append(Move((r,c), (r + moveAmount, c+1), self.board, en_passant=True))
         
         return pawn_capture
 
-    def get_rook_moves(self, r, c, moves):                
+    def enpassant_reveals_check(self, r, c, capture_col):
+        '''
+        An en passant capture removes two pawns from the row r: check that it doesn't open this row
+        between the king and an enemy (R)ook or (Q)ueen (a pin that check_for_pins_and_checks can't see)
+        '''
+        king_row, king_col = self.whiteKingLocation if self.whiteToMove else self.blackKingLocation
+        if king_row != r:
+            return False
+        enemy_color = 'b' if self.whiteToMove else 'w'
+        step = 1 if c > king_col else -1 #from the king towards the pawns
+        for column in range(king_col + step, 8 if step == 1 else -1, step):
+            if column == c or column == capture_col: #the two pawns leave the row
+                continue
+            piece = self.board[r][column]
+            if piece != "--":
+                return piece[0] == enemy_color and piece[1] in ('R', 'Q')
+        return False
+
+    def get_rook_moves(self, r, c, moves, captures = True, quiets = True):                
         """
         Get all the (R)ook moves for the rook lovated at row, column and add these moves to the list
         """    
@@ -506,10 +851,9 @@ class GameState():
                     self.pins.remove(self.pins[i])
                 break
 
-        directions = ((-1,0),(0,-1),(1,0),(0,1)) #Up, left, down, right (straight directions)
-        self.chess_moves_long(r, c, moves, 7, directions, piece_pinned, pin_direction) # #move like a (R)ook
+        self.chess_moves_long(r, c, moves, ROOK_RAYS[r][c], piece_pinned, pin_direction, captures, quiets) # #move like a (R)ook
         
-    def get_knight_moves(self, r, c, moves):
+    def get_knight_moves(self, r, c, moves, captures = True, quiets = True):
         """
         Get all the k(N)ight moves for the rook lovated at row, column and add these moves to the list
         The k(N)ight can move in a L shape : 2 vertical - 1 horizontal OR 1 vertical - 2 horizontal
@@ -520,10 +864,9 @@ class GameState():
                 piece_pinned = True
                 self.pins.remove(self.pins[i])
                 break
-        knight_moves = ((-2,-1),(-2,1),(2,-1),(2,1),(-1,-2),(-1,2),(1,2),(1,-2)) #knight positions     
-        self.chess_moves(r, c, moves, knight_moves, piece_pinned) #2 vertical and 1 on the side
+        self.chess_moves(r, c, moves, KNIGHT_TARGETS[r][c], piece_pinned, captures, quiets) #2 vertical and 1 on the side
                            
-    def get_bishop_moves(self, r, c, moves):
+    def get_bishop_moves(self, r, c, moves, captures = True, quiets = True):
         """
         Get all the (B)ishop moves for the rook lovated at row, column and add these moves to the list
         The bishop can move in the diagonal direction 
@@ -538,58 +881,82 @@ class GameState():
                     self.pins.remove(self.pins[i])
                 break
 
-        directions = ((-1,-1),(-1,1),(1,-1),(1,1)) #for diagonals
-        self.chess_moves_long(r, c, moves, 7, directions, piece_pinned, pin_direction) # #move like a (R)ook
+        self.chess_moves_long(r, c, moves, BISHOP_RAYS[r][c], piece_pinned, pin_direction, captures, quiets) #move in the diagonals
           
-    def get_queen_moves(self, r, c, moves):
+    def get_queen_moves(self, r, c, moves, captures = True, quiets = True):
         """
         Get all the (Q)ueen moves for the rook lovated at row, column and add these moves to the list
         The Quenn can go forward from 7 cases in all the direction. So the Queen can move as a (B)ishop and a (R)ook
         """
 
-        self.get_bishop_moves(r, c, moves) #Move as a (B)ishop
-        self.get_rook_moves(r, c, moves) #Move as a (R)ook
+        self.get_bishop_moves(r, c, moves, captures, quiets) #Move as a (B)ishop
+        self.get_rook_moves(r, c, moves, captures, quiets) #Move as a (R)ook
                   
-    def get_king_moves(self, r, c, moves):
+    def get_king_moves(self, r, c, moves, captures = True, quiets = True):
         """
         Get all the (K)ing moves for the rook lovated at row, column and add these moves to the list
+        The (K)ing can't go to a square attacked by the opponent (see enemy_attacks)
         """
-        
-        row_moves = (-1, -1, -1, 0, 0, 1, 1, 1)
-        col_moves = (-1, 0, 1, -1, 1, -1, 0, 1) 
-        ally_color = "w" if self.whiteToMove else "b"
-
-        for i in range (8):
-            end_row = r + row_moves[i]
-            end_col = c + col_moves[i]
-            if 0 <= end_row < 8 and 0 <= end_col < 8:
-                end_piece = self.board[end_row][end_col]
-                if end_piece[0] != ally_color: #not an ally piece (empty or enemy piece)
-                    #place king at the end square and check for checks
-                    if ally_color == "w":
-                        self.whiteKingLocation = (end_row, end_col)
-                    else:
-                        self.blackKingLocation = (end_row, end_col)
-                    in_check, pins, checks = self.check_for_pins_and_checks()
-                    #print(in_check)
-                    if not in_check:
-                        moves.append(Move((r, c), (end_row, end_col), self.board))
-                    # place king back on original location
-                    if ally_color == "w": 
-                        self.whiteKingLocation = (r, c) #reset the position of the white king
-                    else:
-                        self.blackKingLocation = (r, c) #reset the position of the black king
+        if captures and quiets:
+            ally_color = "w" if self.whiteToMove else "b"
+            end_squares = [end_sq for end_sq in KING_TARGETS[r][c] if self.board[end_sq[0]][end_sq[1]][0] != ally_color]
+        else: #only the enemy pieces or only the empty squares ("--")
+            target_color = ("b" if self.whiteToMove else "w") if captures else "-"
+            end_squares = [end_sq for end_sq in KING_TARGETS[r][c] if self.board[end_sq[0]][end_sq[1]][0] == target_color]
+        if not end_squares: #surrounded by its own pieces: no need to compute the attacked squares
+            return
+        enemy_attacks = self.enemy_attacks()
+        for end_sq in end_squares:
+            if end_sq not in enemy_attacks: #safe square
+                moves.append(Move((r, c), end_sq, self.board))
+
+    def enemy_attacks(self):
+        """
+        Squares attacked by the opponent in the current position, computed once by get_enemy_attacks
+        and shared by the (K)ing moves and the castling
+        """
+        if self.enemyAttacks is None:
+            self.enemyAttacks = self.get_enemy_attacks()
+        return self.enemyAttacks
+
+    def get_enemy_attacks(self):
+        """
+        Set of the squares attacked by the opponent, computed once per position instead of looking
+        for checks around each square the (K)ing could go to.
+        The (K)ing of the side to move is taken off the board: the square behind it on the line of a
+        (R)ook, (B)ishop or (Q)ueen giving check is attacked too.
+        """
+        board = self.board
+        enemy_color = 'b' if self.whiteToMove else 'w'
+        king_location = self.whiteKingLocation if self.whiteToMove else self.blackKingLocation
+        slider_rays = {'R': ROOK_RAYS, 'B': BISHOP_RAYS, 'Q': QUEEN_RAYS}
+        attacks = set()
+        for row, column in self.pieceLocations[enemy_color]:
+            piece_type = board[row][column][1]
+            if piece_type == 'p':
+                attacks.update(PAWN_ATTACK_TARGETS[enemy_color][row][column])
+            elif piece_type == 'N':
+                attacks.update(KNIGHT_TARGETS[row][column])
+            elif piece_type == 'K':
+                attacks.update(KING_TARGETS[row][column])
+            else:
+                for direction, squares in slider_rays[piece_type][row][column]:
+                    for square in squares:
+                        attacks.add(square)
+                        if board[square[0]][square[1]] != "--" and square != king_location:
+                            break #the first piece met stops the ray
+        return attacks
 
     ''' Castling Movements: King and Queen side '''
     def get_castle_moves(self, r, c, moves):
         '''
         Generate all valid astle moves for the king at (r, c) and add them to the list of moves
         '''        
-        if self.square_under_attack(r, c):
+        if self.inCheck:
             return #can't castle while we are in check
-        if (self.whiteToMove and self.whiteCastleKingside) or (not self.whiteToMove and self.blackCastleKingside) :
+        if self.castleRights & (WKS if self.whiteToMove else BKS):
             self.get_king_side_castle_moves(r,c,moves)
-        if (self.whiteToMove and self.whiteCastleQueenside) or (not self.whiteToMove and self.blackCastleQueenside) :
+        if self.castleRights & (WQS if self.whiteToMove else BQS):
             self.get_queen_side_castle_moves(r,c,moves)
     
     def get_king_side_castle_moves(self, r, c, moves):   
@@ -597,7 +964,8 @@ class GameState():
         Castling in the right side, with the right rook
         '''     
         if self.board[r][c+1] == '--' and self.board[r][c+2] == '--':
-            if not self.square_under_attack(r, c+1) and not self.square_under_attack(r, c+2):
+            enemy_attacks = self.enemy_attacks()
+            if (r, c+1) not in enemy_attacks and (r, c+2) not in enemy_attacks:
                 moves.append(Move((r, c), (r, c+2), self.board, castle = True))
                 
     def get_queen_side_castle_moves(self, r, c, moves):   
@@ -605,32 +973,22 @@ class GameState():
         Castling in the left side, with the left rook
         '''      
         if self.board[r][c-1] == '--' and self.board[r][c-2] == '--' and self.board[r][c-3] == '--':
-            if not self.square_under_attack(r, c-1) and not self.square_under_attack(r, c-2):
+            enemy_attacks = self.enemy_attacks()
+            if (r, c-1) not in enemy_attacks and (r, c-2) not in enemy_attacks:
                 moves.append(Move((r, c), (r, c-2), self.board, castle= True))
 
-'''
-Class to contain the castling rights
-'''      
-class CastleRights():
-    def __init__(self, wks, bks, wqs, bqs):
-        '''
-        wks : white king side
-        bks : black king side
-        wqs : white queen side
-        bqs : black queen side
-        '''
-        self.wks = wks
-        self.bks = bks
-        self.wqs = wqs
-        self.bqs = bqs
-
 '''
 Class to contain the pieces's movements
 ''' 
 class Move():
     """
     A class that will keep track of the movement of the chess pieces
+
+    Thousands of moves are created for each position during a search, so the attributes are
+    stored in __slots__ (no per-instance __dict__) and the moveID is only computed when needed
     """ 
+    __slots__ = ('startRow', 'startCol', 'endRow', 'endCol', 'pieceMoved', 'pieceCaptured',
+                 'enPassant', 'pawnPromotion', 'castle')
     # maps keys to values
     # keys : value
     ranks_to_rows = {"1": 7, "2": 6, "3": 5, "4": 4,
@@ -641,20 +999,19 @@ class Move():
     column_to_files = {v:k for k,v in files_to_column.items()} #reverse the dictionnary files_to_column
 
     def __init__(self, start_sq, end_sq, board, en_passant = False, pawn_promotion = False, castle = False) :
-        self.startRow = start_sq[0]
-        self.startCol = start_sq[1]
-        self.endRow = end_sq[0]
-        self.endCol = end_sq[1]
+        self.startRow, self.startCol = start_sq
+        self.endRow, self.endCol = end_sq
         self.pieceMoved = board[self.startRow][self.startCol]   #determine the first square selected and thus, the piece that needs to be moved.
         self.pieceCaptured = board[self.endRow][self.endCol]    #determine the second square selected and thus, the piece that will be captured.
         self.enPassant = en_passant
         self.pawnPromotion = pawn_promotion
         self.castle = castle
-        if self.enPassant :
+        if en_passant :
             self.pieceCaptured = 'bp' if self.pieceMoved == 'wp' else 'wp' #en passant captures opposite colored pawn
 
-        self.moveID = self.startRow * 1000 + self.startCol * 100 + self.endRow * 10 + self.endCol #we create a ID for the case in the shape of XXXX -> 6444. 
-
+    @property
+    def moveID(self):
+        return self.startRow * 1000 + self.startCol * 100 + self.endRow * 10 + self.endCol #we create a ID for the case in the shape of XXXX -> 6444. 
 
     def __eq__(self, other):
         '''
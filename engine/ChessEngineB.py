@@ -9,14 +9,23 @@ It will also keep a move lop
 
 from typing import Sequence
 
+from engine.evaluation import PIECE_SQUARE_SCORES, score_material
+from engine.chessTables import KNIGHT_TARGETS, KING_TARGETS, ROOK_RAYS, BISHOP_RAYS, QUEEN_RAYS
+from engine.chessTables import ALL_CASTLE_RIGHTS, CASTLE_RIGHTS, UNDO_FIELDS, UNDO_STACK_PLIES, square_attacked
+from engine.fen import parse_fen, fen_clocks, format_fen, game_clocks
+from engine.zobrist import PIECE_KEYS, CASTLE_KEYS, ENPASSANT_KEYS, BLACK_TO_MOVE_KEY, WKS, WQS, BKS, BQS, zobrist_key
+
 
 class GameState():
-    def __init__(self):
+    def __init__(self, fast_legality = False):
         """
         Board is an 8x8 2d list, eadcj element of te list has 2 characters.
         The firest character represents the color of the piece; 'b' or 'w'
         The second character represents the type of the piece, 'K', 'Q', 'R', 'B', 'N', or 'P'
         "--" represents an empty space with no piece
+
+        fast_legality : check the moves with the pins and checks of the king (see remove_illegal_moves)
+                        instead of making each move; the valid moves are exactly the same
         """
         self.board = [
             ["bR", "bN", "bB", "bQ", "bK", "bB", "bN", "bR"], #row = 0 || rank = 8 
@@ -32,26 +41,64 @@ class GameState():
         self.moveFunctions = {'p': self.get_pawn_moves, 'R': self.get_rook_moves, 'N': self.get_knight_moves,
                               'B': self.get_bishop_moves, 'Q': self.get_queen_moves, 'K': self.get_king_moves}
 
+        self.fastLegality = fast_legality
         self.whiteToMove = True
         self.moveLog = []
+        self.fenClocks = (0, 1) #halfmove clock and fullmove number of the first position (see to_fen)
 
         self.whiteKingLocation = (7,4)
         self.blackKingLocation = (0,4)
         self.checkMate = False
         self.staleMate = False
         self.enpassantPossible = () #coordinates for the square where en passant capture is possible
-        self.currentCastlingRight = CastleRights(True, True, True, True)
-        self.castleRightsLog = [CastleRights(self.currentCastlingRight.wks, self.currentCastlingRight.bks, 
-                                            self.currentCastlingRight.wqs, self.currentCastlingRight.bqs)]
+        self.castleRights = ALL_CASTLE_RIGHTS #4 bits mask WKS | WQS | BKS | BQS (see engine/zobrist.py)
+        #Zobrist key of the position (see engine/zobrist.py)
+        self.zobristKey = zobrist_key(self.board, self.whiteToMove, self.castleRights, self.enpassantPossible)
+        #score of the board (material + position tables, see engine/evaluation.py), updated by make_move and undo_move
+        self.boardScore = score_material(self.board)
+        #castling rights, en passant square, captured piece, key and score before each move: UNDO_FIELDS values
+        # per move in a list allocated once, so make_move doesn't create any object
+        self.undoStack = [None] * (UNDO_FIELDS * UNDO_STACK_PLIES)
+        self.undoTop = 0 #next free entry
+        #squares (row, column) of the pieces of each color, kept up to date by make_move and undo_move
+        self.pieceLocations = {'w': set(), 'b': set()}
+        self.set_piece_locations()
 
     def make_move(self, move):
         """ 
         Function that will take a MOVE as a parameter and executes it 
         N.B: this will not work for castling, pawn promotion, and en-passant
         """
+        #push the state that undo_move needs on the undo stack
+        stack = self.undoStack
+        top = self.undoTop
+        if top == len(stack): #the stack is full: make it longer
+            stack.extend([None] * (UNDO_FIELDS * UNDO_STACK_PLIES))
+        stack[top] = self.castleRights
+        stack[top + 1] = self.enpassantPossible
+        stack[top + 2] = move.pieceCaptured
+        stack[top + 3] = self.zobristKey
+        stack[top + 4] = self.boardScore
+        self.undoTop = top + UNDO_FIELDS
+
+        #Zobrist key and score: remove the moved piece, the captured piece and the old rights
+        key = self.zobristKey ^ BLACK_TO_MOVE_KEY ^ CASTLE_KEYS[self.castleRights]
+        key ^= PIECE_KEYS[move.pieceMoved][move.startRow][move.startCol]
+        score = self.boardScore - PIECE_SQUARE_SCORES[move.pieceMoved][move.startRow][move.startCol]
+        if move.pieceCaptured != '--':
+            key ^= PIECE_KEYS[move.pieceCaptured][move.startRow if move.isEnpassantMove else move.endRow][move.endCol]
+            score -= PIECE_SQUARE_SCORES[move.pieceCaptured][move.startRow if move.isEnpassantMove else move.endRow][move.endCol]
+        if self.enpassantPossible != ():
+            key ^= ENPASSANT_KEYS[self.enpassantPossible[1]]
+
         self.board[move.startRow][move.startCol] = "--"
         self.board[move.endRow][move.endCol] = move.pieceMoved
         self.moveLog.append(move) #log the move so we can undo it later
+        locations = self.pieceLocations[move.pieceMoved[0]]
+        locations.remove((move.startRow, move.startCol))
+        locations.add((move.endRow, move.endCol))
+        if move.pieceCaptured != '--':
+            self.pieceLocations[move.pieceCaptured[0]].remove((move.startRow if move.isEnpassantMove else move.endRow, move.endCol))
         self.whiteToMove = not self.whiteToMove #swap players turn
         #update the King location after being moved
         if move.pieceMoved == "wK":
@@ -77,14 +124,54 @@ class GameState():
             if move.endCol - move.startCol == 2: #kingside castle move
                 self.board[move.endRow][move.endCol-1] = self.board[move.endRow][move.endCol+1] #move the rook (1 square away from the click move)
                 self.board[move.endRow][move.endCol+1 ] = '--'
+                rook_keys = PIECE_KEYS[self.board[move.endRow][move.endCol-1]][move.endRow]
+                key ^= rook_keys[move.endCol+1] ^ rook_keys[move.endCol-1]
+                rook_scores = PIECE_SQUARE_SCORES[self.board[move.endRow][move.endCol-1]][move.endRow]
+                score += rook_scores[move.endCol-1] - rook_scores[move.endCol+1]
+                locations.remove((move.endRow, move.endCol+1))
+                locations.add((move.endRow, move.endCol-1))
             else: #queenside castle move
                 self.board[move.endRow][move.endCol+1] = self.board[move.endRow][move.endCol-2] #move the rook (2 square away from the click move)
                 self.board[move.endRow][move.endCol-2 ] = '--'
+                rook_keys = PIECE_KEYS[self.board[move.endRow][move.endCol+1]][move.endRow]
+                key ^= rook_keys[move.endCol-2] ^ rook_keys[move.endCol+1]
+                rook_scores = PIECE_SQUARE_SCORES[self.board[move.endRow][move.endCol+1]][move.endRow]
+                score += rook_scores[move.endCol+1] - rook_scores[move.endCol-2]
+                locations.remove((move.endRow, move.endCol-2))
+                locations.add((move.endRow, move.endCol+1))
 
         #update castling rights - whenever it is a rook or a king move
         self.update_castle_rights(move)
-        self.castleRightsLog.append(CastleRights(self.currentCastlingRight.wks, self.currentCastlingRight.bks, 
-                                                self.currentCastlingRight.wqs, self.currentCastlingRight.bqs))
+
+        #add the piece on its end square (queen after a promotion) and the new rights to the key
+        key ^= PIECE_KEYS[self.board[move.endRow][move.endCol]][move.endRow][move.endCol]
+        if self.enpassantPossible != ():
+            key ^= ENPASSANT_KEYS[self.enpassantPossible[1]]
+        self.zobristKey = key ^ CASTLE_KEYS[self.castleRights]
+        self.boardScore = score + PIECE_SQUARE_SCORES[self.board[move.endRow][move.endCol]][move.endRow][move.endCol]
+
+    def make_null_move(self):
+        """
+        Pass the turn without moving (null move of the search): only the side to move and the en passant
+        square change. It is logged as None in moveLog and undone by undo_move.
+        """
+        stack = self.undoStack
+        top = self.undoTop
+        if top == len(stack): #longer game than expected: grow the stack
+            stack.extend([None] * (UNDO_FIELDS * UNDO_STACK_PLIES))
+        stack[top] = self.castleRights
+        stack[top + 1] = self.enpassantPossible
+        stack[top + 2] = '--'
+        stack[top + 3] = self.zobristKey
+        stack[top + 4] = self.boardScore
+        self.undoTop = top + UNDO_FIELDS
+        self.moveLog.append(None)
+        key = self.zobristKey ^ BLACK_TO_MOVE_KEY
+        if self.enpassantPossible != ():
+            key ^= ENPASSANT_KEYS[self.enpassantPossible[1]]
+            self.enpassantPossible = ()
+        self.zobristKey = key
+        self.whiteToMove = not self.whiteToMove
 
     def undo_move(self):
         """
@@ -92,9 +179,29 @@ class GameState():
         """
         if len(self.moveLog) != 0 : #Make sur that there is a move to undo
             move = self.moveLog.pop()
+            #pop the state before the move from the undo stack
+            stack = self.undoStack
+            top = self.undoTop - UNDO_FIELDS
+            self.undoTop = top
+            self.castleRights = stack[top]
+            self.enpassantPossible = stack[top + 1]
+            captured = stack[top + 2]
+            self.zobristKey = stack[top + 3]
+            self.boardScore = stack[top + 4]
+            if move is None: #null move: only the turn changed
+                self.whiteToMove = not self.whiteToMove
+                self.checkMate = False
+                self.staleMate = False
+                return
+
             self.board[move.startRow][move.startCol] = move.pieceMoved
-            self.board[move.endRow][move.endCol] = move.pieceCaptured
+            self.board[move.endRow][move.endCol] = captured
             self.whiteToMove = not self.whiteToMove #swith turns back
+            locations = self.pieceLocations[move.pieceMoved[0]]
+            locations.remove((move.endRow, move.endCol))
+            locations.add((move.startRow, move.startCol))
+            if captured != '--':
+                self.pieceLocations[captured[0]].add((move.startRow if move.isEnpassantMove else move.endRow, move.endCol))
             #update the King location after being moved
             if move.pieceMoved == "wK":
                 self.whiteKingLocation = (move.startRow, move.startCol)
@@ -103,75 +210,107 @@ class GameState():
             #undo the enpassant move
             if move.isEnpassantMove:
                 self.board[move.endRow][move.endCol] = '--' #leave lending square empty
-                self.board[move.startRow][move.endCol] = move.pieceCaptured
-                self.enpassantPossible = (move.endRow, move.endCol)
-            #undo a 2 square pawn advance
-            if move.pieceMoved[1] == 'p' and abs(move.startRow - move.endRow) == 2:
-                self.enpassantPossible = ()
+                self.board[move.startRow][move.endCol] = captured
             
-            #Undo castling rights
-            self.castleRightsLog.pop() #Get rid of the new castling right
-            new_Rights = self.castleRightsLog[-1] #set the current state rights to the last one in the list
-            self.currentCastlingRight = CastleRights(new_Rights.wks, new_Rights.bks, new_Rights.wqs, new_Rights.bqs)
             #undo the castling move
             if move.isCastleMove:
                 if move.endCol - move.startCol == 2: #kingside
                     self.board[move.endRow][move.endCol+1] = self.board[move.endRow][move.endCol-1]
                     self.board[move.endRow][move.endCol-1] = '--'
+                    locations.remove((move.endRow, move.endCol-1))
+                    locations.add((move.endRow, move.endCol+1))
                 else: #queenside
                     self.board[move.endRow][move.endCol-2] = self.board[move.endRow][move.endCol+1]
                     self.board[move.endRow][move.endCol+1] = '--'
+                    locations.remove((move.endRow, move.endCol+1))
+                    locations.add((move.endRow, move.endCol-2))
+
+
+    def set_position(self, board, white_to_move, castle_rights, enpassant_possible):
+        '''
+        Replace the game by a given position (see parse_fen in engine/fen.py) and clear the move log
+            castle_rights : 4 bits mask (see engine/zobrist.py)
+            enpassant_possible : (row, column) of the en passant square or ()
+        '''
+        self.board[:] = [row[:] for row in board] #keep the same list, the UI holds a reference to it
+        self.whiteToMove = white_to_move
+        self.moveLog = []
+        self.fenClocks = (0, 1)
+        for row in range(8):
+            for column in range(8):
+                if self.board[row][column] == "wK":
+                    self.whiteKingLocation = (row, column)
+                elif self.board[row][column] == "bK":
+                    self.blackKingLocation = (row, column)
+        self.checkMate = False
+        self.staleMate = False
+        self.enpassantPossible = enpassant_possible
+        self.castleRights = castle_rights
+        self.zobristKey = zobrist_key(self.board, self.whiteToMove, self.castleRights, self.enpassantPossible)
+        self.boardScore = score_material(self.board)
+        self.undoTop = 0
+        self.set_piece_locations()
+
+    @classmethod
+    def from_fen(cls, fen, fast_legality = False):
+        '''
+        New game starting from a FEN position (see engine/fen.py)
+        '''
+        gs = cls(fast_legality)
+        gs.set_position(*parse_fen(fen))
+        gs.fenClocks = fen_clocks(fen)
+        return gs
+
+    def to_fen(self):
+        '''
+        FEN of the current position
+        '''
+        return format_fen(self.board, self.whiteToMove, self.castle_rights_mask(), self.enpassantPossible,
+                          *game_clocks(self))
+
+    def set_piece_locations(self):
+        '''
+        Fill the piece lists from the board
+        '''
+        for color in ('w', 'b'):
+            self.pieceLocations[color].clear()
+        for row in range(8):
+            for column in range(8):
+                piece = self.board[row][column]
+                if piece != "--":
+                    self.pieceLocations[piece[0]].add((row, column))
 
+    def castle_rights_mask(self):
+        '''
+        4 bits mask of the current castling rights
+        '''
+        return self.castleRights
 
     def update_castle_rights(self, move):
         '''
-        Update the castle rights given by the move
-        '''
-        if move.pieceMoved == 'wK':
-            self.currentCastlingRight.wks = False
-            self.currentCastlingRight.wqs = False
-        elif move.pieceMoved == 'bK':
-            self.currentCastlingRight.bks = False
-            self.currentCastlingRight.bqs = False
-        elif move.pieceMoved == 'wR':
-            if move.startRow == 7:
-                if move.startCol == 0: #left rook
-                    self.currentCastlingRight.wqs = False
-                elif move.startCol == 7: #right rook
-                    self.currentCastlingRight.wks = False
-        elif move.pieceMoved == 'bR':
-            if move.startRow == 0:
-                if move.startCol == 0: #left rook
-                    self.currentCastlingRight.bqs = False
-                elif move.startCol == 7: #right rook
-                    self.currentCastlingRight.bks = False
+        Update the castle rights given by the move (king or rook move, rook captured on its square)
+        '''
+        self.castleRights &= CASTLE_RIGHTS[move.startRow][move.startCol] & CASTLE_RIGHTS[move.endRow][move.endCol]
         
     def get_valid_moves(self):
         '''
         Function that will general ONLY the valid moves
         '''
         temp_enpassant_possible = self.enpassantPossible #save the value in a temp parameter to avoid to have it changed
-        temp_castle_rights = CastleRights(self.currentCastlingRight.wks, self.currentCastlingRight.bks,
-                                        self.currentCastlingRight.wqs, self.currentCastlingRight.bqs)
+        temp_castle_rights = self.castleRights #4 bits mask, nothing to allocate
         #1.) generate all possible moves
         moves = self.get_all_possible_moves()
         if self.whiteToMove:
             self.get_castle_moves(self.whiteKingLocation[0], self.whiteKingLocation[1], moves)
         else:
             self.get_castle_moves(self.blackKingLocation[0], self.blackKingLocation[1], moves)
-        #2.) for each move, make the move
-        for i in range(len(moves)-1, -1, -1): #when removing from a list go backwards through that list
-            self.make_move(moves[i])            
-            #3.) generate all opponent's moves            
-            #4.) for each of your opponent's moves, see if they attack your king
-            self.whiteToMove = not self.whiteToMove # because make_move switch the turn, 
-                                                    # we need to switch back to the player turn
-                                                    # to verify opponent possible moves before 
-                                                    # giving him the turn
-            if self.in_Check(): #if the move make the king in check
-                moves.remove(moves[i])
-            self.whiteToMove = not self.whiteToMove # give the turn to the opponent
-            self.undo_move()
+        if self.fastLegality:
+            self.remove_illegal_moves(moves)
+        else:
+            #2.) for each move, make the move
+            for i in range(len(moves)-1, -1, -1): #when removing from a list go backwards through that list
+                if self.leaves_king_in_check(moves[i]): #if the move make the king in check
+                    moves.remove(moves[i])
         if len(moves) == 0: #either checkmate or stalemate
             if self.in_Check():
                 self.checkMate = True
@@ -182,10 +321,232 @@ class GameState():
             self.staleMate = False
         
         self.enpassantPossible = temp_enpassant_possible #Reset the value back
-        self.currentCastlingRight = temp_castle_rights
+        self.castleRights = temp_castle_rights
         #5.) if they do attack your king, not a valid move        
         return moves #for now we will not worry about checks
 
+    def get_staged_moves(self, hash_move = None, killers = (), capture_key = None, quiet_key = None):
+        """
+        Generator of the valid moves in the order of engine/stagedMoves.py: hash move, captures,
+        promotions, killer moves, then the other quiet moves (same interface as ChessEngineC).
+        Each stage is only generated, and its moves tested for legality, when the previous one is
+        exhausted: the hash move and the killers are looked for among the moves of their starting
+        square, the captures and the quiet moves come from the move functions called with captures
+        or quiets only. The moves can be made and undone between two stages. Unlike get_valid_moves,
+        checkMate and staleMate are only updated when there is no valid move.
+        """
+        given = [] #moveID of the hash move and the killers already given
+        if hash_move is not None:
+            move = self.find_valid_move(hash_move)
+            if move is not None:
+                given.append(move.moveID)
+                yield move
+
+        captures = []
+        self.add_legal_moves(captures, quiets = False)
+        if capture_key is not None:
+            captures.sort(key = capture_key, reverse = True)
+        for move in captures:
+            if move.moveID not in given:
+                yield move
+
+        #the advances of the (p)awns on the row before the back row are the promotions
+        promotion_row = 1 if self.whiteToMove else 6
+        pawn = 'wp' if self.whiteToMove else 'bp'
+        promotions = []
+        self.add_legal_moves(promotions, captures = False,
+                             squares = [(row, column) for row, column in self.pieceLocations[pawn[0]]
+                                        if row == promotion_row and self.board[row][column] == pawn])
+        for move in promotions:
+            if move.moveID not in given:
+                yield move
+
+        for killer in killers:
+            if killer is None or killer.moveID in given:
+                continue
+            move = self.find_valid_move(killer)
+            if move is not None and move.pieceCaptured == "--" and not move.isPawnPromotion:
+                given.append(move.moveID)
+                yield move
+
+        quiets = []
+        self.add_legal_moves(quiets, captures = False)
+        if quiet_key is not None:
+            quiets.sort(key = quiet_key, reverse = True)
+        for move in quiets:
+            if not move.isPawnPromotion and move.moveID not in given:
+                yield move
+
+        if not (captures or promotions or quiets): #either checkmate or stalemate
+            self.checkMate = self.in_Check()
+            self.staleMate = not self.checkMate
+
+    def get_capture_moves(self):
+        """
+        Valid captures only (en passant included), for the quiescence search: the quiet moves are
+        never generated, only the captures go through the legality test (same interface as
+        ChessEngineC). Unlike get_valid_moves, checkMate and staleMate are not updated.
+        """
+        moves = []
+        self.add_legal_moves(moves, quiets = False)
+        return moves
+
+    def add_legal_moves(self, moves, captures = True, quiets = True, squares = None):
+        '''
+        Add the valid moves of the side to move to the list: the moves of the move functions, then
+        the legality test of get_valid_moves on these moves only
+            captures : moves to an enemy piece (en passant included)
+            quiets : moves to an empty square (castling included)
+            squares : starting squares of the moves, None for all the pieces of the side to move
+        '''
+        temp_enpassant_possible = self.enpassantPossible
+        temp_castle_rights = self.castleRights
+        new_moves = []
+        if squares is None:
+            squares = self.pieceLocations['w' if self.whiteToMove else 'b']
+        for row, column in squares:
+            self.moveFunctions[self.board[row][column][1]](row, column, new_moves, captures, quiets)
+        king_row, king_col = self.whiteKingLocation if self.whiteToMove else self.blackKingLocation
+        if quiets and (king_row, king_col) in squares:
+            self.get_castle_moves(king_row, king_col, new_moves)
+        if self.fastLegality:
+            self.remove_illegal_moves(new_moves)
+        else:
+            for i in range(len(new_moves)-1, -1, -1):
+                if self.leaves_king_in_check(new_moves[i]):
+                    del new_moves[i]
+        self.enpassantPossible = temp_enpassant_possible
+        self.castleRights = temp_castle_rights
+        moves.extend(new_moves)
+
+    def find_valid_move(self, move):
+        '''
+        Valid move of the position with the same squares as 'move' (a move of any position), None if
+        there is none. Only the moves of its starting square are generated and tested.
+        '''
+        if self.board[move.startRow][move.startCol][0] != ('w' if self.whiteToMove else 'b'):
+            return None
+        moves = []
+        self.add_legal_moves(moves, squares = ((move.startRow, move.startCol),))
+        move_id = move.moveID
+        for valid_move in moves:
+            if valid_move.moveID == move_id:
+                return valid_move
+        return None
+
+    def has_non_pawn_material(self):
+        '''
+        True if the side to move has a piece other than its king and pawns (without it, passing the
+        turn is often the best move: the null move of the search would be wrong, zugzwang)
+        '''
+        board = self.board
+        for row, column in self.pieceLocations['w' if self.whiteToMove else 'b']:
+            if board[row][column][1] in 'NBRQ':
+                return True
+        return False
+
+    def has_legal_move(self):
+        '''
+        True if the side to move has at least one valid move: the search only needs to know that a
+        position is not a checkMate or a staleMate, so the moves are tested one by one until the
+        first legal one (castling is never needed: if the king can castle, it can also move 1 square)
+        '''
+        #copy of the squares: making the moves changes the sets of pieceLocations
+        for row, column in list(self.pieceLocations['w' if self.whiteToMove else 'b']):
+            moves = []
+            self.moveFunctions[self.board[row][column][1]](row, column, moves)
+            for move in moves:
+                if not self.leaves_king_in_check(move):
+                    return True
+        return False
+
+    def leaves_king_in_check(self, move):
+        '''
+        Make the move and look if the king of the player who moved is attacked, then undo the move
+        '''
+        self.make_move(move)
+        #3.) generate all opponent's moves            
+        #4.) for each of your opponent's moves, see if they attack your king
+        self.whiteToMove = not self.whiteToMove # because make_move switch the turn, 
+                                                # we need to switch back to the player turn
+                                                # to verify opponent possible moves before 
+                                                # giving him the turn
+        in_check = self.in_Check()
+        self.whiteToMove = not self.whiteToMove # give the turn to the opponent
+        self.undo_move()
+        return in_check
+
+    def remove_illegal_moves(self, moves):
+        '''
+        Fast legality mode: remove the moves leaving the king in check without making them
+            - the king can't go to an attacked square (looked at with the king taken off the board)
+            - in double check, only the king can move
+            - in single check, the other pieces must capture the checking piece or block its line
+            - a pinned piece must stay on the line between the king and the pinning piece
+        En passant captures remove 2 pieces from the board, they are still made and tested.
+        The order of the remaining moves is the same as with the default mode.
+        '''
+        king_row, king_col = self.whiteKingLocation if self.whiteToMove else self.blackKingLocation
+        pin_lines, checkers = self.get_pins_and_checks(king_row, king_col)
+        for i in range(len(moves)-1, -1, -1): #when removing from a list go backwards through that list
+            move = moves[i]
+            end_sq = (move.endRow, move.endCol)
+            if move.isEnpassantMove:
+                illegal = self.leaves_king_in_check(move)
+            elif move.pieceMoved[1] == 'K':
+                self.board[king_row][king_col] = "--" #a slider attacking the king also attacks behind it
+                illegal = self.square_under_attack(move.endRow, move.endCol)
+                self.board[king_row][king_col] = move.pieceMoved
+            elif len(checkers) > 1:
+                illegal = True
+            else:
+                start_sq = (move.startRow, move.startCol)
+                illegal = (len(checkers) == 1 and end_sq not in checkers[0]) or \
+                          (start_sq in pin_lines and end_sq not in pin_lines[start_sq])
+            if illegal:
+                del moves[i]
+
+    def get_pins_and_checks(self, king_row, king_col):
+        '''
+        Look outward from the king at (king_row, king_col)
+        return pin_lines, checkers
+            pin_lines : {square of a pinned piece: squares from the king to the pinning piece}
+            checkers : for each checking piece, the set of squares capturing it or blocking its line
+        '''
+        board = self.board
+        if self.whiteToMove:
+            ally_color, enemy_knight, enemy_pawn, pawn_row = 'w', 'bN', 'bp', king_row - 1
+        else:
+            ally_color, enemy_knight, enemy_pawn, pawn_row = 'b', 'wN', 'wp', king_row + 1
+        pin_lines = {}
+        checkers = []
+        for j, (d, squares) in enumerate(QUEEN_RAYS[king_row][king_col]):
+            sliders = ('R', 'Q') if j < 4 else ('B', 'Q') #orthogonal directions first
+            ally_sq = None
+            for i, (end_row, end_col) in enumerate(squares):
+                end_piece = board[end_row][end_col]
+                if end_piece == "--":
+                    continue
+                if end_piece[0] == ally_color:
+                    if ally_sq is not None: #2 pieces of ours: no pin in this direction
+                        break
+                    ally_sq = (end_row, end_col)
+                else:
+                    if end_piece[1] in sliders:
+                        if ally_sq is None:
+                            checkers.append(set(squares[:i+1]))
+                        else:
+                            pin_lines[ally_sq] = set(squares[:i+1])
+                    break
+        for end_row, end_col in KNIGHT_TARGETS[king_row][king_col]:
+            if board[end_row][end_col] == enemy_knight:
+                checkers.append({(end_row, end_col)})
+        if 0 <= pawn_row < 8:
+            for end_col in (king_col - 1, king_col + 1):
+                if 0 <= end_col < 8 and board[pawn_row][end_col] == enemy_pawn:
+                    checkers.append({(pawn_row, end_col)})
+        return pin_lines, checkers
+
     def in_Check(self):
         '''
         Function that will determine if the current player is in check
@@ -196,144 +557,129 @@ class GameState():
             return self.square_under_attack(self.blackKingLocation[0], self.blackKingLocation[1])
 
     def square_under_attack(self, r, c):
-        '''
-        Determine if the enemy can attack the square r,c
-        '''
-        self.whiteToMove = not self.whiteToMove #switch to the opponent move, to see their possible moves
-        opp_Moves = self.get_all_possible_moves()
-        self.whiteToMove = not self.whiteToMove #swith back to the player turn
-        for move in opp_Moves:
-            if move.endRow == r and move.endCol == c : #square r,c is under attack                
-                return True
-        return False
-        
+        """
+        Determine if the enemy can attack the square (r,c) (see square_attacked in engine/chessTables.py)
+        """
+        return square_attacked(self.board, r, c, self.whiteToMove)
+
     def get_all_possible_moves(self):
         """
         All moves without considering checks
         """
         moves = []
-        for row in range(len(self.board)):  #number of rows
-            for column in range (len(self.board[row])): #number of columns in given row
-                turn = self.board[row][column][0] #if it is the turn of white or black turn. The '[0]' takes the first later of the element in the matrix 'wR' -> 'w'
-                if (turn == 'w' and self.whiteToMove) or (turn == 'b' and not self.whiteToMove):
-                    piece = self.board[row][column][1]
-                    self.moveFunctions[piece](row,column,moves) #call the appropriate move function based on piece type
+        for row, column in self.pieceLocations['w' if self.whiteToMove else 'b']: #occupied squares of the side to move only
+            piece = self.board[row][column][1]
+            self.moveFunctions[piece](row,column,moves) #call the appropriate move function based on piece type
         return moves  
     """
     All the functions to make the pawn moves
     """
-    def chess_moves(self, r, c, moves, directions): # to define the precise movement of the piece
+    def chess_moves(self, r, c, moves, targets, captures = True, quiets = True): # to define the precise movement of the piece
         """
-        r_m : vertical movement (+ : top || - : bottom)
-        c_m : horizontal movement (+ : right || - : left)
+        targets : precomputed squares reached by the piece from (r, c) (see engine/chessTables.py)
+        captures, quiets : add the moves to an enemy piece, the moves to an empty square (see get_staged_moves)
         """         
         color_enemy = "b" if self.whiteToMove else "w" 
-        for d in directions:
-            end_row = r + d[0]
-            end_col = c + d[1]
-
-            if 0 <= end_col < 8 and 0 <= end_row < 8:
-                end_piece = self.board[end_row][end_col] #piece at the position
-                if end_piece == "--": #if the case is empty
-                    moves.append(Move((r, c), (end_row, end_col), self.board))
-                elif end_piece[0] == color_enemy: #if at this case we have an enemy piece to capture
+        for end_row, end_col in targets:
+            end_piece = self.board[end_row][end_col] #piece at the position
+            if end_piece == "--": #if the case is empty
+                if quiets:
                     moves.append(Move((r, c), (end_row, end_col), self.board))
+            elif captures and end_piece[0] == color_enemy: #if at this case we have an enemy piece to capture
+                moves.append(Move((r, c), (end_row, end_col), self.board))
     
-    def chess_moves_long(self, r, c, moves, d_max, directions): #To define the movement for the pieces that can make long movement
+    def chess_moves_long(self, r, c, moves, rays, captures = True, quiets = True): #To define the movement for the pieces that can make long movement
         """
-        r_m : vertical movement (+ : top || - : bottom)
-        c_m : horizontal movement (+ : right || - : left)
+        rays : precomputed (direction, squares until the edge of the board) from (r, c) (see engine/chessTables.py)
+        captures, quiets : add the moves to the first enemy piece met, the moves to the empty squares
         """ 
         color_enemy = "b" if self.whiteToMove else "w" 
-        for d in directions:
-            for i in range (1, d_max+1):  #Loop among the maximal displacement distance of the pawn
-                end_row = r + d[0] * i
-                end_col = c + d[1] * i   
-                if 0<= end_col < 8 and  0 <= end_row< 8:  #on board
-                    end_piece = self.board[end_row][end_col]
-                    if end_piece == "--": #empty case
+        for d, squares in rays:
+            for end_row, end_col in squares:
+                end_piece = self.board[end_row][end_col]
+                if end_piece == "--": #empty case
+                    if quiets:
                         moves.append(Move((r, c), (end_row, end_col), self.board))                            
-                    elif end_piece[0] == color_enemy: #enemy piece to capture
+                elif end_piece[0] == color_enemy: #enemy piece to capture
+                    if captures:
                         moves.append(Move((r, c), (end_row, end_col), self.board))                        
-                        break #we can't go behind the piece
-                    else: #friendly piece -> invalid case
-                        break #we can't go behind the piece
-                else: #off board
-                    break 
+                    break #we can't go behind the piece
+                else: #friendly piece -> invalid case
+                    break #we can't go behind the piece
     '''
     All the pawn moves
     '''
-    def get_pawn_moves(self, r, c, moves):                
+    def get_pawn_moves(self, r, c, moves, captures = True, quiets = True):                
         """
         Get all the (p)awn moves for the pawn lovated at row, column and add these moves to the list
+        captures : diagonal captures and en passant, quiets : 1 and 2 square advances
         """
         if self.whiteToMove: #white pawn moves
-            if self.board[r-1][c] == "--": #1 square pawn advance
+            if quiets and self.board[r-1][c] == "--": #1 square pawn advance
                 moves.append(Move((r,c), (r-1,c), self.board))
                 if r == 6 and self.board[r-2][c] == "--" : #2 square pawn advance (the pawn to move need to be at the raw '6' (ranks 2)
                     moves.append(Move((r,c), (r-2,c), self.board))
-            if c-1 >= 0: #capture to the left
+            if captures and c-1 >= 0: #capture to the left
                 if self.board[r-1][c-1][0] == 'b': #enemy piece to capture
                     moves.append(Move((r,c), (r-1,c-1), self.board))
                 elif (r-1, c-1) == self.enpassantPossible:
                     moves.append(Move((r,c), (r-1,c-1), self.board, isEnpassantMove= True))
 
-            if c+1 < 8: #capture to the right
+            if captures and c+1 < 8: #capture to the right
                 if self.board[r-1][c+1][0] == 'b': #enemy piece to capture
                     moves.append(Move((r,c), (r-1,c+1), self.board))
                 elif (r-1, c+1) == self.enpassantPossible:
                     moves.append(Move((r,c), (r-1 , c+1), self.board, isEnpassantMove = True))
 
         elif not self.whiteToMove: #black pawn moves
-            if self.board[r+1][c] == "--": #1 square pawn advance
+            if quiets and self.board[r+1][c] == "--": #1 square pawn advance
                 moves.append(Move((r,c), (r+1,c), self.board))
                 if r == 1 and self.board[r+2][c] == "--" : #2 square pawn advance (the pawn to move need to be at the raw '6' (ranks 2)
                     moves.append(Move((r,c), (r+2,c), self.board))
-            if c-1 >= 0: #capture to the left
+            if captures and c-1 >= 0: #capture to the left
                 if c-1 >= 0 and self.board[r+1][c-1][0] == 'w': #enemy piece to capture
                     moves.append(Move((r,c), (r+1,c-1), self.board))
-            if c+1 < 8: #capture to the right
+                elif (r+1, c-1) == self.enpassantPossible:
+                    moves.append(Move((r,c), (r+1,c-1), self.board, isEnpassantMove= True))
+            if captures and c+1 < 8: #capture to the right
                 if self.board[r+1][c+1][0] == 'w': #enemy piece to capture
                     moves.append(Move((r,c), (r+1,c+1), self.board))
+                elif (r+1, c+1) == self.enpassantPossible:
+                    moves.append(Move((r,c), (r+1,c+1), self.board, isEnpassantMove = True))
         #add pawn promotion
 
-    def get_rook_moves(self, r, c, moves):                
+    def get_rook_moves(self, r, c, moves, captures = True, quiets = True):                
         """
         Get all the (R)ook moves for the rook lovated at row, column and add these moves to the list
         """    
-        directions = ((-1,0),(0,-1),(1,0),(0,1)) #Up, left, down, right (straight directions)
-        self.chess_moves_long(r, c, moves, 7, directions) # #move like a (R)ook   
+        self.chess_moves_long(r, c, moves, ROOK_RAYS[r][c], captures, quiets) # #move like a (R)ook   
 
-    def get_knight_moves(self, r, c, moves):
+    def get_knight_moves(self, r, c, moves, captures = True, quiets = True):
         """
         Get all the k(N)ight moves for the rook lovated at row, column and add these moves to the list
         The k(N)ight can move in a L shape : 2 vertical - 1 horizontal OR 1 vertical - 2 horizontal
         """
-        knight_moves = ((-2,-1),(-2,1),(2,-1),(2,1),(-1,-2),(-1,2),(1,2),(1,-2)) #knight positions     
-        self.chess_moves(r, c, moves, knight_moves) #2 vertical and 1 on the side
+        self.chess_moves(r, c, moves, KNIGHT_TARGETS[r][c], captures, quiets) #2 vertical and 1 on the side
                    
-    def get_bishop_moves(self, r, c, moves):
+    def get_bishop_moves(self, r, c, moves, captures = True, quiets = True):
         """
         Get all the (B)ishop moves for the rook lovated at row, column and add these moves to the list
         The bishop can move in the diagonal direction 
         """
-        directions = ((-1,-1),(-1,1),(1,-1),(1,1)) #for diagonals
-        self.chess_moves_long(r, c, moves, 7, directions) # #move like a (R)ook
+        self.chess_moves_long(r, c, moves, BISHOP_RAYS[r][c], captures, quiets) #move in the diagonals
           
-    def get_queen_moves(self, r, c, moves):
+    def get_queen_moves(self, r, c, moves, captures = True, quiets = True):
         """
         Get all the (Q)ueen moves for the rook lovated at row, column and add these moves to the list
         The Quenn can go forward from 7 cases in all the direction. So the Queen can move as a (B)ishop and a (R)ook
         """
-        directions = ((-1,-1),(-1,1),(1,-1),(1,1),(-1,0),(0,-1),(1,0),(0,1)) #for diagonals and straight directions 
-        self.chess_moves_long(r, c, moves, 7, directions) 
+        self.chess_moves_long(r, c, moves, QUEEN_RAYS[r][c], captures, quiets) #diagonals and straight directions
                     
-    def get_king_moves(self, r, c, moves):
+    def get_king_moves(self, r, c, moves, captures = True, quiets = True):
         """
         Get all the (K)ing moves for the rook lovated at row, column and add these moves to the list
         """
-        king_Moves = ((-1,-1),(-1,1),(1,-1),(1,1),(-1,0),(0,-1),(1,0),(0,1)) #for diagonals and straight directions 
-        self.chess_moves(r, c, moves, king_Moves) 
+        self.chess_moves(r, c, moves, KING_TARGETS[r][c], captures, quiets) #1 square in the diagonals and straight directions
         # ally_color = "w" if self.whiteToMove else "b"
         # for row_king_moves, col_king_moves in king_Moves:
         #     endRow = r + row_king_moves
@@ -349,9 +695,9 @@ class GameState():
         '''
         if self.square_under_attack(r, c):
             return #can't castle while we are in check
-        if (self.whiteToMove and self.currentCastlingRight.wks) or (not self.whiteToMove and self.currentCastlingRight.bks) :
+        if self.castleRights & (WKS if self.whiteToMove else BKS):
             self.get_king_side_castle_moves(r,c,moves)
-        if (self.whiteToMove and self.currentCastlingRight.wqs) or (not self.whiteToMove and self.currentCastlingRight.bqs) :
+        if self.castleRights & (WQS if self.whiteToMove else BQS):
             self.get_queen_side_castle_moves(r,c,moves)
     
     def get_king_side_castle_moves(self, r, c, moves):        
@@ -365,23 +711,14 @@ class GameState():
                 moves.append(Move((r, c), (r, c-2), self.board, isCastleMove = True))
                 
 
-class CastleRights():
-    def __init__(self, wks, bks, wqs, bqs):
-        '''
-        wks : white king side
-        bks : black king side
-        wqs : white queen side
-        bqs : black queen side
-        '''
-        self.wks = wks
-        self.bks = bks
-        self.wqs = wqs
-        self.bqs = bqs
-
 class Move():
     """
     A class that will keep track of the movement of the chess pieces
+
+    The attributes live in __slots__ to keep each move small, and the moveID is computed on demand
     """ 
+    __slots__ = ('startRow', 'startCol', 'endRow', 'endCol', 'pieceMoved', 'pieceCaptured',
+                 'isPawnPromotion', 'isEnpassantMove', 'isCastleMove')
     # maps keys to values
     # keys : value
     ranks_to_rows = {"1": 7, "2": 6, "3": 5, "4": 4,
@@ -392,22 +729,22 @@ class Move():
     column_to_files = {v:k for k,v in files_to_column.items()} #reverse the dictionnary files_to_column
 
     def __init__(self, start_sq, end_sq, board, isEnpassantMove = False, isCastleMove = False ) :
-        self.startRow = start_sq[0]
-        self.startCol = start_sq[1]
-        self.endRow = end_sq[0]
-        self.endCol = end_sq[1]
+        self.startRow, self.startCol = start_sq
+        self.endRow, self.endCol = end_sq
         self.pieceMoved = board[self.startRow][self.startCol] #determine the first square selected and thus, the piece that needs to be moved.
         self.pieceCaptured = board[self.endRow][self.endCol] #determine the second square selected and thus, the piece that will be captured.
         #pan promotion      
         self.isPawnPromotion = (self.pieceMoved == 'wp' and self.endRow == 0) or (self.pieceMoved == 'bp' and self.endRow == 7)
         #En passant
         self.isEnpassantMove = isEnpassantMove
-        if self.isEnpassantMove:
+        if isEnpassantMove:
             self.pieceCaptured = 'wp' if self.pieceMoved == 'bp' else 'bp'
         #castle move
         self.isCastleMove = isCastleMove
 
-        self.moveID = self.startRow * 1000 + self.startCol * 100 + self.endRow * 10 + self.endCol #we create a ID for the case in the shape of XXXX -> 6444. 
+    @property
+    def moveID(self):
+        return self.startRow * 1000 + self.startCol * 100 + self.endRow * 10 + self.endCol #we create a ID for the case in the shape of XXXX -> 6444. 
 
     def __eq__(self, other):
         '''
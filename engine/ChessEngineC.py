@@ -0,0 +1,829 @@
+"""
+BITBOARD CHESS ENGINE
+This class is responsible for storing all the information about the current state of a chess game
+
+It exposes the same interface as 'ChessEngineA' (make_move, undo_move, get_valid_moves, whiteToMove,
+checkMate, staleMate, board, moveLog), so the UI and the AI can use it without other changes.
+Instead of scanning the 8x8 board, the position is stored in twelve 64-bit integers (one per piece
+type and color) and the moves are generated with precomputed attack tables.
+
+Squares are numbered sq = row * 8 + column, so that the bit 'sq' of a bitboard is the square
+(row, column) of the 8x8 board used by the UI (row = 0 || rank = 8).
+"""
+from engine.evaluation import PIECE_SQUARE_SCORES, score_material
+from engine.chessTables import UNDO_FIELDS, UNDO_STACK_PLIES
+from engine.fen import parse_fen, fen_clocks, format_fen, game_clocks
+from engine.zobrist import PIECE_KEYS, CASTLE_KEYS, ENPASSANT_KEYS, BLACK_TO_MOVE_KEY, WKS, WQS, BKS, BQS, zobrist_key
+
+FULL_BOARD = (1 << 64) - 1
+FILE_A = sum(1 << (row * 8) for row in range(8))
+FILE_H = FILE_A << 7
+ROW_3 = 0xFF << (5 * 8) #row = 5 || rank = 3 -> white pawns land here after a 1 square advance
+ROW_6 = 0xFF << (2 * 8) #row = 2 || rank = 6 -> black pawns land here after a 1 square advance
+BACK_ROWS = 0xFF | (0xFF << (7 * 8)) #rows 0 and 7 -> the pawns are promoted here
+
+WHITE_PIECES = ('wp', 'wN', 'wB', 'wR', 'wQ', 'wK')
+BLACK_PIECES = ('bp', 'bN', 'bB', 'bR', 'bQ', 'bK')
+
+'''
+Precomputed tables, built once at import time
+'''
+SQUARE_COORDS = [(sq // 8, sq % 8) for sq in range(64)] #sq -> (row, column)
+
+def _on_board(row, column):
+    return 0 <= row < 8 and 0 <= column < 8
+
+def _leaper_attacks(offsets):
+    table = []
+    for sq in range(64):
+        row, column = SQUARE_COORDS[sq]
+        attacks = 0
+        for d_row, d_col in offsets:
+            if _on_board(row + d_row, column + d_col):
+                attacks |= 1 << ((row + d_row) * 8 + column + d_col)
+        table.append(attacks)
+    return table
+
+KNIGHT_ATTACKS = _leaper_attacks(((-2,-1),(-2,1),(2,-1),(2,1),(-1,-2),(-1,2),(1,2),(1,-2)))
+KING_ATTACKS = _leaper_attacks(((-1,-1),(-1,0),(-1,1),(0,-1),(0,1),(1,-1),(1,0),(1,1)))
+#squares attacked by a pawn of the given color standing on sq
+PAWN_ATTACKS = {'w': _leaper_attacks(((-1,-1),(-1,1))), 'b': _leaper_attacks(((1,-1),(1,1)))}
+
+ROOK_DIRECTIONS = ((-1,0),(0,-1),(1,0),(0,1))
+BISHOP_DIRECTIONS = ((-1,-1),(-1,1),(1,-1),(1,1))
+
+def _ray(sq, direction, occupancy = 0):
+    '''
+    Squares reached from sq in the given direction, stopping on the first occupied square
+    '''
+    row, column = SQUARE_COORDS[sq]
+    ray = 0
+    row, column = row + direction[0], column + direction[1]
+    while _on_board(row, column):
+        ray |= 1 << (row * 8 + column)
+        if occupancy >> (row * 8 + column) & 1:
+            break
+        row, column = row + direction[0], column + direction[1]
+    return ray
+
+def _last_square(sq, direction):
+    '''
+    Last square of the ray (on the edge of the board): a piece standing there can't block anything
+    '''
+    ray = _ray(sq, direction)
+    if ray == 0:
+        return 0
+    if direction[0] * 8 + direction[1] < 0: #the ray goes toward the lower squares
+        return ray & -ray
+    return 1 << (ray.bit_length() - 1)
+
+def _line_tables(directions):
+    '''
+    For every square and every line (pair of opposite directions) we store the relevant blockers mask
+    and a dictionary: blockers on the line -> attacked squares on that line.
+    '''
+    masks = [[] for _ in range(64)]
+    tables = [[] for _ in range(64)]
+    for sq in range(64):
+        for i in range(0, len(directions), 2):
+            line = directions[i:i+2]
+            mask = 0
+            for d in line:
+                mask |= _ray(sq, d) & ~_last_square(sq, d)
+            table = {}
+            subset = 0
+            while True: #enumerate every subset of the mask (carry-rippler)
+                attacks = 0
+                for d in line:
+                    attacks |= _ray(sq, d, subset)
+                table[subset] = attacks
+                subset = (subset - mask) & mask
+                if subset == 0:
+                    break
+            masks[sq].append(mask)
+            tables[sq].append(table)
+    return masks, tables
+
+#rook lines: up/down and left/right -- bishop lines: the two diagonals
+ROOK_MASKS, ROOK_TABLES = _line_tables(((-1,0),(1,0),(0,-1),(0,1)))
+BISHOP_MASKS, BISHOP_TABLES = _line_tables(((-1,-1),(1,1),(-1,1),(1,-1)))
+ROOK_EMPTY = [ROOK_TABLES[sq][0][0] | ROOK_TABLES[sq][1][0] for sq in range(64)]
+BISHOP_EMPTY = [BISHOP_TABLES[sq][0][0] | BISHOP_TABLES[sq][1][0] for sq in range(64)]
+
+def rook_attacks(sq, occupancy):
+    masks = ROOK_MASKS[sq]
+    tables = ROOK_TABLES[sq]
+    return tables[0][occupancy & masks[0]] | tables[1][occupancy & masks[1]]
+
+def bishop_attacks(sq, occupancy):
+    masks = BISHOP_MASKS[sq]
+    tables = BISHOP_TABLES[sq]
+    return tables[0][occupancy & masks[0]] | tables[1][occupancy & masks[1]]
+
+def _between_table():
+    '''
+    BETWEEN[a][b] = squares strictly between a and b when they share a line, 0 otherwise
+    '''
+    table = [[0] * 64 for _ in range(64)]
+    for sq in range(64):
+        for d in ROOK_DIRECTIONS + BISHOP_DIRECTIONS:
+            between = 0
+            row, column = SQUARE_COORDS[sq]
+            row, column = row + d[0], column + d[1]
+            while _on_board(row, column):
+                table[sq][row * 8 + column] = between
+                between |= 1 << (row * 8 + column)
+                row, column = row + d[0], column + d[1]
+    return table
+
+BETWEEN = _between_table()
+#LINE[a][b] = the full line going through a and b (used to keep a pinned piece on its pin line)
+LINE = [[(ROOK_EMPTY[a] & ROOK_EMPTY[b]) | (1 << a) | (1 << b) if ROOK_EMPTY[a] >> b & 1 else
+         (BISHOP_EMPTY[a] & BISHOP_EMPTY[b]) | (1 << a) | (1 << b) if BISHOP_EMPTY[a] >> b & 1 else 0
+         for b in range(64)] for a in range(64)]
+
+#castling rights kept after a piece leaves or arrives on the square (rooks and kings corners)
+CASTLE_MASK = [WKS | WQS | BKS | BQS] * 64
+CASTLE_MASK[0] &= ~BQS
+CASTLE_MASK[4] &= ~(BKS | BQS)
+CASTLE_MASK[7] &= ~BKS
+CASTLE_MASK[56] &= ~WQS
+CASTLE_MASK[60] &= ~(WKS | WQS)
+CASTLE_MASK[63] &= ~WKS
+
+
+class GameState():
+    def __init__(self):
+        """
+        Board is an 8x8 2d list, each element of te list has 2 characters.
+        The firest character represents the color of the piece; 'b' or 'w'
+        The second character represents the type of the piece, 'K', 'Q', 'R', 'B', 'N', or 'p'
+        "--" represents an empty space with no piece
+
+        The board is kept for the UI and the AI evaluation, the move generation only uses the bitboards.
+        """
+        self.board = [
+            ["bR", "bN", "bB", "bQ", "bK", "bB", "bN", "bR"], #row = 0 || rank = 8
+            ["bp", "bp", "bp", "bp", "bp", "bp", "bp", "bp"], #row = 1 || rank = 7
+            ["--", "--", "--", "--", "--", "--", "--", "--"], #row = 2 || rank = 6
+            ["--", "--", "--", "--", "--", "--", "--", "--"], #row = 3 || rank = 5
+            ["--", "--", "--", "--", "--", "--", "--", "--"], #row = 4 || rank = 4
+            ["--", "--", "--", "--", "--", "--", "--", "--"], #row = 5 || rank = 3
+            ["wp", "wp", "wp", "wp", "wp", "wp", "wp", "wp"], #row = 6 || rank = 2
+            ["wR", "wN", "wB", "wQ", "wK", "wB", "wN", "wR"]  #row = 7 || rank = 1
+        ]
+        self.whiteToMove = True
+        self.moveLog = []
+        self.fenClocks = (0, 1) #halfmove clock and fullmove number of the first position (see to_fen)
+        self.inCheck = False
+        self.checkMate = False
+        self.staleMate = False
+        self.castleRights = WKS | WQS | BKS | BQS
+        self.enpassantSquare = -1 #square where en passant capture can happen (-1 : none)
+        #castleRights, enpassantSquare, captured piece, zobristKey and boardScore before each move (UNDO_FIELDS values
+        # per move) in a list allocated once, so that make_move doesn't create any object
+        self.undoStack = [None] * (UNDO_FIELDS * UNDO_STACK_PLIES)
+        self.undoTop = 0 #next free entry of the undo stack
+        self.set_bitboards()
+        #Zobrist key of the position (see engine/zobrist.py), updated by make_move and undo_move
+        self.zobristKey = zobrist_key(self.board, self.whiteToMove, self.castleRights, self.enpassantPossible)
+        #score of the board (material + position tables, see engine/evaluation.py), updated by make_move and undo_move
+        self.boardScore = score_material(self.board)
+
+    def set_position(self, board, white_to_move, castle_rights, enpassant_possible):
+        '''
+        Replace the current game by a position (see parse_fen in engine/fen.py), the move log is cleared
+            castle_rights : 4 bits mask (see engine/zobrist.py)
+            enpassant_possible : (row, column) of the en passant square or ()
+        '''
+        self.board[:] = [row[:] for row in board] #same list, the UI keeps a reference to the board
+        self.whiteToMove = white_to_move
+        self.moveLog = []
+        self.fenClocks = (0, 1)
+        self.inCheck = False
+        self.checkMate = False
+        self.staleMate = False
+        self.castleRights = castle_rights
+        self.enpassantSquare = enpassant_possible[0] * 8 + enpassant_possible[1] if enpassant_possible != () else -1
+        self.undoTop = 0
+        self.set_bitboards()
+        self.zobristKey = zobrist_key(self.board, self.whiteToMove, self.castleRights, self.enpassantPossible)
+        self.boardScore = score_material(self.board)
+
+    @classmethod
+    def from_fen(cls, fen):
+        '''
+        New game starting from a FEN position (see engine/fen.py)
+        '''
+        gs = cls()
+        gs.set_position(*parse_fen(fen))
+        gs.fenClocks = fen_clocks(fen)
+        return gs
+
+    def to_fen(self):
+        '''
+        FEN of the current position
+        '''
+        return format_fen(self.board, self.whiteToMove, self.castle_rights_mask(), self.enpassantPossible,
+                          *game_clocks(self))
+
+    def castle_rights_mask(self):
+        '''
+        4 bits mask of the castling rights (same method as ChessEngineA and ChessEngineB)
+        '''
+        return self.castleRights
+
+    def set_bitboards(self):
+        '''
+        Build the twelve bitboards and the occupancy of each color from the 8x8 board
+        '''
+        self.bitboards = {piece: 0 for piece in WHITE_PIECES + BLACK_PIECES}
+        for sq in range(64):
+            row, column = SQUARE_COORDS[sq]
+            piece = self.board[row][column]
+            if piece != "--":
+                self.bitboards[piece] |= 1 << sq
+        self.occupancy = {'w': 0, 'b': 0}
+        for piece in WHITE_PIECES + BLACK_PIECES:
+            self.occupancy[piece[0]] |= self.bitboards[piece]
+
+    @property
+    def whiteKingLocation(self):
+        return SQUARE_COORDS[self.bitboards['wK'].bit_length() - 1]
+
+    @property
+    def blackKingLocation(self):
+        return SQUARE_COORDS[self.bitboards['bK'].bit_length() - 1]
+
+    @property
+    def enpassantPossible(self):
+        return SQUARE_COORDS[self.enpassantSquare] if self.enpassantSquare >= 0 else ()
+
+    def make_move(self, move):
+        """
+        Take a move as a parameter and executes it (castling, pawn promotion and en-passant included)
+        """
+        bitboards = self.bitboards
+        occupancy = self.occupancy
+        board = self.board
+        start = move.startRow * 8 + move.startCol
+        end = move.endRow * 8 + move.endCol
+        piece = move.pieceMoved
+        color = piece[0]
+        move_bits = (1 << start) | (1 << end)
+
+        stack = self.undoStack
+        top = self.undoTop
+        if top == len(stack): #the game is longer than the stack
+            stack.extend([None] * (UNDO_FIELDS * UNDO_STACK_PLIES))
+        stack[top] = self.castleRights
+        stack[top + 1] = self.enpassantSquare
+        stack[top + 2] = move.pieceCaptured
+        stack[top + 3] = self.zobristKey
+        stack[top + 4] = self.boardScore
+        self.undoTop = top + UNDO_FIELDS
+        self.moveLog.append(move) #log the move so we can undo it later
+        key = self.zobristKey ^ BLACK_TO_MOVE_KEY ^ PIECE_KEYS[piece][move.startRow][move.startCol]
+        score = self.boardScore - PIECE_SQUARE_SCORES[piece][move.startRow][move.startCol]
+
+        captured = move.pieceCaptured
+        if captured != '--':
+            captured_sq = (end + 8 if color == 'w' else end - 8) if move.enPassant else end
+            bitboards[captured] ^= 1 << captured_sq
+            occupancy[captured[0]] ^= 1 << captured_sq
+            key ^= PIECE_KEYS[captured][captured_sq // 8][move.endCol]
+            score -= PIECE_SQUARE_SCORES[captured][captured_sq // 8][move.endCol]
+            if move.enPassant:
+                board[move.startRow][move.endCol] = '--' #capture the pawn
+
+        bitboards[piece] ^= move_bits
+        occupancy[color] ^= move_bits
+        board[move.startRow][move.startCol] = '--'
+        board[move.endRow][move.endCol] = piece
+        if move.pawnPromotion: #the pawn is always promoted to a queen
+            bitboards[piece] ^= 1 << end
+            bitboards[color + 'Q'] ^= 1 << end
+            board[move.endRow][move.endCol] = color + 'Q'
+
+        if move.castle: #move the rook
+            if end > start: #kingside
+                rook_start, rook_end = end + 1, end - 1
+            else: #queenside
+                rook_start, rook_end = end - 2, end + 1
+            rook_bits = (1 << rook_start) | (1 << rook_end)
+            bitboards[color + 'R'] ^= rook_bits
+            occupancy[color] ^= rook_bits
+            board[move.endRow][rook_end % 8] = board[move.endRow][rook_start % 8]
+            board[move.endRow][rook_start % 8] = '--'
+            rook_keys = PIECE_KEYS[color + 'R'][move.endRow]
+            key ^= rook_keys[rook_start % 8] ^ rook_keys[rook_end % 8]
+            rook_scores = PIECE_SQUARE_SCORES[color + 'R'][move.endRow]
+            score += rook_scores[rook_end % 8] - rook_scores[rook_start % 8]
+        key ^= PIECE_KEYS[board[move.endRow][move.endCol]][move.endRow][move.endCol]
+        self.boardScore = score + PIECE_SQUARE_SCORES[board[move.endRow][move.endCol]][move.endRow][move.endCol]
+
+        #if pawn moves twice, next move can capture enpassant
+        if self.enpassantSquare >= 0:
+            key ^= ENPASSANT_KEYS[self.enpassantSquare % 8]
+        if piece[1] == 'p' and (end - start == 16 or start - end == 16):
+            self.enpassantSquare = (start + end) // 2
+            key ^= ENPASSANT_KEYS[move.startCol]
+        else:
+            self.enpassantSquare = -1
+        rights = self.castleRights & CASTLE_MASK[start] & CASTLE_MASK[end]
+        self.zobristKey = key ^ CASTLE_KEYS[self.castleRights] ^ CASTLE_KEYS[rights]
+        self.castleRights = rights
+        self.whiteToMove = not self.whiteToMove #swap players turn
+
+    def make_null_move(self):
+        """
+        Pass the turn without moving (null move of the search): only the side to move and the en passant
+        square change. It is logged as None in moveLog and undone by undo_move.
+        """
+        stack = self.undoStack
+        top = self.undoTop
+        if top == len(stack): #longer game than expected: grow the stack
+            stack.extend([None] * (UNDO_FIELDS * UNDO_STACK_PLIES))
+        stack[top] = self.castleRights
+        stack[top + 1] = self.enpassantSquare
+        stack[top + 2] = '--'
+        stack[top + 3] = self.zobristKey
+        stack[top + 4] = self.boardScore
+        self.undoTop = top + UNDO_FIELDS
+        self.moveLog.append(None)
+        key = self.zobristKey ^ BLACK_TO_MOVE_KEY
+        if self.enpassantSquare >= 0:
+            key ^= ENPASSANT_KEYS[self.enpassantSquare % 8]
+            self.enpassantSquare = -1
+        self.zobristKey = key
+        self.whiteToMove = not self.whiteToMove
+
+    def undo_move(self):
+        """
+        Undo the last move made
+        """
+        if len(self.moveLog) != 0: #Make sure that there is a move to undo
+            move = self.moveLog.pop()
+            stack = self.undoStack
+            top = self.undoTop - UNDO_FIELDS
+            self.undoTop = top
+            self.castleRights = stack[top]
+            self.enpassantSquare = stack[top + 1]
+            captured = stack[top + 2]
+            self.zobristKey = stack[top + 3]
+            self.boardScore = stack[top + 4]
+            if move is None: #null move: only the turn changed
+                self.whiteToMove = not self.whiteToMove
+                self.checkMate = False
+                self.staleMate = False
+                return
+            self.whiteToMove = not self.whiteToMove #switch turns back
+            bitboards = self.bitboards
+            occupancy = self.occupancy
+            board = self.board
+            start = move.startRow * 8 + move.startCol
+            end = move.endRow * 8 + move.endCol
+            piece = move.pieceMoved
+            color = piece[0]
+            move_bits = (1 << start) | (1 << end)
+
+            if move.pawnPromotion:
+                bitboards[color + 'Q'] ^= 1 << end
+                bitboards[piece] ^= 1 << end
+            bitboards[piece] ^= move_bits
+            occupancy[color] ^= move_bits
+            board[move.startRow][move.startCol] = piece
+            board[move.endRow][move.endCol] = '--'
+
+            if captured != '--':
+                captured_sq = (end + 8 if color == 'w' else end - 8) if move.enPassant else end
+                bitboards[captured] ^= 1 << captured_sq
+                occupancy[captured[0]] ^= 1 << captured_sq
+                board[captured_sq // 8][captured_sq % 8] = captured
+
+            if move.castle: #put the rook back
+                if end > start: #kingside
+                    rook_start, rook_end = end + 1, end - 1
+                else: #queenside
+                    rook_start, rook_end = end - 2, end + 1
+                rook_bits = (1 << rook_start) | (1 << rook_end)
+                bitboards[color + 'R'] ^= rook_bits
+                occupancy[color] ^= rook_bits
+                board[move.endRow][rook_start % 8] = board[move.endRow][rook_end % 8]
+                board[move.endRow][rook_end % 8] = '--'
+
+            #RESET the checkMate and staleMate status when we undo a move
+            self.checkMate = False
+            self.staleMate = False
+
+    def attackers_to(self, sq, enemy_color, occupancy):
+        '''
+        Bitboard of the enemy pieces attacking the square sq, given the occupancy of the board
+        '''
+        bitboards = self.bitboards
+        pawn, knight, bishop, rook, queen, king = WHITE_PIECES if enemy_color == 'w' else BLACK_PIECES
+        ally_color = 'b' if enemy_color == 'w' else 'w'
+        return (KNIGHT_ATTACKS[sq] & bitboards[knight]) | \
+               (KING_ATTACKS[sq] & bitboards[king]) | \
+               (PAWN_ATTACKS[ally_color][sq] & bitboards[pawn]) | \
+               (rook_attacks(sq, occupancy) & (bitboards[rook] | bitboards[queen])) | \
+               (bishop_attacks(sq, occupancy) & (bitboards[bishop] | bitboards[queen]))
+
+    def square_under_attack(self, r, c):
+        """
+        Determine if the enemy can attack the square (r,c)
+        """
+        enemy_color = 'b' if self.whiteToMove else 'w'
+        return self.attackers_to(r * 8 + c, enemy_color, self.occupancy['w'] | self.occupancy['b']) != 0
+
+    def get_valid_moves(self):
+        """
+        All moves considering check
+        """
+        moves = []
+        self.add_legal_moves(self.get_legality_context(), moves)
+
+        #Now we try to determine if we are in a checkMate or staleMate situation
+        if len(moves) == 0: #IF no move is possible
+            if self.inCheck:
+                self.checkMate = True
+            else:
+                self.staleMate = True
+        else:
+            self.checkMate = False
+            self.staleMate = False
+
+        return moves
+
+    def get_staged_moves(self, hash_move = None, killers = (), capture_key = None, quiet_key = None):
+        """
+        Generator of the valid moves in the order of engine/stagedMoves.py: hash move, captures,
+        promotions, killer moves, then the other quiet moves. Each stage is only generated when the
+        previous one is exhausted, so a search cutting off early never generates the quiet moves.
+        hash_move and killers may come from another position, they are only given if valid here.
+        capture_key and quiet_key sort the captures and the other quiet moves (highest key first).
+        The moves can be made and undone between two stages. Unlike get_valid_moves, checkMate and
+        staleMate are only updated when there is no valid move (inCheck is, when the first move is asked).
+        """
+        context = self.get_legality_context()
+        given = [] #moveID of the hash move and the killers already given
+        if hash_move is not None:
+            move = self.find_valid_move(context, hash_move)
+            if move is not None:
+                given.append(move.moveID)
+                yield move
+
+        color = 'w' if self.whiteToMove else 'b'
+        captures = []
+        self.add_legal_moves(context, captures, self.occupancy['b' if color == 'w' else 'w'], castling = False)
+        if capture_key is not None:
+            captures.sort(key = capture_key, reverse = True)
+        for move in captures:
+            if move.moveID not in given:
+                yield move
+
+        empty = ~(self.occupancy['w'] | self.occupancy['b']) & FULL_BOARD
+        promotions = []
+        self.add_legal_moves(context, promotions, empty & BACK_ROWS, self.bitboards[color + 'p'],
+                             enpassant = False, castling = False)
+        for move in promotions:
+            if move.moveID not in given:
+                yield move
+
+        for killer in killers:
+            if killer is None or killer.moveID in given:
+                continue
+            move = self.find_valid_move(context, killer)
+            if move is not None and move.pieceCaptured == "--" and not move.pawnPromotion:
+                given.append(move.moveID)
+                yield move
+
+        quiets = []
+        self.add_legal_moves(context, quiets, empty, enpassant = False)
+        if quiet_key is not None:
+            quiets.sort(key = quiet_key, reverse = True)
+        for move in quiets:
+            if not move.pawnPromotion and move.moveID not in given:
+                yield move
+
+        if not (captures or promotions or quiets): #no valid move (given contains valid moves only)
+            self.checkMate = self.inCheck
+            self.staleMate = not self.inCheck
+
+    def get_capture_moves(self):
+        """
+        Valid captures only (en passant included), for the quiescence search: the quiet moves are
+        never generated. Unlike get_valid_moves, checkMate and staleMate are not updated.
+        """
+        moves = []
+        self.add_legal_moves(self.get_legality_context(), moves, self.occupancy['b' if self.whiteToMove else 'w'],
+                             castling = False)
+        return moves
+
+    def in_Check(self):
+        '''
+        Function that will determine if the current player is in check
+        '''
+        king = self.bitboards['wK' if self.whiteToMove else 'bK']
+        return self.attackers_to(king.bit_length() - 1, 'b' if self.whiteToMove else 'w',
+                                 self.occupancy['w'] | self.occupancy['b']) != 0
+
+    def has_non_pawn_material(self):
+        '''
+        True if the side to move has a piece other than its king and pawns (without it, passing the
+        turn is often the best move: the null move of the search would be wrong, zugzwang)
+        '''
+        bitboards = self.bitboards
+        pawn, knight, bishop, rook, queen, king = WHITE_PIECES if self.whiteToMove else BLACK_PIECES
+        return (bitboards[knight] | bitboards[bishop] | bitboards[rook] | bitboards[queen]) != 0
+
+    def has_legal_move(self):
+        """
+        True if the side to move has at least one valid move: the search only needs to know that a
+        position is not a checkMate or a staleMate, so the moves are generated one type of piece at a
+        time until one of them can move (castling is never needed: if the king can castle, it can
+        also move 1 square)
+        """
+        context = self.get_legality_context()
+        bitboards = self.bitboards
+        pawn, knight, bishop, rook, queen, king = WHITE_PIECES if self.whiteToMove else BLACK_PIECES
+        moves = []
+        for pieces in (bitboards[king], bitboards[pawn], bitboards[knight],
+                       bitboards[bishop] | bitboards[rook] | bitboards[queen]):
+            self.add_legal_moves(context, moves, FULL_BOARD, pieces, castling = False)
+            if moves:
+                return True
+        return False
+
+    def find_valid_move(self, context, move):
+        '''
+        Valid move of the position with the same squares as 'move' (a move of any position), None if
+        there is none. Only the moves of its starting square to its ending square are generated.
+        '''
+        moves = []
+        self.add_legal_moves(context, moves, 1 << (move.endRow * 8 + move.endCol), 1 << (move.startRow * 8 + move.startCol))
+        move_id = move.moveID
+        for valid_move in moves:
+            if valid_move.moveID == move_id:
+                return valid_move
+        return None
+
+    def get_legality_context(self):
+        '''
+        What the legality of the moves of the side to move depends on, computed once per position:
+        (king square, checking pieces, check mask, pinned pieces)
+            check mask : squares where the pieces other than the king can go (the whole board without
+                         check, the checking piece and the squares in between with 1 check, none with 2)
+        Also sets inCheck
+        '''
+        bitboards = self.bitboards
+        if self.whiteToMove:
+            ally_color, enemy_color, king = 'w', 'b', 'wK'
+            enemy_bishop, enemy_rook, enemy_queen = 'bB', 'bR', 'bQ'
+        else:
+            ally_color, enemy_color, king = 'b', 'w', 'bK'
+            enemy_bishop, enemy_rook, enemy_queen = 'wB', 'wR', 'wQ'
+        own = self.occupancy[ally_color]
+        occupancy = own | self.occupancy[enemy_color]
+        king_sq = bitboards[king].bit_length() - 1
+
+        checkers = self.attackers_to(king_sq, enemy_color, occupancy)
+        self.inCheck = checkers != 0
+
+        pinned = 0
+        if checkers & (checkers - 1): #double check -> only the king can move
+            return king_sq, checkers, 0, pinned
+        if checkers: #only 1 check -> capture the checking piece or block the check
+            check_mask = checkers | BETWEEN[king_sq][checkers.bit_length() - 1]
+        else:
+            check_mask = FULL_BOARD
+
+        #pins: enemy sliders on a line with the king and only one of our pieces in between
+        snipers = (ROOK_EMPTY[king_sq] & (bitboards[enemy_rook] | bitboards[enemy_queen])) | \
+                  (BISHOP_EMPTY[king_sq] & (bitboards[enemy_bishop] | bitboards[enemy_queen]))
+        while snipers:
+            bit = snipers & -snipers
+            snipers ^= bit
+            blockers = BETWEEN[king_sq][bit.bit_length() - 1] & occupancy
+            if blockers and blockers & (blockers - 1) == 0 and blockers & own:
+                pinned |= blockers
+        return king_sq, checkers, check_mask, pinned
+
+    def add_legal_moves(self, context, moves, targets_filter = FULL_BOARD, pieces_filter = FULL_BOARD,
+                        enpassant = True, castling = True):
+        '''
+        Add the legal moves of the position (context from get_legality_context) to the list of moves
+        Only the pieces of the bitboard pieces_filter moving to a square of the bitboard targets_filter
+        are generated, en passant (whatever targets_filter) and castling only if asked.
+        The default values give all the valid moves.
+        '''
+        king_sq, checkers, check_mask, pinned = context
+        board = self.board
+        bitboards = self.bitboards
+        if self.whiteToMove:
+            ally_color, enemy_color = 'w', 'b'
+            pawn, knight, bishop, rook, queen, king = WHITE_PIECES
+        else:
+            ally_color, enemy_color = 'b', 'w'
+            pawn, knight, bishop, rook, queen, king = BLACK_PIECES
+        own = self.occupancy[ally_color]
+        occupancy = own | self.occupancy[enemy_color]
+        king_bb = bitboards[king]
+        attackers_to = self.attackers_to
+
+        #1) King moves: the king can't go on an attacked square (the king is removed from the
+        #   occupancy so that it can't hide behind itself on a slider line)
+        if pieces_filter & king_bb:
+            occupancy_no_king = occupancy ^ king_bb
+            king_start = SQUARE_COORDS[king_sq]
+            targets = KING_ATTACKS[king_sq] & ~own & targets_filter
+            while targets:
+                bit = targets & -targets
+                targets ^= bit
+                end = bit.bit_length() - 1
+                if not attackers_to(end, enemy_color, occupancy_no_king):
+                    moves.append(Move(king_start, SQUARE_COORDS[end], board))
+
+        if not check_mask: #double check -> only the king can move
+            return
+
+        targets_mask = ~own & check_mask & targets_filter
+        free = ~pinned & pieces_filter
+
+        #2) k(N)ights that are not pinned
+        self.add_moves(bitboards[knight] & free, KNIGHT_ATTACKS, targets_mask, moves)
+        #3) sliders that are not pinned
+        for pieces, attacks in ((bitboards[bishop] | bitboards[queen], bishop_attacks),
+                                (bitboards[rook] | bitboards[queen], rook_attacks)):
+            pieces &= free
+            while pieces:
+                bit = pieces & -pieces
+                pieces ^= bit
+                start = bit.bit_length() - 1
+                targets = attacks(start, occupancy) & targets_mask
+                start_coords = SQUARE_COORDS[start]
+                while targets:
+                    target = targets & -targets
+                    targets ^= target
+                    moves.append(Move(start_coords, SQUARE_COORDS[target.bit_length() - 1], board))
+
+        #4) pinned pieces can only move along the pin line
+        pinned_pieces = pinned & pieces_filter
+        while pinned_pieces:
+            bit = pinned_pieces & -pinned_pieces
+            pinned_pieces ^= bit
+            start = bit.bit_length() - 1
+            line_mask = LINE[king_sq][start] & targets_mask
+            if bit & bitboards[knight]: #a pinned k(N)ight can never move
+                continue
+            if bit & bitboards[pawn]:
+                self.add_pawn_moves(bit, line_mask, moves)
+                continue
+            if bit & bitboards[bishop]:
+                targets = bishop_attacks(start, occupancy)
+            elif bit & bitboards[rook]:
+                targets = rook_attacks(start, occupancy)
+            else: #(Q)ueen
+                targets = bishop_attacks(start, occupancy) | rook_attacks(start, occupancy)
+            targets &= line_mask
+            while targets:
+                target = targets & -targets
+                targets ^= target
+                moves.append(Move(SQUARE_COORDS[start], SQUARE_COORDS[target.bit_length() - 1], board))
+
+        #5) pawns that are not pinned
+        self.add_pawn_moves(bitboards[pawn] & free, targets_mask, moves)
+
+        #6) en passant: removes 2 pieces from the same row, so we simply verify the king afterwards
+        if enpassant and self.enpassantSquare >= 0:
+            ep = self.enpassantSquare
+            captured_sq = ep + 8 if self.whiteToMove else ep - 8
+            capturing_pawns = PAWN_ATTACKS[enemy_color][ep] & bitboards[pawn] & pieces_filter
+            while capturing_pawns:
+                bit = capturing_pawns & -capturing_pawns
+                capturing_pawns ^= bit
+                occupancy_after = (occupancy ^ bit ^ (1 << captured_sq)) | (1 << ep)
+                if not attackers_to(king_sq, enemy_color, occupancy_after) & ~(1 << captured_sq):
+                    moves.append(Move(SQUARE_COORDS[bit.bit_length() - 1], SQUARE_COORDS[ep], board, en_passant = True))
+
+        #7) castling
+        if castling and not checkers and pieces_filter & king_bb:
+            self.get_castle_moves(king_sq, occupancy, moves)
+
+    def add_moves(self, pieces, attack_table, targets_mask, moves):
+        '''
+        Add the moves of the leaper pieces (k(N)ights) using their attack table
+        '''
+        board = self.board
+        while pieces:
+            bit = pieces & -pieces
+            pieces ^= bit
+            start = bit.bit_length() - 1
+            targets = attack_table[start] & targets_mask
+            start_coords = SQUARE_COORDS[start]
+            while targets:
+                target = targets & -targets
+                targets ^= target
+                moves.append(Move(start_coords, SQUARE_COORDS[target.bit_length() - 1], board))
+
+    def add_pawn_moves(self, pawns, targets_mask, moves):
+        '''
+        Add the (p)awn advances and captures (without en passant) for all the pawns in one go:
+        the whole set of pawns is shifted, then each target is linked back to its starting square
+        '''
+        board = self.board
+        empty = ~(self.occupancy['w'] | self.occupancy['b'])
+        if self.whiteToMove:
+            enemy = self.occupancy['b']
+            single = (pawns >> 8) & empty
+            double = ((single & ROW_3) >> 8) & empty & targets_mask
+            shifts = ((single & targets_mask, 8), (double, 16),
+                      (((pawns & ~FILE_A) >> 9) & enemy & targets_mask, 9),
+                      (((pawns & ~FILE_H) >> 7) & enemy & targets_mask, 7))
+            back_row = 0
+        else:
+            enemy = self.occupancy['w']
+            single = (pawns << 8) & empty
+            double = ((single & ROW_6) << 8) & empty & targets_mask
+            shifts = ((single & targets_mask, -8), (double, -16),
+                      (((pawns & ~FILE_H) << 9) & enemy & targets_mask, -9),
+                      (((pawns & ~FILE_A) << 7) & enemy & targets_mask, -7))
+            back_row = 7
+        for targets, shift in shifts:
+            while targets:
+                target = targets & -targets
+                targets ^= target
+                end = target.bit_length() - 1
+                end_coords = SQUARE_COORDS[end]
+                moves.append(Move(SQUARE_COORDS[end + shift], end_coords, board,
+                                  pawn_promotion = end_coords[0] == back_row))
+
+    ''' Castling Movements: King and Queen side '''
+    def get_castle_moves(self, king_sq, occupancy, moves):
+        '''
+        Generate all valid castle moves for the king (not in check) and add them to the list of moves
+        '''
+        if self.whiteToMove:
+            king_side, queen_side, enemy_color = WKS, WQS, 'b'
+        else:
+            king_side, queen_side, enemy_color = BKS, BQS, 'w'
+        if self.castleRights & king_side:
+            if not (occupancy >> (king_sq + 1)) & 3: #the 2 squares on the right are empty
+                if not self.attackers_to(king_sq + 1, enemy_color, occupancy) and \
+                   not self.attackers_to(king_sq + 2, enemy_color, occupancy):
+                    moves.append(Move(SQUARE_COORDS[king_sq], SQUARE_COORDS[king_sq + 2], self.board, castle = True))
+        if self.castleRights & queen_side:
+            if not (occupancy >> (king_sq - 3)) & 7: #the 3 squares on the left are empty
+                if not self.attackers_to(king_sq - 1, enemy_color, occupancy) and \
+                   not self.attackers_to(king_sq - 2, enemy_color, occupancy):
+                    moves.append(Move(SQUARE_COORDS[king_sq], SQUARE_COORDS[king_sq - 2], self.board, castle = True))
+
+'''
+Class to contain the pieces's movements
+'''
+class Move():
+    """
+    A class that will keep track of the movement of the chess pieces
+    """
+    __slots__ = ('startRow', 'startCol', 'endRow', 'endCol', 'pieceMoved', 'pieceCaptured',
+                 'enPassant', 'pawnPromotion', 'castle')
+    # maps keys to values
+    # keys : value
+    ranks_to_rows = {"1": 7, "2": 6, "3": 5, "4": 4,
+                     "5": 3, "6": 2, "7": 1, "8": 0} #row = 0 is the top row of the chess board
+    rows_to_ranks = {v:k for k, v in ranks_to_rows.items()} #reverse the dictionnary rows_to_ranks
+    files_to_column = {"a": 0, "b": 1, "c": 2, "d": 3,
+                       "e": 4, "f": 5, "g": 6, "h": 7}
+    column_to_files = {v:k for k,v in files_to_column.items()} #reverse the dictionnary files_to_column
+
+    def __init__(self, start_sq, end_sq, board, en_passant = False, pawn_promotion = False, castle = False) :
+        #thousands of moves are created for each position, so we only store what is needed
+        self.startRow, self.startCol = start_sq
+        self.endRow, self.endCol = end_sq
+        self.pieceMoved = board[self.startRow][self.startCol]   #determine the first square selected and thus, the piece that needs to be moved.
+        self.pieceCaptured = board[self.endRow][self.endCol]    #determine the second square selected and thus, the piece that will be captured.
+        self.enPassant = en_passant
+        self.pawnPromotion = pawn_promotion
+        self.castle = castle
+        if en_passant :
+            self.pieceCaptured = 'bp' if self.pieceMoved == 'wp' else 'wp' #en passant captures opposite colored pawn
+
+    @property
+    def moveID(self):
+        return self.startRow * 1000 + self.startCol * 100 + self.endRow * 10 + self.endCol #we create a ID for the case in the shape of XXXX -> 6444.
+
+    def __eq__(self, other):
+        '''
+        Overriding the equals method
+        '''
+        if isinstance(other, Move): #Verify that the elements 'other' and 'Move' are the same instance, type
+            return self.moveID == other.moveID
+        return False
+
+    def get_chess_notation(self):
+        """ you can add to make this like real chess notation """
+        return self.get_rank_file(self.startRow, self.startCol) + self.get_rank_file(self.endRow, self.endCol)
+
+    def get_rank_file(self, row, column):
+        """ To help to make a real chess notation """
+        return self.column_to_files[column] + self.rows_to_ranks[row]
@@ -0,0 +1,111 @@
+"""
+PRECOMPUTED MOVE TABLES
+Target squares and rays for every square of the 8x8 board, built once at import time.
+
+The move functions of 'ChessEngineA' and 'ChessEngineB' loop over these tables instead of adding
+the direction offsets and checking the bounds of the board (0 <= end_row < 8) for every step.
+Every table is indexed by [row][column]. The castling rights table and the size of the undo stack
+are shared by the game states of the three engines, the attack test of a square (square_attacked) by
+'ChessEngineA' and 'ChessEngineB'.
+"""
+from engine.zobrist import WKS, WQS, BKS, BQS
+
+#orthogonal directions first, then the diagonals: 'check_for_pins_and_checks' relies on this order
+ROOK_DIRECTIONS = ((-1,0),(0,-1),(1,0),(0,1)) #Up, left, down, right (straight directions)
+BISHOP_DIRECTIONS = ((-1,-1),(-1,1),(1,-1),(1,1)) #for diagonals
+QUEEN_DIRECTIONS = ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+KNIGHT_OFFSETS = ((-2,-1),(-2,1),(2,-1),(2,1),(-1,-2),(-1,2),(1,2),(1,-2))
+KING_OFFSETS = ((-1,-1),(-1,0),(-1,1),(0,-1),(0,1),(1,-1),(1,0),(1,1))
+
+def _targets(row, column, offsets):
+    '''
+    Squares reached with a single jump, in the order of the offsets
+    '''
+    return tuple((row + d_row, column + d_col) for d_row, d_col in offsets
+                 if 0 <= row + d_row < 8 and 0 <= column + d_col < 8)
+
+def _rays(row, column, directions):
+    '''
+    For each direction: (direction, squares from the closest to the furthest one until the edge)
+    The directions leading directly off the board are kept with an empty ray so that the index of
+    a direction is the same for every square.
+    '''
+    rays = []
+    for d in directions:
+        squares = []
+        end_row, end_col = row + d[0], column + d[1]
+        while 0 <= end_row < 8 and 0 <= end_col < 8:
+            squares.append((end_row, end_col))
+            end_row, end_col = end_row + d[0], end_col + d[1]
+        rays.append((d, tuple(squares)))
+    return tuple(rays)
+
+KNIGHT_TARGETS = [[_targets(r, c, KNIGHT_OFFSETS) for c in range(8)] for r in range(8)]
+KING_TARGETS = [[_targets(r, c, KING_OFFSETS) for c in range(8)] for r in range(8)]
+#squares attacked by a (p)awn of each color (white pawns move up the board: row - 1)
+PAWN_ATTACK_TARGETS = {'w': [[_targets(r, c, ((-1,-1),(-1,1))) for c in range(8)] for r in range(8)],
+                       'b': [[_targets(r, c, ((1,-1),(1,1))) for c in range(8)] for r in range(8)]}
+ROOK_RAYS = [[_rays(r, c, ROOK_DIRECTIONS) for c in range(8)] for r in range(8)]
+BISHOP_RAYS = [[_rays(r, c, BISHOP_DIRECTIONS) for c in range(8)] for r in range(8)]
+QUEEN_RAYS = [[ROOK_RAYS[r][c] + BISHOP_RAYS[r][c] for c in range(8)] for r in range(8)]
+
+def square_attacked(board, r, c, white_to_move):
+    '''
+    Determine if the enemy of the side to move (white_to_move) can attack the square (r,c) of the board
+
+    Instead of generating all the opponent's moves, we look outward from the square along the
+    k(N)ight, (p)awn, (K)ing and slider lines and stop on the first piece found on each line
+    '''
+    if white_to_move:
+        enemy_color, enemy_pawn, enemy_knight, enemy_king = 'b', 'bp', 'bN', 'bK'
+        pawn_row = r - 1 #black pawns attack downward, so they stand 1 row above the square
+    else:
+        enemy_color, enemy_pawn, enemy_knight, enemy_king = 'w', 'wp', 'wN', 'wK'
+        pawn_row = r + 1 #white pawns attack upward, so they stand 1 row below the square
+    #1) enemy k(N)ights
+    for end_row, end_col in KNIGHT_TARGETS[r][c]:
+        if board[end_row][end_col] == enemy_knight:
+            return True
+    #2) enemy (p)awns
+    if 0 <= pawn_row < 8:
+        if c > 0 and board[pawn_row][c-1] == enemy_pawn:
+            return True
+        if c < 7 and board[pawn_row][c+1] == enemy_pawn:
+            return True
+    #3) enemy (K)ing
+    for end_row, end_col in KING_TARGETS[r][c]:
+        if board[end_row][end_col] == enemy_king:
+            return True
+    #4) enemy sliders: the first piece found on a straight line must be a (R)ook or a (Q)ueen,
+    #   the first piece found on a diagonal must be a (B)ishop or a (Q)ueen
+    for d, squares in ROOK_RAYS[r][c]:
+        for end_row, end_col in squares:
+            end_piece = board[end_row][end_col]
+            if end_piece != "--":
+                if end_piece[0] == enemy_color and (end_piece[1] == 'R' or end_piece[1] == 'Q'):
+                    return True
+                break #the piece blocks the line
+    for d, squares in BISHOP_RAYS[r][c]:
+        for end_row, end_col in squares:
+            end_piece = board[end_row][end_col]
+            if end_piece != "--":
+                if end_piece[0] == enemy_color and (end_piece[1] == 'B' or end_piece[1] == 'Q'):
+                    return True
+                break #the piece blocks the line
+    return False
+
+#castling rights (4 bits mask, see engine/zobrist.py) kept by a move starting or ending on a square:
+# the (K)ing or a (R)ook leaving its starting square, or a (R)ook captured on it, loses the rights
+ALL_CASTLE_RIGHTS = WKS | WQS | BKS | BQS
+CASTLE_RIGHTS = [[ALL_CASTLE_RIGHTS] * 8 for r in range(8)]
+CASTLE_RIGHTS[7][4] = ALL_CASTLE_RIGHTS ^ (WKS | WQS)
+CASTLE_RIGHTS[7][7] = ALL_CASTLE_RIGHTS ^ WKS
+CASTLE_RIGHTS[7][0] = ALL_CASTLE_RIGHTS ^ WQS
+CASTLE_RIGHTS[0][4] = ALL_CASTLE_RIGHTS ^ (BKS | BQS)
+CASTLE_RIGHTS[0][7] = ALL_CASTLE_RIGHTS ^ BKS
+CASTLE_RIGHTS[0][0] = ALL_CASTLE_RIGHTS ^ BQS
+
+#undo stack of the game states: a flat list of UNDO_FIELDS values per move (castling rights, en passant
+# square, captured piece, Zobrist key, board score), allocated once for UNDO_STACK_PLIES moves and extended when full
+UNDO_FIELDS = 5
+UNDO_STACK_PLIES = 256
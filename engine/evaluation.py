@@ -0,0 +1,144 @@
+# Piece Square Tables, adapted from Sunfish.py:
+# https://github.com/thomasahle/sunfish/blob/master/sunfish.py
+
+"""
+EVALUATION
+Score of a position for the AI: the value of the pieces (pieceScore) plus the value of their square
+(piece square tables). The engines keep the score of their board up to date in make_move
+(gs.boardScore), with PIECE_SQUARE_SCORES.
+"""
+
+#Dictionnary to assign a score to the chessboard
+pieceScore = { 
+            'p': 100, 'N': 280, 'B': 320, 'R': 479, 'Q': 929, 'K': 60000, 'K_e': 60000, '-': 0 
+            } 
+
+'''
+The pst matrix is taken from the github of thomasahle. Those value have been generated by try and error
+pst_w = position table for with pawn in
+pst_b = position table for black pawn
+'''
+pst_w = {
+    'p':[
+            [ 100, 100, 100, 100, 105, 100, 100,  100],
+            [  78,  83,  86,  73, 102,  82,  85,  90],
+            [   7,  29,  21,  44,  40,  31,  44,   7],
+            [ -17,  16,  -2,  15,  14,   0,  15, -13],
+            [ -26,   3,  10,   9,   6,   1,   0, -23],
+            [ -22,   9,   5, -11, -10,  -2,   3, -19],
+            [ -31,   8,  -7, -37, -36, -14,   3, -31],
+            [   0,   0,   0,   0,   0,   0,   0,   0]
+        ],
+    'N': [ 
+            [-66, -53, -75, -75, -10, -55, -58, -70],
+            [ -3,  -6, 100, -36,   4,  62,  -4, -14],
+            [ 10,  67,   1,  74,  73,  27,  62,  -2],
+            [ 24,  24,  45,  37,  33,  41,  25,  17],
+            [ -1,   5,  31,  21,  22,  35,   2,   0],
+            [-18,  10,  13,  22,  18,  15,  11, -14],
+            [-23, -15,   2,   0,   2,   0, -23, -20],
+            [-74, -23, -26, -24, -19, -35, -22, -69]
+        ],
+    'B': [ 
+            [-59, -78, -82, -76, -23,-107, -37, -50],
+            [-11,  20,  35, -42, -39,  31,   2, -22],
+            [ -9,  39, -32,  41,  52, -10,  28, -14],
+            [ 25,  17,  20,  34,  26,  25,  15,  10],
+            [ 13,  10,  17,  23,  17,  16,   0,   7],
+            [ 14,  25,  24,  15,   8,  25,  20,  15],
+            [ 19,  20,  11,   6,   7,   6,  20,  16],
+            [ -7,   2, -15, -12, -14, -15, -10, -10]
+        ],
+    'R': [  
+            [ 35,  29,  33,   4,  37,  33,  56,  50],
+            [ 55,  29,  56,  67,  55,  62,  34,  60],
+            [ 19,  35,  28,  33,  45,  27,  25,  15],
+            [  0,   5,  16,  13,  18,  -4,  -9,  -6],
+            [-28, -35, -16, -21, -13, -29, -46, -30],
+            [-42, -28, -42, -25, -25, -35, -26, -46],
+            [-53, -38, -31, -26, -29, -43, -44, -53],
+            [-30, -24, -18,   5,  -2, -18, -31, -32]
+        ],
+    'Q': [   
+            [  6,   1,  -8,-104,  69,  24,  88,  26],
+            [ 14,  32,  60, -10,  20,  76,  57,  24],
+            [ -2,  43,  32,  60,  72,  63,  43,   2],
+            [  1, -16,  22,  17,  25,  20, -13,  -6],
+            [-14, -15,  -2,  -5,  -1, -10, -20, -22],
+            [-30,  -6, -13, -11, -16, -11, -16, -27],
+            [-36, -18,   0, -19, -15, -15, -21, -38],
+            [-39, -30, -31, -13, -31, -36, -34, -42]
+        ],
+    'K': [  
+            [  4,  54,  47, -99, -99,  60,  83, -62],
+            [-32,  10,  55,  56,  56,  55,  10,   3],
+            [-62,  12, -57,  44, -67,  28,  37, -31],
+            [-55,  50,  11,  -4, -19,  13,   0, -49],
+            [-55, -43, -52, -28, -51, -47,  -8, -50],
+            [-47, -42, -43, -79, -64, -32, -29, -32],
+            [ -4,   3, -14, -50, -57, -18,  13,   4],
+            [ 17,  30,  -3, -14,   6,  -1,  40,  18]
+        ],
+
+    #Endgame King Table
+    'K_e': [
+            [-50, -40, -30, -20, -20, -30, -40, -50],
+            [-30, -20, -10,   0,   0, -10, -20, -30],
+            [-30, -10,  20,  30,  30,  20, -10, -30],
+            [-30, -10,  30,  40,  40,  30, -10, -30],
+            [-30, -10,  30,  40,  40,  30, -10, -30],
+            [-30, -10,  20,  30,  30,  20, -10, -30],
+            [-30, -30,   0,   0,   0,   0, -30, -30],
+            [-50, -30, -30, -30, -30, -30, -30, -50]
+        ]
+}
+
+pst_b = {}
+for key, matrix in pst_w.items():
+    pst_b[key] = matrix[::-1]
+
+'''
+Score of each piece on each square (pieceScore + position table): positive for a white piece, negative
+for a black piece. The game states keep the sum for the pieces of the board (gs.boardScore, see
+score_material) and update it with the squares a move changes in make_move.
+'''
+PIECE_SQUARE_SCORES = {}
+for piece_type in ('p', 'N', 'B', 'R', 'Q', 'K'):
+    PIECE_SQUARE_SCORES['w' + piece_type] = [[pieceScore[piece_type] + pst_w[piece_type][row][col] for col in range(8)]
+                                             for row in range(8)]
+    PIECE_SQUARE_SCORES['b' + piece_type] = [[-(pieceScore[piece_type] + pst_b[piece_type][row][col]) for col in range(8)]
+                                             for row in range(8)]
+
+'''
+Score the board vased on the material
+'''
+def score_material(board, piece_locations=None):
+    '''
+    Score the board vased on the material
+        piece_locations : {'w': squares, 'b': squares} of the pieces (gs.pieceLocations), to visit
+                          only the occupied squares instead of the 64 squares of the board
+    '''    
+    score = 0
+    #What is good for white is bad for black and what is good for black is bad for white
+    if piece_locations is not None:
+        for row, col in piece_locations['w']:
+            piece_type = board[row][col][1]
+            score += (pieceScore[piece_type] + pst_w[piece_type][row][col])
+        for row, col in piece_locations['b']:
+            piece_type = board[row][col][1]
+            score -= (pieceScore[piece_type] + pst_b[piece_type][row][col])
+        return score
+    for row in range(len(board)): #loop among the rows in the board
+        for col in range(len(board[row])):  #loop in each col in a row
+            piece_type = board[row][col][1] #letter of the piece
+            color_piece = board[row][col][0]
+            if color_piece == 'w':
+                #we'll sum the pieceScore with the position weight of the piece
+                # !! use the white position matrix !!!
+                score += (pieceScore[piece_type] + pst_w[piece_type][row][col])
+            elif color_piece == 'b':
+                #we'll sum the pieceScore with the position weight of the piece
+                # !! use the black position matrix !!!
+                score -= (pieceScore[piece_type] + pst_b[piece_type][row][col])
+    
+    return score
@@ -0,0 +1,186 @@
+"""
+FEN (Forsyth-Edwards Notation)
+A position written on one line, e.g. the starting position:
+    rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1
+    1) the 8 ranks from the rank 8 to the rank 1 (upper case : white, lower case : black, digit : empty squares)
+    2) side to move ('w' or 'b')
+    3) castling rights ('KQkq', '-' if none)
+    4) en passant square ('e3', '-' if none)
+    5) and 6) halfmove clock and fullmove number (optional, not used by the engines)
+
+EPD (Extended Position Description) lines have the first 4 fields of a FEN followed by operations
+separated by ';', e.g. "... w KQkq - bm e4; id \"start\";". 'read_epd' streams the positions of a file.
+
+'GameState.from_fen' and 'GameState.to_fen' of every engine rely on this module.
+"""
+from engine.zobrist import WKS, WQS, BKS, BQS
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+#FEN letter -> piece of the board ("wp", "bN", ...)
+FEN_PIECES = {'P': 'wp', 'N': 'wN', 'B': 'wB', 'R': 'wR', 'Q': 'wQ', 'K': 'wK',
+              'p': 'bp', 'n': 'bN', 'b': 'bB', 'r': 'bR', 'q': 'bQ', 'k': 'bK'}
+FEN_CASTLE_RIGHTS = {'K': WKS, 'Q': WQS, 'k': BKS, 'q': BQS}
+FILES = "abcdefgh"
+
+def parse_fen(fen):
+    '''
+    FEN string -> (board, white_to_move, castle_rights, enpassant_possible)
+        board : 8x8 list of pieces ("--" for an empty square), row = 0 || rank = 8
+        castle_rights : 4 bits mask (see engine/zobrist.py)
+        enpassant_possible : (row, column) of the en passant square or ()
+    Raise a ValueError if the string is not a valid FEN
+    '''
+    fields = fen.split()
+    if len(fields) < 4:
+        raise ValueError("FEN needs at least 4 fields: " + fen)
+    placement, turn, castling, enpassant = fields[:4]
+
+    board = []
+    for rank in placement.split('/'):
+        row = []
+        for letter in rank:
+            if letter.isdigit():
+                row.extend(["--"] * int(letter))
+            elif letter in FEN_PIECES:
+                row.append(FEN_PIECES[letter])
+            else:
+                raise ValueError("unknown piece '" + letter + "' in FEN: " + fen)
+        if len(row) != 8:
+            raise ValueError("a rank must have 8 squares in FEN: " + fen)
+        board.append(row)
+    if len(board) != 8:
+        raise ValueError("FEN needs 8 ranks: " + fen)
+    for king in ("wK", "bK"):
+        if sum(row.count(king) for row in board) != 1:
+            raise ValueError("each side needs exactly one king in FEN: " + fen)
+
+    if turn not in ('w', 'b'):
+        raise ValueError("side to move must be 'w' or 'b' in FEN: " + fen)
+
+    castle_rights = 0
+    if castling != '-':
+        for letter in castling:
+            if letter not in FEN_CASTLE_RIGHTS:
+                raise ValueError("unknown castling right '" + letter + "' in FEN: " + fen)
+            castle_rights |= FEN_CASTLE_RIGHTS[letter]
+
+    if enpassant == '-':
+        enpassant_possible = ()
+    elif len(enpassant) == 2 and enpassant[0] in FILES and enpassant[1] in "36":
+        enpassant_possible = (8 - int(enpassant[1]), FILES.index(enpassant[0]))
+    else:
+        raise ValueError("invalid en passant square '" + enpassant + "' in FEN: " + fen)
+
+    return board, turn == 'w', castle_rights, enpassant_possible
+
+def fen_clocks(fen):
+    '''
+    (halfmove clock, fullmove number) of a FEN, (0, 1) when they are missing
+    '''
+    fields = fen.split()
+    if len(fields) < 6:
+        return 0, 1
+    if not (fields[4].isdigit() and fields[5].isdigit()):
+        raise ValueError("halfmove clock and fullmove number must be numbers in FEN: " + fen)
+    return int(fields[4]), max(1, int(fields[5]))
+
+def format_fen(board, white_to_move, castle_rights, enpassant_possible, halfmove_clock=0, fullmove_number=1):
+    '''
+    Position -> FEN string (same arguments as the values returned by parse_fen)
+    '''
+    letters = {piece: letter for letter, piece in FEN_PIECES.items()}
+    ranks = []
+    for row in board:
+        rank = ""
+        empty = 0
+        for piece in row:
+            if piece == "--":
+                empty += 1
+            else:
+                if empty:
+                    rank += str(empty)
+                    empty = 0
+                rank += letters[piece]
+        if empty:
+            rank += str(empty)
+        ranks.append(rank)
+    castling = "".join(letter for letter, right in FEN_CASTLE_RIGHTS.items() if castle_rights & right) or '-'
+    if enpassant_possible != ():
+        enpassant = FILES[enpassant_possible[1]] + str(8 - enpassant_possible[0])
+    else:
+        enpassant = '-'
+    return " ".join(("/".join(ranks), 'w' if white_to_move else 'b', castling, enpassant,
+                     str(halfmove_clock), str(fullmove_number)))
+
+def game_clocks(gs):
+    '''
+    (halfmove clock, fullmove number) of the current position of a GameState, from the clocks of its
+    first position (gs.fenClocks) and the moves made since then (a null move of the search, logged
+    as None, counts as a quiet ply)
+    '''
+    halfmove_clock, fullmove_number = gs.fenClocks
+    #halfmove clock: moves since the last capture or pawn move
+    for moves_since, move in enumerate(reversed(gs.moveLog)):
+        if move is not None and (move.pieceMoved[1] == 'p' or move.pieceCaptured != "--"):
+            halfmove_clock = moves_since
+            break
+    else:
+        halfmove_clock += len(gs.moveLog)
+    #fullmove number: incremented after each black move
+    white_started = gs.whiteToMove == (len(gs.moveLog) % 2 == 0)
+    black_moves = len(gs.moveLog) // 2 if white_started else (len(gs.moveLog) + 1) // 2
+    return halfmove_clock, fullmove_number + black_moves
+
+def parse_epd(line):
+    '''
+    EPD line -> (FEN, operations)
+        operations : {opcode: operands}, e.g. {'bm': 'e4', 'id': 'start'} (the quotes are removed)
+    The clocks of the FEN come from the 'hmvc' and 'fmvn' operations. Lines starting with a complete
+    FEN (the 2 clocks after the 4 fields, e.g. the perft suites "<FEN> ;D1 20 ;D2 400") are also accepted.
+    '''
+    fields = line.split(None, 4)
+    if len(fields) < 4:
+        raise ValueError("EPD needs at least 4 fields: " + line)
+    position = " ".join(fields[:4])
+    rest = fields[4] if len(fields) == 5 else ""
+    clocks = rest.split(None, 2)
+    if len(clocks) >= 2 and clocks[0].isdigit() and clocks[1].isdigit(): #complete FEN
+        rest = clocks[2] if len(clocks) == 3 else ""
+        clocks = clocks[0], clocks[1]
+    else:
+        clocks = None
+
+    operations = {}
+    operation = ""
+    in_quotes = False
+    for character in rest + ';':
+        if character == '"':
+            in_quotes = not in_quotes
+        elif character == ';' and not in_quotes:
+            operation = operation.strip()
+            if operation:
+                opcode, _, operands = operation.partition(' ')
+                operations[opcode] = operands.strip()
+            operation = ""
+            continue
+        operation += character
+    for opcode, operands in operations.items(): #remove the quotes of the string operands
+        if len(operands) >= 2 and operands[0] == operands[-1] == '"':
+            operations[opcode] = operands[1:-1]
+    if clocks is None:
+        clocks = operations.get('hmvc', '0'), operations.get('fmvn', '1')
+    halfmove_clock, fullmove_number = clocks
+    return position + " " + halfmove_clock + " " + fullmove_number, operations
+
+def read_epd(path):
+    '''
+    Generator of the (FEN, operations) of an EPD (or FEN) file
+    The file is read one line at a time, so files of any size can be streamed into the engines.
+    Empty lines and lines starting with '#' are skipped.
+    '''
+    with open(path) as epd_file:
+        for line in epd_file:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield parse_epd(line)
@@ -0,0 +1,50 @@
+"""
+STAGED MOVES
+Order in which a search wants to try the moves of a position, the most likely to cause a cutoff first:
+    1) hash move : best move found for this position by a previous search
+    2) captures (en passant included)
+    3) promotions (without capture, the capture promotions are in the captures)
+    4) killer moves : quiet moves which caused a cutoff in a sibling position (same depth)
+    5) the other quiet moves (castling included)
+
+The engines generate each stage only when the previous one is exhausted. A list of valid moves
+generated in one go (the check evasions of 'ChessEngineA', the moves given to the search by the
+caller) is given in the same order with 'staged_moves'.
+The search can also give the order of the moves inside the captures and the quiet moves (ai/moveOrdering.py).
+"""
+
+def is_capture(move):
+    return move.pieceCaptured != "--"
+
+def is_promotion(move):
+    return move.pieceMoved[1] == 'p' and move.endRow in (0, 7)
+
+def staged_moves(moves, hash_move = None, killers = (), capture_key = None, quiet_key = None):
+    '''
+    Generator of a list of valid moves in the stage order. The hash move and the killers are moves of
+    any engine (compared with their moveID), ignored if they are not in the list.
+        capture_key, quiet_key : functions move -> number to sort the captures and the other quiet
+                                 moves (highest first), None to keep the order of the list
+    '''
+    hash_id = hash_move.moveID if hash_move is not None else None
+    killer_ids = [killer.moveID for killer in killers if killer is not None and killer.moveID != hash_id]
+    hash_stage, captures, promotions, killer_stage, quiets = [], [], [], [], []
+    for move in moves:
+        move_id = move.moveID
+        if move_id == hash_id:
+            hash_stage.append(move)
+        elif is_capture(move):
+            captures.append(move)
+        elif is_promotion(move):
+            promotions.append(move)
+        elif move_id in killer_ids:
+            killer_stage.append(move)
+        else:
+            quiets.append(move)
+    killer_stage.sort(key = lambda move: killer_ids.index(move.moveID))
+    if capture_key is not None:
+        captures.sort(key = capture_key, reverse = True)
+    if quiet_key is not None:
+        quiets.sort(key = quiet_key, reverse = True)
+    for stage in (hash_stage, captures, promotions, killer_stage, quiets):
+        yield from stage
@@ -0,0 +1,54 @@
+"""
+ZOBRIST HASHING
+A position is identified by a 64-bit key: the XOR of a random number for every (piece, square),
+one for the castling rights, one for the column of the en passant square and one when black is
+to move. Because XOR is its own inverse, the key is updated incrementally in make_move by XOR-ing
+out what a move removes and XOR-ing in what it adds.
+
+The keys are generated with a fixed seed, so the same position has the same key in every engine
+and every run (needed to share a transposition table between processes).
+"""
+import random
+
+_random = random.Random(20210101)
+
+PIECES = ('wp', 'wN', 'wB', 'wR', 'wQ', 'wK', 'bp', 'bN', 'bB', 'bR', 'bQ', 'bK')
+#PIECE_KEYS[piece][row][column]
+PIECE_KEYS = {piece: [[_random.getrandbits(64) for column in range(8)] for row in range(8)] for piece in PIECES}
+#castling rights as a 4 bits mask: white king side, white queen side, black king side, black queen side
+WKS, WQS, BKS, BQS = 1, 2, 4, 8
+_CASTLE_RIGHT_KEYS = [_random.getrandbits(64) for _ in range(4)]
+#CASTLE_KEYS[mask] = XOR of the keys of every right in the mask
+CASTLE_KEYS = [0] * 16
+for _mask in range(16):
+    for _i in range(4):
+        if _mask >> _i & 1:
+            CASTLE_KEYS[_mask] ^= _CASTLE_RIGHT_KEYS[_i]
+ENPASSANT_KEYS = [_random.getrandbits(64) for column in range(8)] #indexed by the column of the square
+BLACK_TO_MOVE_KEY = _random.getrandbits(64)
+
+def castle_mask(wks, wqs, bks, bqs):
+    '''
+    Castling rights flags -> 4 bits mask
+    '''
+    return (WKS if wks else 0) | (WQS if wqs else 0) | (BKS if bks else 0) | (BQS if bqs else 0)
+
+def zobrist_key(board, white_to_move, castle_rights, enpassant_possible):
+    '''
+    Compute the key of a position from scratch
+        board : 8x8 list of pieces ("--" for an empty square)
+        castle_rights : 4 bits mask (see castle_mask)
+        enpassant_possible : (row, column) of the en passant square or ()
+    '''
+    key = 0
+    for row in range(8):
+        for column in range(8):
+            piece = board[row][column]
+            if piece != "--":
+                key ^= PIECE_KEYS[piece][row][column]
+    key ^= CASTLE_KEYS[castle_rights]
+    if enpassant_possible != ():
+        key ^= ENPASSANT_KEYS[enpassant_possible[1]]
+    if not white_to_move:
+        key ^= BLACK_TO_MOVE_KEY
+    return key
@@ -0,0 +1,180 @@
+"""
+PERFT (PERFormance Test)
+Count the number of leaf nodes of the move tree to a given depth. The counts of many positions are
+known, so it checks that an engine generates exactly the legal moves, and the nodes per second
+measure the speed of its move generation.
+
+    python perft.py                                  #reference suite with the default engine
+    python perft.py --engine C --depth 3             #reference suite with 'engine.ChessEngineC'
+    python perft.py --fen "<FEN>" --depth 4 --divide #nodes below each root move of a position
+    python perft.py --depth 5 --workers 4            #root moves split among 4 processes
+    python perft.py --epd perftsuite.epd --depth 4   #positions of an EPD file: "<FEN> ;D1 20 ;D2 400 ..."
+
+--engine takes 'A', 'B', 'C' or the module name of any engine with the same GameState interface.
+"""
+import argparse
+import importlib
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from engine.fen import START_FEN, read_epd
+
+ENGINES = {'A': 'engine.ChessEngineA', 'B': 'engine.ChessEngineB', 'C': 'engine.ChessEngineC'}
+DEFAULT_ENGINE = 'A'
+
+#(name, FEN, {depth: nodes}) -- the engines always promote a pawn to a queen, so only the depths where
+# no pawn can reach the last rank are kept (the published counts include the under-promotions)
+REFERENCE_POSITIONS = [
+    ("start", START_FEN, {1: 20, 2: 400, 3: 8902, 4: 197281, 5: 4865609}),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     {1: 48, 2: 2039, 3: 97862}),
+    ("position 3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", {1: 14, 2: 191, 3: 2812, 4: 43238, 5: 674624}),
+    ("position 4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", {1: 6}),
+    ("position 6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     {1: 46, 2: 2079, 3: 89890, 4: 3894594}),
+    ("castling rights", "r3k2r/1b4bq/8/8/8/8/7B/R3K2R w KQkq - 0 1", {4: 1274206}),
+    ("castling prevented", "r3k2r/8/3Q4/8/8/5q2/8/R3K2R b KQkq - 0 1", {4: 1720476}),
+    ("double check", "8/8/2k5/5q2/5n2/8/5K2/8 b - - 0 1", {4: 23527}),
+    ("short castling gives check", "5k2/8/8/8/8/8/8/4K2R w K - 0 1", {6: 661072}),
+    ("long castling gives check", "3k4/8/8/8/8/8/8/R3K3 w Q - 0 1", {6: 803711}),
+]
+
+def load_engine(name):
+    '''
+    'A', 'B', 'C' or a module name -> engine module
+    '''
+    return importlib.import_module(ENGINES.get(name, name))
+
+def new_game(engine, fen):
+    '''
+    GameState of the engine set up with the FEN position
+    '''
+    return engine.GameState.from_fen(fen)
+
+def perft(gs, depth):
+    '''
+    Number of leaf nodes 'depth' moves below the position
+    The moves of the last level are only counted, not made (bulk counting)
+    '''
+    if depth == 0:
+        return 1
+    moves = gs.get_valid_moves()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        gs.make_move(move)
+        nodes += perft(gs, depth - 1)
+        gs.undo_move()
+    return nodes
+
+def _perft_root_move(engine_name, fen, move_id, depth):
+    '''
+    Worker of the process pool: nodes below one root move (found back from its moveID)
+    '''
+    gs = new_game(load_engine(engine_name), fen)
+    for move in gs.get_valid_moves():
+        if move.moveID == move_id:
+            gs.make_move(move)
+            return perft(gs, depth - 1)
+    raise ValueError("root move " + str(move_id) + " not found")
+
+def divide(engine_name, fen, depth, workers=1):
+    '''
+    [(move notation, nodes)] for every root move of the position (depth >= 1)
+    With workers > 1 the root moves are split among a pool of processes
+    '''
+    gs = new_game(load_engine(engine_name), fen)
+    root_moves = gs.get_valid_moves()
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_perft_root_move, engine_name, fen, move.moveID, depth) for move in root_moves]
+            counts = [future.result() for future in futures]
+    else:
+        counts = []
+        for move in root_moves:
+            gs.make_move(move)
+            counts.append(perft(gs, depth - 1))
+            gs.undo_move()
+    return [(move.get_chess_notation(), nodes) for move, nodes in zip(root_moves, counts)]
+
+def run_position(engine_name, fen, depth, workers=1, show_divide=False):
+    '''
+    Perft of one position (nodes of each root move printed if show_divide), return (nodes, seconds)
+    '''
+    start = time.perf_counter()
+    if workers > 1 or show_divide:
+        results = divide(engine_name, fen, depth, workers)
+        nodes = sum(count for _, count in results)
+    else:
+        nodes = perft(new_game(load_engine(engine_name), fen), depth)
+    seconds = time.perf_counter() - start
+    if show_divide:
+        for notation, count in sorted(results):
+            print(notation + ": " + str(count))
+        print()
+    return nodes, seconds
+
+def nodes_per_second(nodes, seconds):
+    return int(nodes / seconds) if seconds > 0 else 0
+
+def epd_positions(path):
+    '''
+    Generator of the (name, FEN, {depth: nodes}) of an EPD file, the expected nodes being the 'D<depth>'
+    operations (format of the usual perft suites)
+    '''
+    for line_number, (fen, operations) in enumerate(read_epd(path), 1):
+        expected_counts = {int(opcode[1:]): int(operands) for opcode, operands in operations.items()
+                           if opcode[0] == 'D' and opcode[1:].isdigit()}
+        yield operations.get('id', path + ":" + str(line_number)), fen, expected_counts
+
+def run_suite(engine_name, max_depth, workers=1, positions=REFERENCE_POSITIONS):
+    '''
+    Run every position of the suite at its deepest known depth <= max_depth
+    Return True if all the node counts are the expected ones
+    '''
+    all_passed = True
+    total_nodes, total_seconds = 0, 0.0
+    print("{:<28}{:>6}{:>12}{:>12}{:>8}{:>10}{:>12}".format("position", "depth", "nodes", "expected", "", "time", "nodes/s"))
+    for name, fen, expected_counts in positions:
+        depths = [depth for depth in expected_counts if depth <= max_depth]
+        if not depths:
+            continue
+        depth = max(depths)
+        nodes, seconds = run_position(engine_name, fen, depth, workers)
+        passed = nodes == expected_counts[depth]
+        all_passed = all_passed and passed
+        total_nodes += nodes
+        total_seconds += seconds
+        print("{:<28}{:>6}{:>12}{:>12}{:>8}{:>10.2f}{:>12}".format(name, depth, nodes, expected_counts[depth],
+              "ok" if passed else "FAIL", seconds, nodes_per_second(nodes, seconds)))
+    print("{:<28}{:>6}{:>12}{:>12}{:>8}{:>10.2f}{:>12}".format("total", "", total_nodes, "",
+          "ok" if all_passed else "FAIL", total_seconds, nodes_per_second(total_nodes, total_seconds)))
+    return all_passed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perft: count the leaf nodes of the move tree of a chess engine")
+    parser.add_argument("--engine", default=DEFAULT_ENGINE,
+                        help="'A', 'B', 'C' or the module of an engine (default: %(default)s)")
+    parser.add_argument("--fen", help="position to test (default: the reference suite)")
+    parser.add_argument("--epd", help="EPD file of positions with their expected nodes (';D1 20 ;D2 400 ...')")
+    parser.add_argument("--depth", type=int, default=4,
+                        help="depth of the position, maximum depth of the suite (default: %(default)s)")
+    parser.add_argument("--divide", action="store_true", help="print the nodes below each root move")
+    parser.add_argument("--workers", type=int, default=1, help="processes sharing the root moves (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    print("engine: " + ENGINES.get(args.engine, args.engine))
+    if args.epd is not None:
+        return 0 if run_suite(args.engine, args.depth, args.workers, epd_positions(args.epd)) else 1
+    if args.fen is None:
+        return 0 if run_suite(args.engine, args.depth, args.workers) else 1
+    nodes, seconds = run_position(args.engine, args.fen, args.depth, args.workers, args.divide)
+    print("nodes: " + str(nodes))
+    print("time: {:.2f} s".format(seconds))
+    print("nodes/s: " + str(nodes_per_second(nodes, seconds)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())